@@ -0,0 +1,174 @@
+"""Análises sobre o conjunto inteiro: totais por escola × mês, taxa de pagamento, prazo médio e atrasos.
+
+Os pagamentos são copiados para colunas compactas (array) — uma por campo,
+com crianças e escolas trocadas por códigos — e as agregações rodam sobre as
+colunas, sem tocar nos objetos Pagamento: com o NumPy instalado, em operações
+vetorizadas (bincount); sem ele, em laços simples. As colunas são
+refeitas só quando a versão do repositório ou do cadastro muda. Os atrasados
+não saem daqui: vêm da avaliação de regras.py, a mesma das outras telas.
+"""
+from array import array
+from datetime import date
+
+from modelo import ESCOLAS, ano_referencia
+
+try:
+    import numpy as np
+except ImportError:     # opcional: sem ele as agregações usam laços sobre as mesmas colunas
+    np = None
+
+# Meses 0-12 (0 = mês desconhecido) por escola na chave combinada escola × mês
+_MESES_POR_ESCOLA = 13
+
+
+class PagamentosColunares:
+    """Pagamentos em colunas paralelas: criança, escola, mês, data (ordinal) e centavos.
+
+    escolas[codigo] e criancas[codigo] traduzem os códigos de volta; as escolas
+    seguem a ordem de ESCOLAS, com as desconhecidas no fim.
+    """
+
+    def __init__(self, pagamentos, versao=None):
+        self.versao = versao
+        self.escolas = list(ESCOLAS)
+        self.criancas = []
+        self.crianca = array('l')
+        self.escola = array('l')
+        self.mes = array('b')
+        self.data = array('l')
+        self.centavos = array('q')
+        self.dias_para_pagar = array('l')   # data - dia 1 do mês pago (0 se sem data)
+        self.escola_da_crianca = array('l')  # código da escola de cada criança
+
+        codigos_escolas = {escola: codigo for codigo, escola in enumerate(self.escolas)}
+        codigos_criancas = {}
+        inicios_mes = {}
+        for pag in pagamentos:
+            codigo_escola = codigos_escolas.get(pag.escola)
+            if codigo_escola is None:
+                codigo_escola = codigos_escolas[pag.escola] = len(self.escolas)
+                self.escolas.append(pag.escola)
+            crianca = pag.crianca
+            codigo_crianca = codigos_criancas.get(crianca.id)
+            if codigo_crianca is None:
+                codigo_crianca = codigos_criancas[crianca.id] = len(self.criancas)
+                self.criancas.append((crianca.nome, crianca.escola))
+                self.escola_da_crianca.append(codigo_escola)
+            self.crianca.append(codigo_crianca)
+            self.escola.append(codigo_escola)
+            self.mes.append(pag.mes)
+            self.data.append(pag.data)
+            self.centavos.append(pag.centavos)
+            self.dias_para_pagar.append(_dias_para_pagar(pag.data, pag.mes, inicios_mes))
+
+        self.chave_escola_mes = array('l', [escola * _MESES_POR_ESCOLA + mes for escola, mes in zip(self.escola, self.mes)])
+        self.chave_crianca_mes = array('l', [crianca * _MESES_POR_ESCOLA + mes for crianca, mes in zip(self.crianca, self.mes)])
+
+    def __len__(self):
+        return len(self.crianca)
+
+    def _vetor(self, coluna):
+        """A coluna como vetor do NumPy, sem copiar os dados."""
+        return np.frombuffer(coluna, dtype=f'i{coluna.itemsize}')
+
+    def totais_escola_mes(self):
+        """Retorna {escola: [centavos do mês 0..12]} das escolas com algum pagamento."""
+        tamanho = len(self.escolas) * _MESES_POR_ESCOLA
+        if np is not None:
+            # Somas em float64 são exatas até 2^53 centavos
+            totais = np.bincount(self._vetor(self.chave_escola_mes), weights=self._vetor(self.centavos),
+                                 minlength=tamanho).round().astype(np.int64).tolist()
+        else:
+            totais = [0] * tamanho
+            for chave, centavos in zip(self.chave_escola_mes, self.centavos):
+                totais[chave] += centavos
+        return {escola: totais[codigo * _MESES_POR_ESCOLA:(codigo + 1) * _MESES_POR_ESCOLA]
+                for codigo, escola in enumerate(self.escolas)
+                if any(totais[codigo * _MESES_POR_ESCOLA:(codigo + 1) * _MESES_POR_ESCOLA])}
+
+    def taxa_pagamento(self):
+        """Retorna {escola: fração de crianças × meses pagos}.
+
+        Os meses considerados em cada escola são aqueles em que ela teve algum pagamento.
+        """
+        if np is not None:
+            quantidade = len(self.escolas)
+            escola_da_crianca = self._vetor(self.escola_da_crianca)
+            criancas_escola = np.bincount(escola_da_crianca, minlength=quantidade).tolist()
+            # Chaves distintas pela contagem de cada uma (as chaves são pequenas), sem ordenar
+            meses_escola = np.bincount(np.flatnonzero(np.bincount(self._vetor(self.chave_escola_mes))) // _MESES_POR_ESCOLA,
+                                       minlength=quantidade).tolist()
+            criancas_meses = np.flatnonzero(np.bincount(self._vetor(self.chave_crianca_mes)))
+            pagos_escola = np.bincount(escola_da_crianca[criancas_meses // _MESES_POR_ESCOLA], minlength=quantidade).tolist()
+            return {self.escolas[codigo]: pagos_escola[codigo] / (criancas_escola[codigo] * meses_escola[codigo])
+                    for codigo in range(quantidade) if criancas_escola[codigo]}
+        criancas_escola = [0] * len(self.escolas)
+        for escola in self.escola_da_crianca:
+            criancas_escola[escola] += 1
+        meses_escola = [0] * len(self.escolas)
+        for chave in set(self.chave_escola_mes):
+            meses_escola[chave // _MESES_POR_ESCOLA] += 1
+        pagos_escola = [0] * len(self.escolas)
+        for chave in set(self.chave_crianca_mes):
+            pagos_escola[self.escola_da_crianca[chave // _MESES_POR_ESCOLA]] += 1
+        return {self.escolas[codigo]: pagos_escola[codigo] / (criancas_escola[codigo] * meses_escola[codigo])
+                for codigo in range(len(self.escolas)) if criancas_escola[codigo]}
+
+    def dias_medios_pagamento(self):
+        """Retorna {escola: média de dias entre o dia 1 do mês pago e a data do pagamento}."""
+        if np is not None:
+            datados = self._vetor(self.data) != 0
+            escolas = self._vetor(self.escola)[datados]
+            somas = np.bincount(escolas, weights=self._vetor(self.dias_para_pagar)[datados],
+                                minlength=len(self.escolas)).tolist()
+            contagens = np.bincount(escolas, minlength=len(self.escolas)).tolist()
+            return {self.escolas[codigo]: somas[codigo] / contagens[codigo]
+                    for codigo in range(len(self.escolas)) if contagens[codigo]}
+        somas = [0] * len(self.escolas)
+        contagens = [0] * len(self.escolas)
+        for escola, data, dias in zip(self.escola, self.data, self.dias_para_pagar):
+            if data:
+                somas[escola] += dias
+                contagens[escola] += 1
+        return {self.escolas[codigo]: somas[codigo] / contagens[codigo]
+                for codigo in range(len(self.escolas)) if contagens[codigo]}
+
+    def resumo_escolas(self, atrasados):
+        """Linhas do resumo: (escola, [centavos por mês 1..12], total, taxa, dias médios, atrasados).
+
+        atrasados é {escola: quantidade}, de nucleo.atrasados_por_escola.
+        """
+        totais = self.totais_escola_mes()
+        taxas = self.taxa_pagamento()
+        dias = self.dias_medios_pagamento()
+        linhas = []
+        for escola in self.escolas:
+            if escola not in taxas:
+                continue
+            por_mes = totais.get(escola, [0] * _MESES_POR_ESCOLA)
+            linhas.append((escola, por_mes[1:], sum(por_mes), taxas[escola], dias.get(escola), atrasados.get(escola, 0)))
+        return linhas
+
+
+def _dias_para_pagar(data, mes, inicios_mes):
+    """Dias entre o dia 1 do mês pago e a data do pagamento (negativo se adiantado)."""
+    if not data or not mes:
+        return 0
+    chave = (ano_referencia(data, mes), mes)
+    inicio = inicios_mes.get(chave)
+    if inicio is None:
+        inicio = inicios_mes[chave] = date(*chave, 1).toordinal()
+    return data - inicio
+
+
+_cache = None
+
+
+def colunas(repositorio):
+    """Retorna as colunas do repositório, reaproveitando as anteriores se nem os pagamentos nem o cadastro mudaram."""
+    global _cache
+    # Nomes e escolas das crianças vêm do cadastro: renomear ou trocar a escola também refaz as colunas
+    versao = (repositorio.versao, repositorio.cadastro.versao)
+    if _cache is None or _cache[0] is not repositorio or _cache[1].versao != versao:
+        _cache = (repositorio, PagamentosColunares(repositorio, versao))
+    return _cache[1]
@@ -1,111 +1,173 @@
-import json
 import os
 import tkinter as tk
 from tkinter import messagebox, ttk
 from tkinter import simpledialog, filedialog
-from datetime import datetime, timedelta
-from collections import Counter
-try:
-    from fpdf import FPDF
-except ImportError:
-    messagebox.showerror("Erro", "Biblioteca fpdf não encontrada. Instale com: pip install fpdf")
-    exit(1)
-
-# Arquivo para salvar os dados
-ARQUIVO_DADOS = 'pagamentos.json'
-
-# Lista para armazenar os pagamentos (carregada do arquivo)
-pagamentos = []
-
-# Dicionário para ordem dos meses (para ordenação)
-MESES_ORDENADOS = {
-    'Janeiro': 1, 'Fevereiro': 2, 'Marco': 3, 'Abril': 4, 'Maio': 5, 'Junho': 6,
-    'Julho': 7, 'Agosto': 8, 'Setembro': 9, 'Outubro': 10, 'Novembro': 11, 'Dezembro': 12
-}
-
-ESCOLAS = [
-    "Altenfelder - Manhã", "Altenfelder - Tarde",
-    "Josué de Castro - Manhã", "Josué de Castro - Tarde",
-    "Paulo Nogueira - Manhã", "Paulo Nogueira - Tarde",
-    "Antonio Candido - Manhã", "Antonio Candido - Tarde",
-    "Gepan", "Creche VP", "Creche dos Anjos", "Creche EC", "Parquinho", "CCA"
-]
-
-# Dia atual para verificação de atraso (ajustável)
-CURRENT_DAY = 15
-
-def validar_data(data_str):
-    """Valida e converte data de DD/MM/AAAA para YYYY-MM-DD. Retorna None se inválida."""
-    try:
-        dt = datetime.strptime(data_str, '%d/%m/%Y')
-        data_formatada = dt.strftime('%Y-%m-%d')  
-        data_exibicao = dt.strftime('%d/%m/%Y')  
-
-        return {'interna': data_formatada, 'exibicao': data_exibicao}
-    except ValueError:
-        return None
+from datetime import datetime
+from tabela import TabelaIncremental
+from tarefas import ATRASO_PADRAO_MS, CacheConsultas, ExecutorConsultas, GravacaoAdiada
+from modelo import ESCOLAS, MESES_ORDENADOS, NOMES_MESES, Pagamento, ano_referencia, para_centavos
+import nucleo
+from nucleo import calcular_linhas, gerar_pdf_atrasados, obter_data_exibicao, validar_data
+from importacao import importar_csv
+import analise
+import relatorios
+from diagnostico import diagnostico, medir
+from busca import IndiceNomes
+from servidor import ServicoConsultas
+
+# Armazenamento por ano e repositório indexado dos pagamentos do ano selecionado (abertos por carregar_dados)
+armazenamento = None
+pagamentos = None
+# Busca por nome das crianças do cadastro, atualizada a cada criança criada ou renomeada
+indice_nomes = None
+
+# Serviço HTTP local de consultas (nucleo.PORTA_SERVICO), aberto por iniciar_servico
+servico = None
+
+# Intervalo para entregar ao serviço os dados alterados (ms)
+INTERVALO_PUBLICACAO_MS = 1000
+
+# Resultados da lista por filtro (mês, criança, escola, dia), válidos enquanto os dados não mudarem
+cache_consultas = CacheConsultas()
+
+# Depois de cada consulta, calcula em segundo plano os meses vizinhos ao filtrado
+ANTECIPAR_MESES_VIZINHOS = True
+
+# Teclas que não mudam o texto digitado no combo de busca
+TECLAS_SEM_TEXTO = {'Up', 'Down', 'Left', 'Right', 'Return', 'KP_Enter', 'Escape', 'Tab', 'Home', 'End',
+                    'Shift_L', 'Shift_R', 'Control_L', 'Control_R', 'Alt_L', 'Alt_R'}
 
 def carregar_dados():
-    """Carrega os pagamentos do arquivo JSON, se existir."""
+    """Carrega os pagamentos do ano atual (arquivo JSON e journal), se existirem."""
+    global armazenamento, pagamentos, indice_nomes
+    with medir('carregar') as medicao:
+        armazenamento = nucleo.abrir_armazenamento()
+        pagamentos = armazenamento.carregar()
+        medicao.registros = len(pagamentos)
+    indice_nomes = IndiceNomes(armazenamento.cadastro)
+    print(f"Dados carregados: {len(pagamentos)} pagamentos encontrados em {pagamentos.ano}.")
+
+def iniciar_servico():
+    """Abre o serviço HTTP local de consultas, se configurado em nucleo.PORTA_SERVICO."""
+    global servico
+    if nucleo.PORTA_SERVICO is None:
+        return
+    try:
+        servico = ServicoConsultas(nucleo.PORTA_SERVICO)
+    except OSError as e:
+        print(f"Serviço de consultas não iniciado: {e}")
+        return
+    publicar_dados()
+    servico.iniciar()
+    print(f"Serviço de consultas em {servico.endereco}")
+
+def publicar_dados():
+    """Entrega ao serviço o instantâneo do ano selecionado; a cópia só é refeita quando os dados mudam."""
+    anterior = nucleo.repositorio_anterior(armazenamento, pagamentos)
+    servico.publicar(pagamentos.instantaneo(), anterior.instantaneo() if anterior is not None else None, pagamentos.ano)
+    root.after(INTERVALO_PUBLICACAO_MS, publicar_dados)
+
+def selecionar_ano(ano):
+    """Passa a exibir os pagamentos do ano, carregando o arquivo dele na primeira vez."""
     global pagamentos
-    if os.path.exists(ARQUIVO_DADOS):
-        try:
-            with open(ARQUIVO_DADOS, 'r', encoding='utf-8') as arquivo:
-                pagamentos = json.load(arquivo)
-            for pag in pagamentos:
-                if 'data' not in pag:
-                    pag['data'] = ''
-                if 'escola' not in pag:
-                    pag['escola'] = ''
-            print(f"Dados carregados: {len(pagamentos)} pagamentos encontrados.")
-        except json.JSONDecodeError:
-            print("Arquivo de dados corrompido. Iniciando vazio.")
-            pagamentos = []
-    else:
-        print("Nenhum arquivo de dados encontrado. Iniciando vazio.")
-        pagamentos = []
+    with medir('carregar_ano') as medicao:
+        pagamentos = armazenamento.carregar(ano)
+        medicao.registros = len(pagamentos)
+    # A versão guardada com cada resultado não distingue um ano do outro: as consultas
+    # do ano anterior são descartadas e o cache é esvaziado
+    executor_consultas.descartar()
+    cache_consultas.limpar()
+    popular_combobox()
+    popular_combobox_criancas()
+    atualizar_lista()
 
-def salvar_dados():
-    """Salva os pagamentos no arquivo JSON."""
+def gravar_dados():
+    """Grava as alterações pendentes de todos os anos abertos. Roda na thread de gravação."""
+    with medir('salvar', len(pagamentos)):
+        armazenamento.salvar(pagamentos)
+
+def salvar_dados(encerrando=False):
+    """Agenda a gravação das alterações; edições em sequência são gravadas juntas, fora da thread do Tk.
+
+    Ao encerrar, espera a gravação em andamento e compacta tudo na hora.
+    """
+    if not encerrando:
+        gravacao.marcar()
+        return
+    gravacao.descarregar()
     try:
-        with open(ARQUIVO_DADOS, 'w', encoding='utf-8') as arquivo:
-            json.dump(pagamentos, arquivo, ensure_ascii=False, indent=4)
+        with medir('salvar', len(pagamentos)):
+            armazenamento.fechar(pagamentos)
         print("Dados salvos com sucesso.")
     except Exception as e:
         print(f"Erro ao salvar: {e}")
         messagebox.showerror("Erro", f"Erro ao salvar dados: {e}")
 
+def ao_terminar_gravacao(erro):
+    """Mostra o resultado da gravação automática na barra de status, sem interromper o uso."""
+    if erro is None:
+        print("Dados salvos com sucesso.")
+        rotulo_status.config(text=f"Dados salvos às {datetime.now().strftime('%H:%M:%S')}", fg="gray")
+    else:
+        print(f"Erro ao salvar: {erro}")
+        rotulo_status.config(text=f"Erro ao salvar dados: {erro} (nova tentativa em instantes)", fg="red")
+
+def obter_atrasados(hoje):
+    """Retorna [(nome, escola, último pagamento)] das crianças atrasadas, em ordem de nome."""
+    return nucleo.obter_atrasados(pagamentos, hoje, nucleo.repositorio_anterior(armazenamento, pagamentos))
+
 def obter_meses_unicos():
     """Retorna lista de meses únicos ordenados."""
-    meses_set = set(pag['mes'] for pag in pagamentos if pag['mes'].strip())
-    meses_ordenados = sorted(meses_set, key=lambda m: MESES_ORDENADOS.get(m.capitalize(), 13))
-    return ['Todos os Meses'] + meses_ordenados
+    return ['Todos os Meses'] + [NOMES_MESES[mes] for mes in sorted(pagamentos.meses())]
 
 def obter_nomes_unicos():
     """Retorna lista de nomes únicos ordenados alfabeticamente."""
-    nomes_set = set(pag['nome'] for pag in pagamentos if pag['nome'].strip())
-    return sorted(nomes_set)
-
-def get_usual_payment_day(nome):
-    """Retorna o dia usual de pagamento da criança baseado no histórico. Padrão 13 se nenhum."""
-    dias = []
-    for pag in pagamentos:
-        if pag['nome'] == nome and pag.get('data'):
-            try:
-                dt = datetime.strptime(pag['data'], '%Y-%m-%d')
-                dias.append(dt.day)
-            except:
-                pass
-    if dias:
-        return Counter(dias).most_common(1)[0][0]
-    return 13
+    return pagamentos.nomes()
+
+def opcoes_criancas():
+    """Opções do combo de crianças sem texto digitado: todas e os nomes do ano."""
+    return ['Todas as Crianças'] + obter_nomes_unicos()
 
 def popular_combobox_criancas():
     """Popula o Combobox com nomes únicos de crianças."""
-    nomes = obter_nomes_unicos()
-    combo_criancas['values'] = ['Todas as Crianças'] + nomes
+    combo_criancas['values'] = opcoes_criancas()
     combo_criancas.set('Todas as Crianças')
 
+def ligar_busca_nomes(combo, opcoes):
+    """Faz do combo um campo de busca: a cada tecla, a lista passa a ter só os nomes que contêm o texto.
+
+    Com o campo vazio, volta a mostrar opcoes().
+    """
+    def filtrar(event):
+        if event.keysym in TECLAS_SEM_TEXTO:
+            return
+        texto = combo.get()
+        combo['values'] = indice_nomes.buscar(texto) if texto.strip() else opcoes()
+    combo.bind('<KeyRelease>', filtrar, add='+')
+
+def nome_digitado(combo):
+    """Nome escolhido no combo de busca: o texto, se for uma opção ou um nome, senão o primeiro nome que o contém.
+
+    Retorna None se o texto está vazio ou não corresponde a nenhum nome.
+    """
+    texto = combo.get()
+    if not texto.strip():
+        return None
+    if texto in combo['values']:
+        return texto
+    nome = indice_nomes.encontrar(texto)
+    if nome is None:
+        encontrados = indice_nomes.buscar(texto, 1)
+        nome = encontrados[0] if encontrados else None
+    return nome
+
+def crianca_filtrada():
+    """Criança do filtro principal; texto ainda incompleto no combo conta como todas."""
+    texto = combo_criancas.get()
+    if texto == 'Todas as Crianças' or texto in combo_criancas['values']:
+        return texto
+    return indice_nomes.encontrar(texto) or 'Todas as Crianças'
+
 def popular_combobox_escolas():
     """Popula o Combobox com escolas."""
     combo_escolas['values'] = ['Todas as Escolas'] + ESCOLAS
@@ -151,6 +213,11 @@ def escolher_mes_e_escola():
     dialog.wait_window()
     return selected_mes, selected_escola
 
+def popular_combobox_anos():
+    """Popula o Combobox com os anos que têm dados (e o atual)."""
+    combo_anos['values'] = [str(ano) for ano in armazenamento.anos()]
+    combo_anos.set(str(pagamentos.ano))
+
 def popular_combobox():
     """Popula o Combobox com todos os meses ordenados."""
     meses = ['Todos os Meses'] + list(MESES_ORDENADOS.keys())
@@ -188,146 +255,133 @@ def adicionar_pagamento(nome=None):
         messagebox.showwarning("Aviso", "Valor inválido. Deve ser um número.")
         return
     
-    pagamento = {
-        'nome': nome,
-        'mes': mes,
-        'escola': escola,
-        'data': data_validada['interna'],  
-        'data_exibicao': data_validada['exibicao'],  
-        'valor': valor
-    }
-    pagamentos.append(pagamento)
-    messagebox.showinfo("Sucesso", f"Pagamento adicionado:\n{nome} - {mes} - {escola} - {data_validada['exibicao']} - R$ {valor:.2f}")
+    # Vai para o ano a que o pagamento se refere, como na importação do CSV
+    numero_mes = MESES_ORDENADOS[mes]
+    destino = armazenamento.carregar(ano_referencia(data_validada['ordinal'], numero_mes))
+    pagamento = Pagamento(destino.crianca(nome, escola), numero_mes, data_validada['ordinal'], para_centavos(valor))
+    destino.adicionar(pagamento)
+    mensagem = f"Pagamento adicionado:\n{nome} - {mes} - {escola} - {data_validada['exibicao']} - R$ {valor:.2f}"
+    if destino is not pagamentos:
+        mensagem += f"\n(gravado em {destino.ano})"
+    messagebox.showinfo("Sucesso", mensagem)
     salvar_dados()
+    popular_combobox_anos()
     popular_combobox()
     popular_combobox_criancas()
     atualizar_lista()
 
-def obter_data_exibicao(pag):
-    """Retorna data de exibição ou '--' se vazia."""
-    if 'data_exibicao' in pag and pag['data_exibicao']:
-        return pag['data_exibicao']
-    elif pag.get('data'):
-        try:
-            dt = datetime.strptime(pag['data'], '%Y-%m-%d')
-            return dt.strftime('%d/%m/%Y')
-        except:
-            pass
-    return '--'
-
-def filtrar_e_listar():
-    """Filtra e lista pagamentos por mês, criança e escola selecionados, incluindo atrasados e anteriores."""
-    mes_selecionado = combo_meses.get()
-    nome_selecionado = combo_criancas.get()
-    escola_selecionada = combo_escolas.get()
-
-    for item in tree.get_children():
-        tree.delete(item)
-
-    if not pagamentos:
-        tree.insert("", "end", values=("Nenhum pagamento cadastrado.", "", "", "", "", ""))
+def importar_pagamentos_csv():
+    """Importa pagamentos em lote de um CSV (nome, mês, escola, data, valor)."""
+    file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv"), ("Todos os arquivos", "*.*")])
+    if not file_path:
         return
-
-    # Obter crianças únicas que atendem aos filtros
-    mes_order = MESES_ORDENADOS.get(mes_selecionado, 13)
-    if mes_order >= 10:  # Outubro ou posterior
-        # Incluir todas as crianças únicas do dataset, filtradas por nome e escola se selecionados
-        criancas_filtradas = set()
-        for pag in pagamentos:
-            if (nome_selecionado == 'Todas as Crianças' or pag['nome'] == nome_selecionado) \
-               and (escola_selecionada == 'Todas as Escolas' or pag['escola'] == escola_selecionada):
-                criancas_filtradas.add((pag['nome'], pag.get('escola', '')))
-    else:
-        # Lógica original para meses anteriores
-        criancas_filtradas = set()
-        for pag in pagamentos:
-            if (mes_selecionado == 'Todos os Meses' or pag['mes'] == mes_selecionado) \
-               and (nome_selecionado == 'Todas as Crianças' or pag['nome'] == nome_selecionado) \
-               and (escola_selecionada == 'Todas as Escolas' or pag['escola'] == escola_selecionada):
-                criancas_filtradas.add((pag['nome'], pag.get('escola', '')))
-
-    if not criancas_filtradas:
-        filtro_msg = f"Nenhum pagamento para {mes_selecionado} - {nome_selecionado} - {escola_selecionada}."
-        tree.insert("", "end", values=(filtro_msg, "", "", "", "", ""))
+    try:
+        with medir('importar') as medicao:
+            resultado = importar_csv(pagamentos, file_path, repositorio_do_ano=armazenamento.carregar)
+            medicao.registros = resultado.importados + resultado.rejeitados
+    except (OSError, UnicodeDecodeError) as e:
+        messagebox.showerror("Erro", f"Erro ao ler {file_path}: {e}")
+        return
+    if resultado.importados:
+        salvar_dados()
+        popular_combobox_anos()
+        popular_combobox()
+        popular_combobox_criancas()
+        atualizar_lista()
+    messagebox.showinfo("Importação", f"Importação concluída:\n{resultado}")
+
+def filtrar_e_listar(atraso_ms=0):
+    """Filtra e lista pagamentos por mês, criança e escola selecionados, incluindo atrasados e anteriores.
+
+    Um filtro já consultado com os mesmos dados no mesmo dia é mostrado na hora,
+    do cache. Senão, o cálculo roda em segundo plano sobre um instantâneo dos
+    dados e a tabela é preenchida quando o resultado chega.
+    """
+    anterior = nucleo.repositorio_anterior(armazenamento, pagamentos)
+    resultado = cache_consultas.obter(chave_consulta(combo_meses.get(), crianca_filtrada(), combo_escolas.get(), datetime.now()),
+                                      nucleo.versao_dados(pagamentos, anterior))
+    if resultado is not None:
+        executor_consultas.descartar()
+        exibir_linhas(resultado)
         return
 
-    # Para cada criança, verificar status
-    total = 0
-    hoje = datetime.now()
-    for nome, escola in sorted(criancas_filtradas, key=lambda x: (x[1], x[0])):  # Ordenar por escola, depois por nome
-        # Verificar se há pagamento no mês selecionado
-        pag_mes = None
-        for pag in pagamentos:
-            if pag['nome'] == nome and pag['mes'] == mes_selecionado and pag.get('escola', '') == escola:
-                pag_mes = pag
-                break
-
-        if pag_mes:
-            # Pago
-            data_exib = obter_data_exibicao(pag_mes)
-            tree.insert("", "end", values=(nome, data_exib, mes_selecionado, escola, "Pago", f"R$ {pag_mes['valor']:.2f}"), tags=('pago',))
-            total += pag_mes['valor']
-        else:
-            # Para meses a partir de Outubro, verificar atraso baseado na data do último pagamento
-            if mes_order >= 10:
-                # Encontrar último pagamento da criança
-                ultimo_pag = None
-                for pag in pagamentos:
-                    if pag['nome'] == nome and pag.get('escola', '') == escola and pag.get('data'):
-                        try:
-                            data_pag = datetime.strptime(pag['data'], '%Y-%m-%d')
-                            if ultimo_pag is None or data_pag > ultimo_pag:
-                                ultimo_pag = data_pag
-                        except:
-                            pass
-                if ultimo_pag:
-                    # Verificar se passaram 25 dias desde o último pagamento
-                    if hoje - ultimo_pag > timedelta(days=25):
-                        tree.insert("", "end", values=(nome, "--", mes_selecionado, escola, "Pagamento Atrasado", "--"), tags=('atrasado',))
-                    else:
-                        tree.insert("", "end", values=(nome, "--", mes_selecionado, escola, "não pago", "--"), tags=('nao_pago',))
-                else:
-                    # Nunca pagou, considerar atrasado se mês atual
-                    tree.insert("", "end", values=(nome, "--", mes_selecionado, escola, "Pagamento Atrasado", "--"), tags=('atrasado',))
-            else:
-                # Lógica original para meses anteriores
-                # Verificar se tem pagamento em mês anterior (para Outubro, Setembro)
-                pag_anterior = None
-                if mes_selecionado == 'Outubro':
-                    for pag in pagamentos:
-                        if pag['nome'] == nome and pag['mes'] == 'Setembro' and pag.get('escola', '') == escola:
-                            pag_anterior = pag
-                            break
-                if pag_anterior:
-                    # Não pago, mas pagou anterior
-                    tree.insert("", "end", values=(nome, "--", mes_selecionado, escola, "não pago", "--"), tags=('nao_pago',))
-                else:
-                    # Verificar se atrasado
-                    usual_day = get_usual_payment_day(nome)
-                    due_day = usual_day + 5
-                    if CURRENT_DAY > due_day:
-                        # Atrasado
-                        tree.insert("", "end", values=(nome, "--", mes_selecionado, escola, "atrasado", "--"), tags=('atrasado',))
-
-    # Adiciona linha de total (apenas dos pagos)
-    total_label = f"Total para {mes_selecionado} - {nome_selecionado} - {escola_selecionada}:"
-    tree.insert("", "end", values=("", "", "", "", total_label, f"R$ {total:.2f}"))
-
-def atualizar_lista():
+    def preparar():
+        anterior = nucleo.repositorio_anterior(armazenamento, pagamentos)
+        # No SQLite o instantâneo só vê o que já foi gravado: a tabela antecipa a gravação pendente
+        if any(repositorio.instantaneo().versao != repositorio.versao
+               for repositorio in (pagamentos, anterior) if repositorio is not None):
+            gravacao.gravar_agora()
+        instantaneo = pagamentos.instantaneo()
+        instantaneo_anterior = anterior.instantaneo() if anterior is not None else None
+        # A versão é lida aqui, junto com os instantâneos, e não na thread de consultas,
+        # onde o cadastro (compartilhado) já pode ter mudado
+        return (instantaneo, combo_meses.get(), crianca_filtrada(), combo_escolas.get(), datetime.now(),
+                instantaneo_anterior, nucleo.versao_dados(instantaneo, instantaneo_anterior))
+    executor_consultas.agendar(preparar, calcular_linhas_medido, exibir_linhas, atraso_ms,
+                               antecipar_meses_vizinhos if ANTECIPAR_MESES_VIZINHOS else None)
+
+def chave_consulta(mes, nome, escola, hoje):
+    """Chave do resultado no cache de consultas: os filtros e o dia de referência."""
+    return mes, nome, escola, hoje.toordinal()
+
+def consultar_linhas(repositorio, mes, nome, escola, hoje, anterior, versao, cancelado=None):
+    """Linhas da tabela e contagens da barra de status, guardadas no cache com a versão dos instantâneos."""
+    resultado = (calcular_linhas(repositorio, mes, nome, escola, hoje, anterior, cancelado=cancelado),
+                 nucleo.resumo_filtro(repositorio, mes, nome, escola, hoje, anterior))
+    if cancelado is None or not cancelado():
+        cache_consultas.guardar(chave_consulta(mes, nome, escola, hoje), versao, resultado)
+    return resultado
+
+def calcular_linhas_medido(*args, cancelado=None):
+    """consultar_linhas com medição (roda na thread de consultas)."""
+    with medir('filtrar', len(args[0])) as medicao:
+        resultado = consultar_linhas(*args, cancelado=cancelado)
+        medicao.registros = len(resultado[0])
+    return resultado
+
+def antecipar_meses_vizinhos(args, cancelado):
+    """Deixa no cache os meses antes e depois do consultado, com os mesmos filtros (roda na thread de consultas)."""
+    repositorio, mes, nome, escola, hoje, anterior, versao = args
+    for vizinho in nucleo.meses_vizinhos(mes):
+        if cancelado():
+            return
+        if not cache_consultas.contem(chave_consulta(vizinho, nome, escola, hoje), versao):
+            with medir('antecipar', len(repositorio)):
+                consultar_linhas(repositorio, vizinho, nome, escola, hoje, anterior, versao, cancelado=cancelado)
+
+def exibir_linhas(resultado):
+    """Preenche a tabela principal com as linhas calculadas e mostra as contagens do filtro."""
+    linhas, (pagas, nao_pagas, atrasadas, centavos) = resultado
+    with medir('tabela', len(linhas)):
+        tabela.exibir(linhas)
+    rotulo_contagens.config(text=f"Pagas: {pagas}   Não pagas: {nao_pagas}   Atrasadas: {atrasadas}   "
+                                 f"Total: R$ {centavos / 100:.2f}")
+
+def atualizar_lista(atraso_ms=0):
     """Atualiza a lista baseada nas seleções de mês e criança."""
-    filtrar_e_listar()
+    filtrar_e_listar(atraso_ms)
+
+def on_selecao_ano(event=None):
+    """Evento chamado ao selecionar um ano no Combobox."""
+    selecionar_ano(int(combo_anos.get()))
 
 def on_selecao_mes(event=None):
     """Evento chamado ao selecionar um mês no Combobox."""
-    atualizar_lista()
+    atualizar_lista(ATRASO_PADRAO_MS)
 
 def on_selecao_crianca(event=None):
     """Evento chamado ao selecionar uma criança no Combobox."""
-    atualizar_lista()
+    atualizar_lista(ATRASO_PADRAO_MS)
+
+def on_enter_crianca(event=None):
+    """Enter no combo de crianças: escolhe o nome digitado (ou todas, se nenhum) e filtra."""
+    combo_criancas.set(nome_digitado(combo_criancas) or 'Todas as Crianças')
+    combo_criancas['values'] = opcoes_criancas()
+    atualizar_lista(ATRASO_PADRAO_MS)
 
 def on_selecao_escola(event=None):
     """Evento chamado ao selecionar uma escola no Combobox."""
-    atualizar_lista()
+    atualizar_lista(ATRASO_PADRAO_MS)
 
 def ver_mes_crianca():
     """Abre a janela mensal para uma criança selecionada."""
@@ -347,16 +401,22 @@ def selecionar_crianca():
     dialog.geometry("300x150")
     dialog.resizable(False, False)
     
-    tk.Label(dialog, text="Selecione a criança:", font=("Arial", 10)).pack(pady=10)
-    combo = ttk.Combobox(dialog, values=nomes, state="readonly", width=30, font=("Arial", 10))
+    tk.Label(dialog, text="Selecione ou digite parte do nome:", font=("Arial", 10)).pack(pady=10)
+    combo = ttk.Combobox(dialog, values=nomes, width=30, font=("Arial", 10))
     combo.pack(pady=5)
+    ligar_busca_nomes(combo, lambda: nomes)
     if nomes:
         combo.set(nomes[0])
+    combo.focus_set()
+    combo.select_range(0, tk.END)
     
     selected = None
-    def confirmar():
+    def confirmar(event=None):
         nonlocal selected
-        selected = combo.get()
+        selected = nome_digitado(combo)
+        if selected is None:
+            messagebox.showwarning("Aviso", "Nenhuma criança encontrada com esse nome.", parent=dialog)
+            return
         dialog.destroy()
     def cancelar():
         nonlocal selected
@@ -367,6 +427,7 @@ def selecionar_crianca():
     frame_botoes.pack(pady=10)
     tk.Button(frame_botoes, text="Confirmar", command=confirmar, bg="lightgreen").pack(side=tk.LEFT, padx=5)
     tk.Button(frame_botoes, text="Cancelar", command=cancelar, bg="red", fg="white").pack(side=tk.LEFT, padx=5)
+    combo.bind('<Return>', confirmar)
     
     dialog.wait_window()
     return selected
@@ -374,8 +435,9 @@ def selecionar_crianca():
 def abrir_janela_crianca(nome):
     """Abre a janela com visão mensal da criança."""
     meses = list(MESES_ORDENADOS.keys())
+    repositorio = pagamentos  # ano selecionado ao abrir a janela
     window = tk.Toplevel(root)
-    window.title(f"Pagamentos Mensais - {nome}")
+    window.title(f"Pagamentos Mensais - {nome} - {repositorio.ano}")
     window.geometry("800x600")
     window.resizable(True, True)
 
@@ -384,7 +446,7 @@ def abrir_janela_crianca(nome):
     frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
     # Cabeçalho
-    tk.Label(frame, text=f"Pagamentos para {nome}", font=("Arial", 14, "bold")).pack(pady=10)
+    tk.Label(frame, text=f"Pagamentos para {nome} em {repositorio.ano}", font=("Arial", 14, "bold")).pack(pady=10)
 
     # Canvas e Scrollbar para rolagem
     canvas = tk.Canvas(frame)
@@ -438,32 +500,24 @@ def abrir_janela_crianca(nome):
         valor_entries[mes] = valor_entry
 
         # Preencher se existe pagamento
-        existing_pag = None
-        for pag in pagamentos:
-            if pag['nome'] == nome and pag['mes'] == mes:
-                existing_pag = pag
-                break
-        if existing_pag:
+        encontrado = repositorio.buscar(nome, MESES_ORDENADOS[mes])
+        if encontrado:
+            existing_pag = encontrado[1]
             var.set(True)
             data_entries[mes].insert(0, obter_data_exibicao(existing_pag))
-            escola_combos[mes].set(existing_pag.get('escola', ''))
-            valor_entries[mes].insert(0, str(existing_pag['valor']))
+            escola_combos[mes].set(existing_pag.escola)
+            valor_entries[mes].insert(0, str(existing_pag.valor))
 
     # Botão Salvar
     def salvar_alteracoes():
+        # Valida todos os meses antes de alterar qualquer pagamento
+        alteracoes = []
         for mes in meses:
             checked = check_vars[mes].get()
             data_str = data_entries[mes].get().strip()
             escola = escola_combos[mes].get()
             valor_str = valor_entries[mes].get().strip()
 
-            # Encontrar pagamento existente
-            existing_pag = None
-            for i, pag in enumerate(pagamentos):
-                if pag['nome'] == nome and pag['mes'] == mes:
-                    existing_pag = (i, pag)
-                    break
-
             if checked:
                 # Validar dados
                 if not data_str:
@@ -473,6 +527,12 @@ def abrir_janela_crianca(nome):
                 if not data_validada:
                     messagebox.showerror("Erro", f"Data inválida para {mes}.")
                     return
+                # A janela mostra um ano só: a data não pode levar o pagamento para outro arquivo
+                ano_pagamento = ano_referencia(data_validada['ordinal'], MESES_ORDENADOS[mes])
+                if ano_pagamento != repositorio.ano:
+                    messagebox.showerror("Erro", f"A data de {mes} ({data_validada['exibicao']}) é de um pagamento "
+                                                 f"de {ano_pagamento}: selecione esse ano para lançá-lo.")
+                    return
                 if not escola:
                     messagebox.showerror("Erro", f"Escola obrigatória para {mes}.")
                     return
@@ -482,35 +542,28 @@ def abrir_janela_crianca(nome):
                     messagebox.showerror("Erro", f"Valor inválido para {mes}.")
                     return
 
-                if existing_pag:
-                    # Atualizar
-                    i, pag = existing_pag
-                    pagamentos[i] = {
-                        'nome': nome,
-                        'mes': mes,
-                        'escola': escola,
-                        'data': data_validada['interna'],
-                        'data_exibicao': data_validada['exibicao'],
-                        'valor': valor
-                    }
-                else:
-                    # Adicionar novo
-                    pagamentos.append({
-                        'nome': nome,
-                        'mes': mes,
-                        'escola': escola,
-                        'data': data_validada['interna'],
-                        'data_exibicao': data_validada['exibicao'],
-                        'valor': valor
-                    })
+                alteracoes.append((MESES_ORDENADOS[mes], (escola, data_validada['ordinal'], para_centavos(valor))))
             else:
                 # Remover se existir
-                if existing_pag:
-                    i, _ = existing_pag
-                    del pagamentos[i]
+                alteracoes.append((MESES_ORDENADOS[mes], None))
 
-        salvar_dados()
-        atualizar_lista()
+        lote = repositorio.lote()
+        for numero_mes, campos in alteracoes:
+            pagamento = None
+            if campos is not None:
+                escola, ordinal, centavos = campos
+                pagamento = Pagamento(lote.crianca(nome, escola), numero_mes, ordinal, centavos)
+            lote.gravar(nome, numero_mes, pagamento)
+
+        # Aplica tudo de uma vez; grava e atualiza a lista uma vez só
+        try:
+            alterados = lote.aplicar()
+        except (KeyError, ValueError) as e:
+            messagebox.showerror("Erro", f"Nenhuma alteração foi salva: {e}")
+            return
+        if alterados:
+            salvar_dados()
+            atualizar_lista()
         messagebox.showinfo("Sucesso", "Alterações salvas com sucesso.")
         window.destroy()
 
@@ -527,24 +580,31 @@ def on_tree_double_click(event):
             mes = values[2]
             escola_atual = values[3]
             # Encontra o pagamento correspondente
-            for pag in pagamentos:
-                if pag['nome'] == nome and pag['mes'] == mes and pag.get('escola', '') == escola_atual:
-                    # Abre diálogo para editar escola
-                    dialog = tk.Toplevel(root)
-                    dialog.title("Editar Escola")
-                    dialog.geometry("300x150")
-                    tk.Label(dialog, text=f"Editar escola para {nome}:").pack(pady=10)
-                    combo = ttk.Combobox(dialog, values=ESCOLAS, state="readonly")
-                    combo.set(escola_atual if escola_atual in ESCOLAS else ESCOLAS[0])
-                    combo.pack(pady=5)
-                    def salvar():
-                        nova_escola = combo.get()
-                        pag['escola'] = nova_escola
-                        salvar_dados()
-                        atualizar_lista()
-                        dialog.destroy()
-                    tk.Button(dialog, text="Salvar", command=salvar).pack(pady=10)
-                    break
+            encontrado = pagamentos.buscar(nome, MESES_ORDENADOS.get(mes), escola_atual)
+            if encontrado:
+                id_pag, pag = encontrado
+                # Abre diálogo para editar escola
+                dialog = tk.Toplevel(root)
+                dialog.title("Editar Escola")
+                dialog.geometry("300x150")
+                tk.Label(dialog, text=f"Editar escola para {nome}:").pack(pady=10)
+                combo = ttk.Combobox(dialog, values=ESCOLAS, state="readonly")
+                combo.set(escola_atual if escola_atual in ESCOLAS else ESCOLAS[0])
+                combo.pack(pady=5)
+                def salvar():
+                    nova_escola = combo.get()
+                    # A criança da nova escola só entra no cadastro junto com a alteração
+                    lote = pagamentos.lote()
+                    lote.atualizar(id_pag, pag.substituir(crianca=lote.crianca(nome, nova_escola)))
+                    try:
+                        lote.aplicar()
+                    except (KeyError, ValueError) as e:
+                        messagebox.showerror("Erro", f"Escola não alterada: {e}")
+                        return
+                    salvar_dados()
+                    atualizar_lista()
+                    dialog.destroy()
+                tk.Button(dialog, text="Salvar", command=salvar).pack(pady=10)
 
 def on_right_click(event):
     """Mostra menu de contexto ao clicar com botão direito no nome da criança."""
@@ -565,9 +625,7 @@ def editar_crianca(nome):
     novo_nome = simpledialog.askstring("Editar Criança", f"Digite o novo nome para {nome}:")
     if novo_nome and novo_nome.strip():
         novo_nome = novo_nome.strip()
-        for pag in pagamentos:
-            if pag['nome'] == nome:
-                pag['nome'] = novo_nome
+        armazenamento.renomear(nome, novo_nome)
         salvar_dados()
         popular_combobox_criancas()
         atualizar_lista()
@@ -582,7 +640,7 @@ def adicionar_pagamento_para(nome):
 def remover_crianca(nome):
     """Remove todas as informações da criança."""
     if messagebox.askyesno("Confirmar", f"Tem certeza que deseja remover todas as informações de {nome}?"):
-        pagamentos[:] = [pag for pag in pagamentos if pag['nome'] != nome]
+        pagamentos.remover_nome(nome)
         salvar_dados()
         popular_combobox_criancas()
         atualizar_lista()
@@ -591,70 +649,83 @@ def remover_crianca(nome):
 def gerar_relatorio_pdf():
     """Gera relatório PDF das crianças que não pagaram até hoje."""
     hoje = datetime.now()
-    data_relatorio = hoje.strftime('%d/%m/%Y')
 
     # Coletar crianças não pagas
-    nao_pagaram = []
-    for nome in obter_nomes_unicos():
-        ultimo_pag = None
-        for pag in pagamentos:
-            if pag['nome'] == nome and pag.get('data'):
-                try:
-                    data_pag = datetime.strptime(pag['data'], '%Y-%m-%d')
-                    if ultimo_pag is None or data_pag > ultimo_pag:
-                        ultimo_pag = data_pag
-                except:
-                    pass
-        if ultimo_pag is None or hoje - ultimo_pag > timedelta(days=25):
-            nao_pagaram.append((nome, ultimo_pag.strftime('%d/%m/%Y') if ultimo_pag else 'Nunca pagou'))
+    nao_pagaram = obter_atrasados(hoje)
 
     if not nao_pagaram:
         messagebox.showinfo("Relatório", "Todas as crianças estão em dia com os pagamentos.")
         return
 
-    # Gerar PDF
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
+    # Gerar PDF e salvar arquivo
+    file_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")])
+    if file_path:
+        try:
+            with medir('pdf', len(nao_pagaram)):
+                gerar_pdf_atrasados(nao_pagaram, hoje, file_path)
+        except RuntimeError as e:
+            messagebox.showerror("Erro", str(e))
+            return
+        messagebox.showinfo("Sucesso", f"Relatório salvo em {file_path}")
 
-    pdf.cell(200, 10, txt=f"Relatório de Pagamentos Atrasados - {data_relatorio}", ln=True, align='C')
-    pdf.ln(10)
+def gerar_relatorios_escolas():
+    """Gera os PDFs do mês (um por escola e o consolidado) numa pasta, em processos separados, com progresso."""
+    diretorio = filedialog.askdirectory(title="Pasta dos relatórios")
+    if not diretorio:
+        return
+    hoje = datetime.now()
+    try:
+        with medir('relatorios', len(pagamentos)):
+            lote = relatorios.preparar_relatorios(pagamentos, hoje, nucleo.repositorio_anterior(armazenamento, pagamentos))
+            geracao = relatorios.GeracaoRelatorios(lote, diretorio)
+    except (RuntimeError, OSError) as e:
+        messagebox.showerror("Erro", str(e))
+        return
 
-    pdf.cell(100, 10, txt="Nome da Criança", border=1)
-    pdf.cell(100, 10, txt="Último Pagamento", border=1, ln=True)
+    window = tk.Toplevel(root)
+    window.title("Relatórios por Escola")
+    window.geometry("400x120")
+    window.resizable(False, False)
+    rotulo = tk.Label(window, text=f"Gerando 0 de {geracao.total} relatórios...", font=("Arial", 10))
+    rotulo.pack(pady=10)
+    barra = ttk.Progressbar(window, maximum=geracao.total, length=350)
+    barra.pack(pady=5)
 
-    for nome, ultimo in nao_pagaram:
-        pdf.cell(100, 10, txt=nome, border=1)
-        pdf.cell(100, 10, txt=ultimo, border=1, ln=True)
+    def cancelar():
+        geracao.cancelar()
+        window.destroy()
+    window.protocol("WM_DELETE_WINDOW", cancelar)
 
-    # Salvar arquivo
-    file_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")])
-    if file_path:
-        pdf.output(file_path)
-        messagebox.showinfo("Sucesso", f"Relatório salvo em {file_path}")
+    def verificar():
+        if not window.winfo_exists():
+            return
+        concluidos = geracao.concluidos()
+        barra['value'] = concluidos
+        rotulo.config(text=f"Gerando {concluidos} de {geracao.total} relatórios...")
+        if not geracao.pronto:
+            window.after(100, verificar)
+            return
+        window.destroy()
+        try:
+            geracao.aguardar()
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao gerar relatórios: {e}")
+            return
+        messagebox.showinfo("Sucesso", f"{geracao.total} relatórios salvos em {diretorio}")
+    window.after(100, verificar)
 
 def abrir_dashboard_atrasados():
     """Abre uma janela com dashboard das crianças com pagamentos atrasados."""
     hoje = datetime.now()
 
     # Coletar crianças atrasadas
-    atrasados = []
-    for nome in obter_nomes_unicos():
-        ultimo_pag = None
-        escola = ""
-        for pag in pagamentos:
-            if pag['nome'] == nome and pag.get('data'):
-                try:
-                    data_pag = datetime.strptime(pag['data'], '%Y-%m-%d')
-                    if ultimo_pag is None or data_pag > ultimo_pag:
-                        ultimo_pag = data_pag
-                        escola = pag.get('escola', '')
-                except:
-                    pass
-        if ultimo_pag is None or hoje - ultimo_pag > timedelta(days=25):
+    with medir('dashboard') as medicao:
+        atrasados = []
+        for nome, escola, ultimo_pag in obter_atrasados(hoje):
             dias_atraso = (hoje - ultimo_pag).days if ultimo_pag else "Nunca pagou"
             ultimo_str = ultimo_pag.strftime('%d/%m/%Y') if ultimo_pag else 'Nunca pagou'
             atrasados.append((nome, escola, ultimo_str, dias_atraso))
+        medicao.registros = len(atrasados)
 
     if not atrasados:
         messagebox.showinfo("Dashboard", "Nenhuma criança com pagamentos atrasados.")
@@ -701,88 +772,306 @@ def abrir_dashboard_atrasados():
     # Botão fechar
     tk.Button(frame, text="Fechar", command=window.destroy, bg="red", fg="white", font=("Arial", 10)).pack(pady=10)
 
+def abrir_resumo_escolas():
+    """Abre uma janela com o total de cada escola por mês, taxa de pagamento, prazo médio e atrasados."""
+    if not pagamentos:
+        messagebox.showinfo("Resumo", "Nenhum pagamento cadastrado.")
+        return
+    with medir('resumo', len(pagamentos)):
+        hoje = datetime.now()
+        atrasados_escola = nucleo.atrasados_por_escola(pagamentos, hoje, nucleo.repositorio_anterior(armazenamento, pagamentos))
+        linhas = analise.colunas(pagamentos).resumo_escolas(atrasados_escola)
+
+    window = tk.Toplevel(root)
+    window.title("Resumo por Escola")
+    window.geometry("1200x450")
+    window.resizable(True, True)
+
+    frame = tk.Frame(window)
+    frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    tk.Label(frame, text="Total Pago por Escola e Mês", font=("Arial", 14, "bold")).pack(pady=10)
+
+    meses = [mes[:3] for mes in NOMES_MESES[1:]]
+    columns = ("Escola",) + tuple(meses) + ("Total", "Taxa", "Dias", "Atrasados")
+    tree_resumo = ttk.Treeview(frame, columns=columns, show="headings", height=16)
+    tree_resumo.heading("Escola", text="Escola")
+    tree_resumo.column("Escola", width=170, anchor=tk.W)
+    for mes in meses:
+        tree_resumo.heading(mes, text=mes)
+        tree_resumo.column(mes, width=65, anchor=tk.E)
+    tree_resumo.heading("Total", text="Total")
+    tree_resumo.heading("Taxa", text="Taxa Pgto.")
+    tree_resumo.heading("Dias", text="Dias p/ Pagar")
+    tree_resumo.heading("Atrasados", text="Atrasados")
+    tree_resumo.column("Total", width=90, anchor=tk.E)
+    tree_resumo.column("Taxa", width=75, anchor=tk.CENTER)
+    tree_resumo.column("Dias", width=90, anchor=tk.CENTER)
+    tree_resumo.column("Atrasados", width=75, anchor=tk.CENTER)
+
+    scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree_resumo.yview)
+    tree_resumo.configure(yscroll=scrollbar.set)
+    tree_resumo.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    totais_mes = [0] * 12
+    for escola, por_mes, total, taxa, dias, atrasados in linhas:
+        totais_mes = [a + b for a, b in zip(totais_mes, por_mes)]
+        valores = [escola] + [f"{centavos / 100:.2f}" if centavos else "--" for centavos in por_mes]
+        valores += [f"{total / 100:.2f}", f"{taxa:.0%}", f"{dias:.1f}" if dias is not None else "--", atrasados]
+        tree_resumo.insert("", "end", values=valores, tags=('atrasado',) if atrasados else ())
+    tree_resumo.insert("", "end", values=["Total"] + [f"{centavos / 100:.2f}" for centavos in totais_mes] + [f"{sum(totais_mes) / 100:.2f}"])
+    tree_resumo.tag_configure('atrasado', foreground='red')
+
+    tk.Button(window, text="Fechar", command=window.destroy, bg="red", fg="white", font=("Arial", 10)).pack(pady=10)
+
+def abrir_situacao_mes():
+    """Abre uma janela com pagas, não pagas, atrasadas e o total de cada escola no mês escolhido no filtro."""
+    if not pagamentos:
+        messagebox.showinfo("Situação do Mês", "Nenhum pagamento cadastrado.")
+        return
+    mes = combo_meses.get()
+    with medir('situacao', len(pagamentos)):
+        linhas = nucleo.situacao_por_escola(pagamentos, mes, datetime.now(),
+                                            nucleo.repositorio_anterior(armazenamento, pagamentos))
+
+    window = tk.Toplevel(root)
+    window.title("Situação do Mês")
+    window.geometry("650x450")
+    window.resizable(True, True)
+
+    frame = tk.Frame(window)
+    frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    tk.Label(frame, text=f"Situação por Escola - {mes}", font=("Arial", 14, "bold")).pack(pady=10)
+
+    columns = ("Escola", "Pagas", "Não pagas", "Atrasadas", "Total")
+    tree_situacao = ttk.Treeview(frame, columns=columns, show="headings", height=16)
+    for coluna in columns:
+        tree_situacao.heading(coluna, text=coluna)
+        tree_situacao.column(coluna, width=170 if coluna == "Escola" else 90,
+                             anchor=tk.W if coluna == "Escola" else tk.E)
+    tree_situacao.pack(fill=tk.BOTH, expand=True)
+
+    somas = [0, 0, 0, 0]
+    for escola, *contagens in linhas:
+        somas = [a + b for a, b in zip(somas, contagens)]
+        pagas, nao_pagas, atrasadas, centavos = contagens
+        tree_situacao.insert("", "end", values=(escola, pagas, nao_pagas, atrasadas, f"{centavos / 100:.2f}"),
+                             tags=('atrasado',) if atrasadas else ())
+    tree_situacao.insert("", "end", values=("Total", somas[0], somas[1], somas[2], f"{somas[3] / 100:.2f}"))
+    tree_situacao.tag_configure('atrasado', foreground='red')
+
+    tk.Button(window, text="Fechar", command=window.destroy, bg="red", fg="white", font=("Arial", 10)).pack(pady=10)
+
+def tamanho_arquivo(arquivo):
+    """Tamanho do arquivo em KB, ou '--' se não existir."""
+    return f"{os.path.getsize(arquivo) / 1024:.1f} KB" if arquivo and os.path.exists(arquivo) else "--"
+
+def abrir_diagnostico(event=None):
+    """Abre a janela de diagnóstico (Ctrl+Shift+D): tempos recentes das ações e tamanho dos dados."""
+    window = tk.Toplevel(root)
+    window.title("Diagnóstico")
+    window.geometry("900x400")
+    window.resizable(True, True)
+
+    frame = tk.Frame(window)
+    frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    label_dados = tk.Label(frame, font=("Arial", 10), anchor=tk.W, justify=tk.LEFT)
+    label_dados.pack(fill=tk.X, pady=5)
+
+    columns = ("Ação", "Chamadas", "Última", "p50", "p90", "p99", "Máx", "Registros", "Interrompidas")
+    tree_diag = ttk.Treeview(frame, columns=columns, show="headings", height=12)
+    for coluna in columns:
+        tree_diag.heading(coluna, text=coluna + (" (ms)" if coluna in ("Última", "p50", "p90", "p99", "Máx") else ""))
+        tree_diag.column(coluna, width=120 if coluna == "Ação" else 85, anchor=tk.W if coluna == "Ação" else tk.E)
+    tree_diag.pack(fill=tk.BOTH, expand=True)
+
+    def atualizar():
+        if not window.winfo_exists():
+            return
+        armazenamento_ano = armazenamento.do_repositorio(pagamentos)
+        label_dados.config(text=(
+            f"Ano: {pagamentos.ano}   Pagamentos: {len(pagamentos)}   Crianças: {len(pagamentos.criancas())}   "
+            f"Versão: {pagamentos.versao}   Anos carregados: {sum(armazenamento.carregado(ano) for ano in armazenamento.anos())}   "
+            f"Cache da lista: {len(cache_consultas)} ({cache_consultas.acertos} acertos, {cache_consultas.faltas} faltas)\n"
+            f"Arquivo: {tamanho_arquivo(getattr(armazenamento_ano, 'arquivo', None))}   "
+            f"Journal: {tamanho_arquivo(getattr(armazenamento_ano, 'arquivo_journal', None))}"))
+        linhas = [(acao, (acao, medidas['chamadas'], medidas['ultimo_ms'], medidas['p50_ms'], medidas['p90_ms'],
+                          medidas['p99_ms'], medidas['max_ms'], medidas['registros'] if medidas['registros'] is not None else "--",
+                          medidas['interrompidas']), ())
+                  for acao, medidas in diagnostico.resumo().items()]
+        tree_diag.delete(*tree_diag.get_children())
+        for iid, valores, tags in linhas:
+            tree_diag.insert("", "end", iid=iid, values=valores, tags=tags)
+        window.after(1000, atualizar)
+
+    def exportar():
+        arquivo = diagnostico.exportar({'pagamentos': len(pagamentos), 'versao': pagamentos.versao})
+        messagebox.showinfo("Diagnóstico", f"Medições acrescentadas a {arquivo}", parent=window)
+
+    def verificar_totais():
+        diferencas = pagamentos.verificar_agregados()
+        if diferencas:
+            messagebox.showwarning("Diagnóstico", f"{diferencas} totais estavam divergentes e foram refeitos.", parent=window)
+            atualizar_lista()
+        else:
+            messagebox.showinfo("Diagnóstico", "Os totais conferem com os pagamentos.", parent=window)
+
+    def perfilar():
+        acao = combo_acao.get()
+        if acao:
+            diagnostico.perfilar_proxima(acao)
+            messagebox.showinfo("Diagnóstico", f"A próxima execução de '{acao}' será perfilada em {diagnostico.arquivo_log}.")
+
+    frame_botoes_diag = tk.Frame(frame)
+    frame_botoes_diag.pack(pady=10)
+    tk.Button(frame_botoes_diag, text="Exportar Log", command=exportar, bg="lightgreen").pack(side=tk.LEFT, padx=5)
+    combo_acao = ttk.Combobox(frame_botoes_diag, state="readonly", width=12,
+                              values=["carregar", "salvar", "filtrar", "tabela", "dashboard", "pdf", "resumo", "situacao",
+                                      "importar"])
+    combo_acao.pack(side=tk.LEFT, padx=5)
+    combo_acao.set("filtrar")
+    tk.Button(frame_botoes_diag, text="Perfilar Próxima", command=perfilar, bg="orange").pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_botoes_diag, text="Verificar Totais", command=verificar_totais, bg="lightblue").pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_botoes_diag, text="Fechar", command=window.destroy, bg="red", fg="white").pack(side=tk.LEFT, padx=5)
+
+    atualizar()
+
 def sair_app():
     """Fecha o app e salva os dados."""
-    salvar_dados()
+    executor_consultas.encerrar()
+    if servico is not None:
+        servico.encerrar()
+    salvar_dados(encerrando=True)
     root.quit()
 
-# Cria a janela principal
-root = tk.Tk()
-root.title("Sistema de Pagamentos - Crianças (com Data)")
-root.geometry("700x500")
-root.resizable(True, True)
-
-# Frame superior para filtro e botões
-frame_superior = tk.Frame(root)
-frame_superior.pack(pady=10)
-
-# Label e Combobox para mês
-tk.Label(frame_superior, text="Selecione o Mês:", font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
-combo_meses = ttk.Combobox(frame_superior, state="readonly", width=15, font=("Arial", 10))
-combo_meses.pack(side=tk.LEFT, padx=5)
-combo_meses.bind('<<ComboboxSelected>>', on_selecao_mes)
-
-# Label e Combobox para criança
-tk.Label(frame_superior, text="Selecione a Criança:", font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
-combo_criancas = ttk.Combobox(frame_superior, state="readonly", width=25, font=("Arial", 10))
-combo_criancas.pack(side=tk.LEFT, padx=5)
-combo_criancas.bind('<<ComboboxSelected>>', on_selecao_crianca)
-
-# Label e Combobox para escola
-tk.Label(frame_superior, text="Selecione a Escola:", font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
-combo_escolas = ttk.Combobox(frame_superior, state="readonly", width=20, font=("Arial", 10))
-combo_escolas.pack(side=tk.LEFT, padx=5)
-combo_escolas.bind('<<ComboboxSelected>>', on_selecao_escola)
-
-# Frame para botões
-frame_botoes = tk.Frame(frame_superior)
-frame_botoes.pack(side=tk.LEFT, padx=20)
-
-btn_adicionar = tk.Button(frame_botoes, text="Adicionar Pagamento", command=adicionar_pagamento, bg="lightgreen", font=("Arial", 10))
-btn_adicionar.pack(side=tk.TOP, pady=2)
-
-btn_relatorio = tk.Button(frame_botoes, text="Gerar Relatório PDF", command=gerar_relatorio_pdf, bg="orange", font=("Arial", 10))
-btn_relatorio.pack(side=tk.TOP, pady=2)
-
-btn_dashboard = tk.Button(frame_botoes, text="Dashboard Atrasados", command=abrir_dashboard_atrasados, bg="yellow", font=("Arial", 10))
-btn_dashboard.pack(side=tk.TOP, pady=2)
-
-btn_sair = tk.Button(frame_botoes, text="Sair", command=sair_app, bg="red", fg="white", font=("Arial", 10))
-btn_sair.pack(side=tk.TOP, pady=2)
-
-columns = ("Nome", "Data", "Mês", "Escola", "Status", "Valor")
-tree = ttk.Treeview(root, columns=columns, show="headings", height=20)
-tree.heading("Nome", text="Nome da Criança")
-tree.heading("Data", text="Data do Pagamento")
-tree.heading("Mês", text="Mês")
-tree.heading("Escola", text="Escola")
-tree.heading("Status", text="Status")
-tree.heading("Valor", text="Valor Pago")
-tree.column("Nome", width=200, anchor=tk.W)
-tree.column("Data", width=120, anchor=tk.CENTER)
-tree.column("Mês", width=100, anchor=tk.CENTER)
-tree.column("Escola", width=120, anchor=tk.CENTER)
-tree.column("Status", width=80, anchor=tk.CENTER)
-tree.column("Valor", width=120, anchor=tk.E)
-
-# Configurar tags para cores
-tree.tag_configure('pago', foreground='green')
-tree.tag_configure('atrasado', foreground='red')
-tree.tag_configure('nao_pago', foreground='black')
-
-scrollbar = ttk.Scrollbar(root, orient=tk.VERTICAL, command=tree.yview)
-tree.configure(yscroll=scrollbar.set)
-tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
-scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-tree.bind('<Double-1>', on_tree_double_click)
-
-tree.bind('<Button-3>', on_right_click)
-
-carregar_dados()
-popular_combobox()
-popular_combobox_criancas()
-popular_combobox_escolas()
-atualizar_lista()
-
-root.mainloop()
+def construir_janela():
+    """Cria a janela principal e seus widgets."""
+    global root, combo_anos, combo_meses, combo_criancas, combo_escolas, tree, tabela, executor_consultas
+    global gravacao, rotulo_status, rotulo_contagens
+
+    # Cria a janela principal
+    root = tk.Tk()
+    root.title("Sistema de Pagamentos - Crianças (com Data)")
+    root.geometry("700x500")
+    root.resizable(True, True)
+
+    # Frame superior para filtro e botões
+    frame_superior = tk.Frame(root)
+    frame_superior.pack(pady=10)
+
+    # Label e Combobox para ano
+    tk.Label(frame_superior, text="Ano:", font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+    combo_anos = ttk.Combobox(frame_superior, state="readonly", width=6, font=("Arial", 10))
+    combo_anos.pack(side=tk.LEFT, padx=5)
+    combo_anos.bind('<<ComboboxSelected>>', on_selecao_ano)
+
+    # Label e Combobox para mês
+    tk.Label(frame_superior, text="Selecione o Mês:", font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+    combo_meses = ttk.Combobox(frame_superior, state="readonly", width=15, font=("Arial", 10))
+    combo_meses.pack(side=tk.LEFT, padx=5)
+    combo_meses.bind('<<ComboboxSelected>>', on_selecao_mes)
+
+    # Label e Combobox para criança
+    tk.Label(frame_superior, text="Selecione a Criança:", font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+    # Editável: digitar parte do nome filtra a lista; Enter escolhe
+    combo_criancas = ttk.Combobox(frame_superior, width=25, font=("Arial", 10))
+    combo_criancas.pack(side=tk.LEFT, padx=5)
+    combo_criancas.bind('<<ComboboxSelected>>', on_selecao_crianca)
+    combo_criancas.bind('<Return>', on_enter_crianca)
+    ligar_busca_nomes(combo_criancas, opcoes_criancas)
+
+    # Label e Combobox para escola
+    tk.Label(frame_superior, text="Selecione a Escola:", font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+    combo_escolas = ttk.Combobox(frame_superior, state="readonly", width=20, font=("Arial", 10))
+    combo_escolas.pack(side=tk.LEFT, padx=5)
+    combo_escolas.bind('<<ComboboxSelected>>', on_selecao_escola)
+
+    # Frame para botões
+    frame_botoes = tk.Frame(frame_superior)
+    frame_botoes.pack(side=tk.LEFT, padx=20)
+
+    btn_adicionar = tk.Button(frame_botoes, text="Adicionar Pagamento", command=adicionar_pagamento, bg="lightgreen", font=("Arial", 10))
+    btn_adicionar.pack(side=tk.TOP, pady=2)
+
+    btn_importar = tk.Button(frame_botoes, text="Importar CSV", command=importar_pagamentos_csv, bg="lightblue", font=("Arial", 10))
+    btn_importar.pack(side=tk.TOP, pady=2)
+
+    btn_relatorio = tk.Button(frame_botoes, text="Gerar Relatório PDF", command=gerar_relatorio_pdf, bg="orange", font=("Arial", 10))
+    btn_relatorio.pack(side=tk.TOP, pady=2)
+
+    btn_relatorios = tk.Button(frame_botoes, text="Relatórios por Escola", command=gerar_relatorios_escolas, bg="orange", font=("Arial", 10))
+    btn_relatorios.pack(side=tk.TOP, pady=2)
+
+    btn_dashboard = tk.Button(frame_botoes, text="Dashboard Atrasados", command=abrir_dashboard_atrasados, bg="yellow", font=("Arial", 10))
+    btn_dashboard.pack(side=tk.TOP, pady=2)
+
+    btn_resumo = tk.Button(frame_botoes, text="Resumo por Escola", command=abrir_resumo_escolas, bg="lightyellow", font=("Arial", 10))
+    btn_resumo.pack(side=tk.TOP, pady=2)
+
+    btn_situacao = tk.Button(frame_botoes, text="Situação do Mês", command=abrir_situacao_mes, bg="lightyellow", font=("Arial", 10))
+    btn_situacao.pack(side=tk.TOP, pady=2)
+
+    btn_sair = tk.Button(frame_botoes, text="Sair", command=sair_app, bg="red", fg="white", font=("Arial", 10))
+    btn_sair.pack(side=tk.TOP, pady=2)
+
+    columns = ("Nome", "Data", "Mês", "Escola", "Status", "Valor")
+    tree = ttk.Treeview(root, columns=columns, show="headings", height=20)
+    tree.heading("Nome", text="Nome da Criança")
+    tree.heading("Data", text="Data do Pagamento")
+    tree.heading("Mês", text="Mês")
+    tree.heading("Escola", text="Escola")
+    tree.heading("Status", text="Status")
+    tree.heading("Valor", text="Valor Pago")
+    tree.column("Nome", width=200, anchor=tk.W)
+    tree.column("Data", width=120, anchor=tk.CENTER)
+    tree.column("Mês", width=100, anchor=tk.CENTER)
+    tree.column("Escola", width=120, anchor=tk.CENTER)
+    tree.column("Status", width=80, anchor=tk.CENTER)
+    tree.column("Valor", width=120, anchor=tk.E)
+
+    # Configurar tags para cores
+    tree.tag_configure('pago', foreground='green')
+    tree.tag_configure('atrasado', foreground='red')
+    tree.tag_configure('nao_pago', foreground='black')
+
+    scrollbar = ttk.Scrollbar(root, orient=tk.VERTICAL)
+    tabela = TabelaIncremental(tree, scrollbar)
+    executor_consultas = ExecutorConsultas(root)
+    # A conexão SQLite só pode ser usada na thread que a abriu: nesse modo a gravação é só agrupada
+    gravacao = GravacaoAdiada(root, gravar_dados, ao_terminar_gravacao,
+                              em_segundo_plano=nucleo.MODO_ARMAZENAMENTO != 'sqlite')
+    rotulo_status = tk.Label(root, text="", anchor=tk.W, font=("Arial", 9))
+    rotulo_status.pack(side=tk.BOTTOM, fill=tk.X, padx=10)
+    # Contagens do filtro atual, lidas dos totais mantidos pelo repositório
+    rotulo_contagens = tk.Label(root, text="", anchor=tk.W, font=("Arial", 9))
+    rotulo_contagens.pack(side=tk.BOTTOM, fill=tk.X, padx=10)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    tree.bind('<Double-1>', on_tree_double_click)
+
+    tree.bind('<Button-3>', on_right_click)
+
+    # Janela de diagnóstico, sem botão na tela
+    root.bind('<Control-Shift-D>', abrir_diagnostico)
+
+    # Fechar pela janela também grava antes de sair
+    root.protocol("WM_DELETE_WINDOW", sair_app)
+
+def main():
+    """Abre a janela principal com os dados carregados."""
+    construir_janela()
+    carregar_dados()
+    popular_combobox_anos()
+    popular_combobox()
+    popular_combobox_criancas()
+    popular_combobox_escolas()
+    atualizar_lista()
+    iniciar_servico()
+    root.mainloop()
+
+if __name__ == '__main__':
+    main()
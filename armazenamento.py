@@ -0,0 +1,536 @@
+"""Formas de persistir o repositório de pagamentos em disco."""
+import hashlib
+import json
+import os
+import re
+import struct
+import tempfile
+import threading
+from array import array
+from collections import defaultdict
+from datetime import date
+
+from cadastro import CadastroCriancas
+from modelo import Crianca, Pagamento, ano_referencia, dados_de_itens, itens_de_dados
+from repositorio import RepositorioPagamentos
+
+# Tamanho mínimo do journal (em bytes) antes de compactar em um novo snapshot
+LIMITE_JOURNAL = 256 * 1024
+
+# Grava ao lado de cada snapshot JSON uma cópia binária (<arquivo>.cache), lida na carga no lugar do JSON
+CACHE_BINARIO = True
+
+# Cabeçalho do cache: assinatura, versão, tamanho e mtime (ns) do JSON, quantidade de registros e hash das colunas
+_CACHE_CABECALHO = struct.Struct('<4sHqqq32s')
+_CACHE_ASSINATURA = b'PAGC'
+_CACHE_VERSAO = 1
+
+# Tipos das colunas do cache, na ordem: id, id da criança, mês, data (ordinal), centavos
+_CACHE_COLUNAS = ('q', 'i', 'b', 'i', 'q')
+
+# Serializa as gravações do cadastro de crianças (ver salvar_cadastro)
+_trava_cadastro = threading.Lock()
+
+
+def gravar_atomico(arquivo, conteudo):
+    """Grava o texto (ou bytes) em um arquivo temporário e o troca pelo destino de forma atômica.
+
+    O temporário tem nome único, então duas gravações do mesmo arquivo ao mesmo
+    tempo não escrevem uma no temporário da outra.
+    """
+    binario = isinstance(conteudo, bytes)
+    fd, temporario = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(arquivo)),
+                                      prefix=os.path.basename(arquivo) + '.', suffix='.tmp')
+    try:
+        with open(fd, 'wb' if binario else 'w', encoding=None if binario else 'utf-8') as saida:
+            saida.write(conteudo)
+            saida.flush()
+            # mkstemp cria o arquivo só para o dono; mantém as permissões do destino
+            os.chmod(temporario, os.stat(arquivo).st_mode & 0o777 if os.path.exists(arquivo) else 0o644)
+            os.fsync(saida.fileno())
+        os.replace(temporario, arquivo)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    _sincronizar_diretorio(arquivo)
+
+
+def _sincronizar_diretorio(arquivo):
+    """Garante que a troca de nomes no diretório chegou ao disco (quando suportado)."""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(arquivo)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _ler_snapshot(arquivo):
+    """Lê o snapshot do arquivo JSON (dicionário do esquema 2 ou lista de registros do esquema 1).
+
+    Um arquivo corrompido é preservado com a extensão .corrompido em vez de ser
+    sobrescrito no próximo salvamento.
+    """
+    if not os.path.exists(arquivo):
+        print("Nenhum arquivo de dados encontrado. Iniciando vazio.")
+        return []
+    try:
+        with open(arquivo, 'r', encoding='utf-8') as entrada:
+            return json.load(entrada)
+    except json.JSONDecodeError:
+        os.replace(arquivo, arquivo + '.corrompido')
+        print(f"Arquivo de dados corrompido (copiado para {arquivo}.corrompido). Iniciando vazio.")
+        return []
+
+
+def _montar_repositorio(dados, cadastro, arquivo=''):
+    """Cria o repositório, preservando os ids gravados quando existirem."""
+    repositorio = RepositorioPagamentos(cadastro=cadastro)
+    repositorio.incluir_itens(itens_de_dados(dados, cadastro, arquivo))
+    return repositorio
+
+
+def _gravar_snapshot_json(arquivo, itens):
+    """Grava os (id, pagamento) no esquema 2, sem espaços."""
+    gravar_atomico(arquivo, json.dumps(dados_de_itens(itens), separators=(',', ':')))
+
+
+def arquivo_cache(arquivo):
+    return arquivo + '.cache'
+
+
+def _gravar_cache(arquivo, itens):
+    """Grava o cache binário do snapshot JSON arquivo, que acabou de ser gravado com os (id, pagamento) itens."""
+    colunas = [array(tipo) for tipo in _CACHE_COLUNAS]
+    ids, criancas, meses, datas, centavos = colunas
+    for id_pag, pag in itens:
+        ids.append(id_pag)
+        criancas.append(pag.crianca.id)
+        meses.append(pag.mes)
+        datas.append(pag.data)
+        centavos.append(pag.centavos)
+    dados = b''.join(coluna.tobytes() for coluna in colunas)
+    estado = os.stat(arquivo)
+    cabecalho = _CACHE_CABECALHO.pack(_CACHE_ASSINATURA, _CACHE_VERSAO, estado.st_size, estado.st_mtime_ns,
+                                      len(ids), hashlib.blake2b(dados, digest_size=32).digest())
+    gravar_atomico(arquivo_cache(arquivo), cabecalho + dados)
+
+
+def _ler_cache(arquivo, cadastro):
+    """Monta o repositório a partir do cache binário do arquivo JSON.
+
+    Retorna None se não há cache ou se ele não corresponde ao JSON (tamanho e
+    data de modificação gravados no cabeçalho) ou às colunas (hash).
+    """
+    try:
+        estado = os.stat(arquivo)
+        with open(arquivo_cache(arquivo), 'rb') as entrada:
+            conteudo = entrada.read()
+    except OSError:
+        return None
+    if len(conteudo) < _CACHE_CABECALHO.size:
+        return None
+    assinatura, versao, tamanho, modificacao, quantidade, resumo = _CACHE_CABECALHO.unpack_from(conteudo)
+    if (assinatura, versao, tamanho, modificacao) != (_CACHE_ASSINATURA, _CACHE_VERSAO, estado.st_size, estado.st_mtime_ns):
+        return None
+    dados = memoryview(conteudo)[_CACHE_CABECALHO.size:]
+    colunas = [array(tipo) for tipo in _CACHE_COLUNAS]
+    if len(dados) != quantidade * sum(coluna.itemsize for coluna in colunas) or \
+            hashlib.blake2b(dados, digest_size=32).digest() != resumo:
+        return None
+    inicio = 0
+    for coluna in colunas:
+        fim = inicio + quantidade * coluna.itemsize
+        coluna.frombytes(dados[inicio:fim])
+        inicio = fim
+    ids, criancas, meses, datas, centavos = colunas
+    try:
+        do_id = {id_crianca: cadastro.obter(id_crianca) for id_crianca in set(criancas)}
+    except KeyError:
+        return None     # cadastro não tem a criança: o JSON decide
+    repositorio = RepositorioPagamentos(cadastro=cadastro)
+    repositorio.incluir_itens(zip(ids, map(Pagamento, map(do_id.__getitem__, criancas), meses, datas, centavos)))
+    return repositorio
+
+
+def _carregar_snapshot(arquivo, cadastro):
+    """Retorna (repositório, legado) do snapshot JSON, lido pelo cache binário quando ele está em dia.
+
+    legado indica um JSON do esquema 1, que precisa ser regravado no esquema atual.
+    """
+    if CACHE_BINARIO:
+        repositorio = _ler_cache(arquivo, cadastro)
+        if repositorio is not None:
+            return repositorio, False
+    dados = _ler_snapshot(arquivo)
+    legado = _legado(dados)
+    repositorio = _montar_repositorio(dados, cadastro, arquivo)
+    if CACHE_BINARIO and dados and not legado:
+        _gravar_cache(arquivo, repositorio.itens())
+    return repositorio, legado
+
+
+def _legado(dados):
+    """Indica se o snapshot é do esquema 1 (lista de dicionários) e tem registros."""
+    return isinstance(dados, list) and bool(dados)
+
+
+def carregar_cadastro(arquivo):
+    """Lê o cadastro de crianças do arquivo, ou retorna um vazio se ele não existe."""
+    if not os.path.exists(arquivo):
+        return CadastroCriancas()
+    with open(arquivo, 'r', encoding='utf-8') as entrada:
+        return CadastroCriancas.de_dados(json.load(entrada), arquivo)
+
+
+def salvar_cadastro(cadastro, arquivo):
+    """Grava o cadastro de crianças, se houve alteração desde a última gravação.
+
+    Chamado pelo Tk (ao abrir um ano) e pela thread de gravação: uma gravação
+    por vez, para que uma cópia mais antiga não substitua uma mais nova no
+    arquivo e alterado só fique desmarcado depois da gravação que o cobriu.
+    """
+    with _trava_cadastro:
+        if cadastro.alterado:
+            # Desmarca antes de copiar: uma alteração feita durante a gravação fica para a próxima
+            cadastro.alterado = False
+            try:
+                gravar_atomico(arquivo, json.dumps(cadastro.para_dados(), ensure_ascii=False, separators=(',', ':')))
+            except Exception:
+                cadastro.alterado = True
+                raise
+
+
+class ArmazenamentoJSON:
+    """Grava a lista inteira de pagamentos no arquivo JSON a cada salvamento."""
+
+    def __init__(self, arquivo, cadastro):
+        self.arquivo = arquivo
+        self.cadastro = cadastro
+
+    def carregar(self):
+        """Lê o arquivo (ou o cache binário dele) e retorna o repositório, convertendo o esquema 1."""
+        repositorio, legado = _carregar_snapshot(self.arquivo, self.cadastro)
+        if legado:
+            self.salvar(repositorio)
+        return repositorio
+
+    def salvar(self, repositorio):
+        """Reescreve o arquivo com todos os pagamentos."""
+        _gravar_snapshot_json(self.arquivo, repositorio.itens())
+
+    def fechar(self, repositorio):
+        """Salva os dados antes de encerrar, junto com o cache binário."""
+        itens = repositorio.itens()
+        _gravar_snapshot_json(self.arquivo, itens)
+        if CACHE_BINARIO:
+            _gravar_cache(self.arquivo, itens)
+
+
+class ArmazenamentoJournal:
+    """Acrescenta cada alteração a um journal e compacta em snapshot em segundo plano.
+
+    O snapshot é o próprio arquivo JSON (lista de registros com 'id'); o journal
+    fica em <arquivo>.journal, uma alteração por linha. Na compactação o journal
+    atual vira <arquivo>.journal.old até o novo snapshot ser trocado. Como cada
+    linha grava o registro inteiro, reaplicar linhas já contidas no snapshot é
+    inofensivo. A linha leva também a criança, para recuperar uma que ainda
+    não estava no cadastro gravado.
+
+    salvar() pode rodar em outra thread enquanto as alterações chegam; a
+    trava protege o arquivo do journal.
+    """
+
+    def __init__(self, arquivo, cadastro, limite_journal=LIMITE_JOURNAL):
+        self.arquivo = arquivo
+        self.cadastro = cadastro
+        self.arquivo_journal = arquivo + '.journal'
+        self.arquivo_journal_antigo = self.arquivo_journal + '.old'
+        self.limite_journal = limite_journal
+        self._journal = None
+        self._trava = threading.Lock()
+        self._compactacao = None
+        self._erro_compactacao = None
+
+    def carregar(self):
+        """Lê o snapshot, reaplica o journal e passa a registrar as alterações."""
+        repositorio, legado = _carregar_snapshot(self.arquivo, self.cadastro)
+        pendente = 0
+        for arquivo_journal in (self.arquivo_journal_antigo, self.arquivo_journal):
+            if os.path.exists(arquivo_journal):
+                pendente += self._reaplicar(repositorio, arquivo_journal)
+        self._journal = open(self.arquivo_journal, 'a', encoding='utf-8')
+        repositorio.observar(self._registrar)
+        if legado or pendente:
+            # Um snapshot do esquema 1 (sem ids) precisa ser regravado antes de o journal referenciá-los
+            self.compactar(repositorio, em_segundo_plano=False)
+        return repositorio
+
+    def _reaplicar(self, repositorio, arquivo_journal):
+        """Aplica as linhas do journal ao repositório e retorna quantas foram lidas.
+
+        Uma última linha incompleta (gravação interrompida) é ignorada.
+        """
+        aplicadas = 0
+        with open(arquivo_journal, 'r', encoding='utf-8') as entrada:
+            for linha in entrada:
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    print(f"Linha incompleta ignorada em {arquivo_journal}.")
+                    break
+                if registro['op'] == 'remover':
+                    if registro['id'] in repositorio:
+                        repositorio.remover(registro['id'])
+                else:
+                    crianca = registro.get('crianca')
+                    if crianca is not None and crianca['id'] not in self.cadastro:
+                        self.cadastro.restaurar(Crianca.de_dict(crianca))
+                    pag = registro['pag']
+                    if isinstance(pag, list):
+                        pag = Pagamento.de_lista(pag, self.cadastro)
+                    else:
+                        pag = Pagamento.de_dict(pag, self.cadastro)     # linha do esquema 1
+                    repositorio.definir(registro['id'], pag)
+                aplicadas += 1
+        return aplicadas
+
+    def _registrar(self, op, id_pag, pag):
+        """Acrescenta a alteração ao journal."""
+        registro = {'op': op, 'id': id_pag}
+        if op != 'remover':
+            registro['pag'] = pag.para_lista()
+            registro['crianca'] = pag.crianca.para_dict()
+        linha = json.dumps(registro, ensure_ascii=False) + '\n'
+        with self._trava:
+            self._journal.write(linha)
+
+    def salvar(self, repositorio):
+        """Garante o journal em disco e inicia a compactação se ele cresceu demais."""
+        with self._trava:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            tamanho_journal = self._journal.tell()
+        if self._erro_compactacao:
+            erro, self._erro_compactacao = self._erro_compactacao, None
+            raise erro
+        tamanho_snapshot = os.path.getsize(self.arquivo) if os.path.exists(self.arquivo) else 0
+        if tamanho_journal > max(self.limite_journal, tamanho_snapshot // 2):
+            self.compactar(repositorio)
+
+    def compactar(self, repositorio, em_segundo_plano=True):
+        """Grava um novo snapshot e descarta o journal já incorporado a ele."""
+        if self._compactacao is not None and self._compactacao.is_alive():
+            if not em_segundo_plano:
+                self._compactacao.join()
+            else:
+                return
+        self._rotacionar_journal()
+        itens = repositorio.itens()
+        if em_segundo_plano:
+            self._compactacao = threading.Thread(target=self._gravar_snapshot, args=(itens,), daemon=True)
+            self._compactacao.start()
+        else:
+            self._gravar_snapshot(itens)
+            if self._erro_compactacao:
+                erro, self._erro_compactacao = self._erro_compactacao, None
+                raise erro
+
+    def _rotacionar_journal(self):
+        """Fecha o journal atual, movendo-o para .old, e abre um novo vazio."""
+        with self._trava:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._journal.close()
+            if os.path.exists(self.arquivo_journal_antigo):
+                # Compactação anterior não terminou: junta as linhas no .old existente
+                with open(self.arquivo_journal, 'r', encoding='utf-8') as entrada, \
+                        open(self.arquivo_journal_antigo, 'a', encoding='utf-8') as saida:
+                    saida.write(entrada.read())
+                    saida.flush()
+                    os.fsync(saida.fileno())
+                os.remove(self.arquivo_journal)
+            else:
+                os.replace(self.arquivo_journal, self.arquivo_journal_antigo)
+            self._journal = open(self.arquivo_journal, 'a', encoding='utf-8')
+
+    def _gravar_snapshot(self, itens):
+        """Grava o snapshot de forma atômica e apaga o journal antigo."""
+        try:
+            _gravar_snapshot_json(self.arquivo, itens)
+            if CACHE_BINARIO:
+                _gravar_cache(self.arquivo, itens)
+            os.remove(self.arquivo_journal_antigo)
+        except Exception as e:
+            self._erro_compactacao = e
+
+    def fechar(self, repositorio):
+        """Compacta o journal e fecha o arquivo."""
+        self.compactar(repositorio, em_segundo_plano=False)
+        self._journal.close()
+
+
+def criar_armazenamento(modo, arquivo, cadastro):
+    """Retorna o armazenamento para o modo 'json', 'journal' ou 'sqlite'.
+
+    No modo 'sqlite' o banco fica ao lado do JSON (pagamentos.db) e é criado a
+    partir dele na primeira execução. Os pagamentos referenciam as crianças do
+    cadastro informado.
+    """
+    if modo == 'json':
+        return ArmazenamentoJSON(arquivo, cadastro)
+    if modo == 'journal':
+        return ArmazenamentoJournal(arquivo, cadastro)
+    if modo == 'sqlite':
+        from armazenamento_sqlite import ArmazenamentoSQLite
+        return ArmazenamentoSQLite(os.path.splitext(arquivo)[0] + '.db', cadastro, arquivo_json=arquivo)
+    raise ValueError(f"Modo de armazenamento desconhecido: {modo}")
+
+
+class ArmazenamentoAnual:
+    """Guarda um arquivo por ano letivo (pagamentos-2025.json, ...) e só abre os anos pedidos.
+
+    Cada ano é um armazenamento do modo escolhido com seu próprio repositório;
+    repositorio.ano indica o ano. O cadastro de crianças é comum a todos os
+    anos e fica em <arquivo>.criancas.json (pagamentos.criancas.json). Um
+    arquivo único de versões anteriores é dividido por ano na primeira carga e
+    renomeado para <arquivo>.migrado.
+    """
+
+    def __init__(self, modo, arquivo):
+        self.modo = modo
+        self.arquivo = arquivo
+        self._abertos = {}      # ano -> (armazenamento, repositorio)
+        self._anos_em_disco = None  # anos com arquivo, lidos do diretório no primeiro anos()
+        self._cadastro = None
+        base, extensao = os.path.splitext(arquivo)
+        self.arquivo_cadastro = base + '.criancas' + extensao
+        self._padrao_ano = re.compile(re.escape(os.path.basename(base)) + r'-(\d{4})(?:' + re.escape(extensao) + r'(?:\.journal)?|\.db)$')
+
+    def arquivo_do_ano(self, ano):
+        base, extensao = os.path.splitext(self.arquivo)
+        return f"{base}-{ano}{extensao}"
+
+    def anos(self):
+        """Retorna os anos com dados em disco ou já abertos, sempre incluindo o atual.
+
+        O diretório é lido uma vez; salvar() volta a lê-lo quando pode ter criado o arquivo de um ano novo.
+        """
+        anos_em_disco = self._anos_em_disco
+        if anos_em_disco is None:
+            anos_em_disco = set()
+            diretorio = os.path.dirname(os.path.abspath(self.arquivo))
+            for nome_arquivo in os.listdir(diretorio):
+                encontrado = self._padrao_ano.match(nome_arquivo)
+                if encontrado and os.path.getsize(os.path.join(diretorio, nome_arquivo)):
+                    anos_em_disco.add(int(encontrado.group(1)))
+            self._anos_em_disco = anos_em_disco
+        return sorted({date.today().year} | anos_em_disco | set(self._abertos))
+
+    @property
+    def cadastro(self):
+        """Cadastro de crianças, lido do disco no primeiro uso."""
+        if self._cadastro is None:
+            self._cadastro = carregar_cadastro(self.arquivo_cadastro)
+        return self._cadastro
+
+    def carregado(self, ano):
+        return ano in self._abertos
+
+    def carregar(self, ano=None):
+        """Retorna o repositório do ano (padrão: o atual), abrindo o arquivo na primeira vez."""
+        ano = ano or date.today().year
+        if ano not in self._abertos:
+            self._dividir_arquivo_unico()
+            armazenamento = criar_armazenamento(self.modo, self.arquivo_do_ano(ano), self.cadastro)
+            repositorio = armazenamento.carregar()
+            repositorio.ano = ano
+            self._abertos[ano] = (armazenamento, repositorio)
+            # Um arquivo antigo convertido na carga já referencia as crianças novas
+            salvar_cadastro(self.cadastro, self.arquivo_cadastro)
+        return self._abertos[ano][1]
+
+    def do_repositorio(self, repositorio):
+        """Retorna o armazenamento do ano do repositório."""
+        return self._abertos[repositorio.ano][0]
+
+    def renomear(self, nome, novo_nome):
+        """Troca o nome da criança (repositorio.renomear) em todos os anos.
+
+        Se já existe uma criança com o novo nome na mesma escola, os pagamentos
+        dela em todos os anos com dados passam para a outra: os anos ainda
+        fechados são abertos antes, já que a criança antiga fica desativada no
+        cadastro, que é comum a todos.
+        """
+        cadastro = self.cadastro
+        if any(cadastro.buscar(novo_nome, crianca.escola) is not None for crianca in cadastro.do_nome(nome)):
+            for ano in self.anos():
+                self.carregar(ano)
+        for _, repositorio in list(self._abertos.values()):
+            repositorio.renomear(nome, novo_nome)
+
+    def salvar(self, repositorio):
+        """Grava as alterações de todos os anos abertos (uma importação pode tocar vários).
+
+        Pode rodar fora da thread do app, exceto no modo 'sqlite'.
+        """
+        salvar_cadastro(self.cadastro, self.arquivo_cadastro)
+        abertos = list(self._abertos.items())
+        for _, (armazenamento, repositorio_ano) in abertos:
+            armazenamento.salvar(repositorio_ano)
+        anos_em_disco = self._anos_em_disco
+        if anos_em_disco is not None and any(ano not in anos_em_disco for ano, _ in abertos):
+            # A gravação pode ter criado o arquivo de um ano aberto
+            self._anos_em_disco = None
+
+    def fechar(self, repositorio):
+        """Guarda o dia usual das crianças no cadastro, compacta e fecha todos os anos abertos."""
+        if self._abertos:
+            self._guardar_dias_usuais(self._abertos[max(self._abertos)][1])
+        salvar_cadastro(self.cadastro, self.arquivo_cadastro)
+        for armazenamento, repositorio_ano in self._abertos.values():
+            armazenamento.fechar(repositorio_ano)
+        self._abertos.clear()
+
+    def _guardar_dias_usuais(self, repositorio):
+        """Copia para o cadastro o dia usual calculado no ano mais recente aberto."""
+        dias_usuais = repositorio.dias_usuais()
+        for crianca in self.cadastro:
+            dia = dias_usuais.get(crianca.nome)
+            if dia is not None:
+                self.cadastro.definir_dia_usual(crianca, dia)
+
+    def _arquivos_unicos(self):
+        """Arquivos do formato antigo (sem divisão por ano) que ainda têm dados."""
+        candidatos = [self.arquivo, self.arquivo + '.journal', self.arquivo + '.journal.old',
+                      os.path.splitext(self.arquivo)[0] + '.db']
+        return [arquivo for arquivo in candidatos if os.path.exists(arquivo) and os.path.getsize(arquivo)]
+
+    def _dividir_arquivo_unico(self):
+        """Distribui os pagamentos do arquivo antigo pelos arquivos de cada ano."""
+        arquivos = self._arquivos_unicos()
+        if not arquivos:
+            return
+        antigo = criar_armazenamento(self.modo, self.arquivo, self.cadastro)
+        repositorio = antigo.carregar()
+        salvar_cadastro(self.cadastro, self.arquivo_cadastro)
+        total = len(repositorio)
+        por_ano = defaultdict(list)
+        for pag in repositorio:
+            por_ano[ano_referencia(pag.data, pag.mes)].append(pag)
+        for ano, pagamentos_ano in por_ano.items():
+            armazenamento = criar_armazenamento(self.modo, self.arquivo_do_ano(ano), self.cadastro)
+            repositorio_ano = armazenamento.carregar()
+            for pag in pagamentos_ano:
+                repositorio_ano.adicionar(pag)
+            armazenamento.fechar(repositorio_ano)
+        antigo.fechar(repositorio)
+        for arquivo in self._arquivos_unicos():
+            os.replace(arquivo, arquivo + '.migrado')
+        for sobra in (self.arquivo + '.journal', arquivo_cache(self.arquivo)):
+            if os.path.exists(sobra):
+                os.remove(sobra)    # journal vazio e cache deixados pelo fechamento
+        self._anos_em_disco = None
+        print(f"{total} pagamentos divididos por ano: {', '.join(str(ano) for ano in sorted(por_ano))}.")
@@ -0,0 +1,437 @@
+"""Motor SQLite: pagamentos consultados direto do banco, sem carregar tudo na memória."""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from modelo import Crianca, Pagamento, data_ordinal, itens_de_dados, mes_numero, para_centavos
+from repositorio import Lote
+
+# criancas: cópia do cadastro, para as consultas por nome e escola
+# pagamentos.crianca: id da criança; mes: 1-12; data: ordinal do dia (0 = sem data); centavos: valor inteiro
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS criancas (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL,
+    escola TEXT NOT NULL DEFAULT '',
+    dia_usual INTEGER,
+    ativo INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_criancas_nome ON criancas (nome, escola);
+CREATE INDEX IF NOT EXISTS idx_criancas_escola ON criancas (escola);
+CREATE TABLE IF NOT EXISTS pagamentos (
+    id INTEGER PRIMARY KEY,
+    crianca INTEGER NOT NULL REFERENCES criancas (id),
+    mes INTEGER NOT NULL,
+    data INTEGER NOT NULL DEFAULT 0,
+    centavos INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pagamentos_crianca ON pagamentos (crianca, mes);
+CREATE INDEX IF NOT EXISTS idx_pagamentos_mes ON pagamentos (mes);
+CREATE INDEX IF NOT EXISTS idx_pagamentos_data ON pagamentos (data);
+"""
+
+_COLUNAS = "id, crianca, mes, data, centavos"
+
+# Pagamentos com o nome e a escola da criança
+_COM_CRIANCA = "pagamentos p JOIN criancas c ON c.id = p.crianca"
+
+# Dia do mês a partir do ordinal (o ordinal 1 é o dia juliano 1721425.5)
+_DIA_DO_MES = "CAST(strftime('%d', data + 1721424.5) AS INTEGER)"
+
+_INSERIR = "INSERT INTO pagamentos (id, crianca, mes, data, centavos) VALUES (?, ?, ?, ?, ?)"
+
+_GRAVAR_CRIANCA = "INSERT OR REPLACE INTO criancas (id, nome, escola, dia_usual, ativo) VALUES (?, ?, ?, ?, ?)"
+
+
+def _parametros(pag):
+    return (pag.crianca.id, pag.mes, pag.data, pag.centavos)
+
+
+def _parametros_crianca(crianca):
+    return (crianca.id, crianca.nome, crianca.escola, crianca.dia_usual, int(crianca.ativo))
+
+
+def _gravar_criancas(conexao, cadastro):
+    conexao.executemany(_GRAVAR_CRIANCA, (_parametros_crianca(crianca) for crianca in cadastro))
+
+
+def _atualizar_esquema(conexao, cadastro):
+    """Converte bancos de versões anteriores (nome e escola em cada pagamento) para o esquema atual.
+
+    Na primeira versão mês, data e valor ainda eram texto/float.
+    """
+    colunas = [coluna[1] for coluna in conexao.execute("PRAGMA table_info(pagamentos)")]
+    if not colunas or 'crianca' in colunas:
+        return
+    if 'valor' in colunas:
+        antigos = [(id_pag, nome, mes_numero(mes), escola, data_ordinal(data), para_centavos(valor))
+                   for id_pag, nome, mes, escola, data, valor in
+                   conexao.execute("SELECT id, nome, mes, escola, data, valor FROM pagamentos")]
+    else:
+        antigos = conexao.execute("SELECT id, nome, mes, escola, data, centavos FROM pagamentos").fetchall()
+    conexao.execute("DROP TABLE pagamentos")
+    conexao.executescript(ESQUEMA)
+    conexao.executemany(_INSERIR, ((id_pag, cadastro.registrar(nome, escola).id, mes, data, centavos)
+                                   for id_pag, nome, mes, escola, data, centavos in antigos))
+    _gravar_criancas(conexao, cadastro)
+    conexao.commit()
+
+
+class RepositorioSQLite:
+    """Mesma interface de RepositorioPagamentos, respondida por consultas indexadas.
+
+    A tabela criancas acompanha o cadastro: cada criança criada ou alterada é
+    regravada nela, e as consultas por nome ou escola fazem a junção.
+    versao_confirmada é a versão do que já foi confirmado no banco (atualizada
+    por ArmazenamentoSQLite.salvar), a única que os instantâneos enxergam.
+    """
+
+    def __init__(self, conexao, cadastro, arquivo=None, preparar_esquema=True, trava=None):
+        self._conexao = conexao
+        self.cadastro = cadastro
+        self._arquivo = arquivo
+        # Os instantâneos dividem uma conexão de leitura, usada por várias threads: um comando por vez
+        self._trava = trava if trava is not None else threading.Lock()
+        self._trava_leitura = threading.Lock()
+        if preparar_esquema:
+            _atualizar_esquema(conexao, cadastro)
+            self._conexao.executescript(ESQUEMA)
+            # Crianças confirmadas no banco mas que não chegaram ao cadastro gravado
+            for linha in conexao.execute("SELECT id, nome, escola, dia_usual, ativo FROM criancas"):
+                if linha[0] not in cadastro:
+                    cadastro.restaurar(Crianca(linha[0], linha[1], linha[2], linha[3], bool(linha[4])))
+            _gravar_criancas(conexao, cadastro)
+            # Sem confirmar, a conexão seguraria o bloqueio de escrita até a primeira gravação
+            conexao.commit()
+            cadastro.observar(self._gravar_crianca)
+        self._observadores = []
+        self.versao = 0
+        self.versao_confirmada = 0
+        self._instantaneo = None
+        self._leitura = None       # conexão dos instantâneos, aberta no primeiro
+
+    def _gravar_crianca(self, crianca):
+        if crianca.id in self.cadastro:
+            self._conexao.execute(_GRAVAR_CRIANCA, _parametros_crianca(crianca))
+        else:
+            # Tirada do cadastro por um lote desfeito
+            self._conexao.execute("DELETE FROM criancas WHERE id = ?", (crianca.id,))
+
+    def desligar(self):
+        """Para de acompanhar o cadastro e fecha a conexão dos instantâneos (antes de fechar a conexão)."""
+        self.cadastro.esquecer(self._gravar_crianca)
+        if self._leitura is not None:
+            with self._trava_leitura:
+                self._leitura.close()
+            self._leitura = None
+
+    def _consultar(self, sql, parametros=()):
+        with self._trava:
+            return self._conexao.execute(sql, parametros).fetchall()
+
+    def _registro(self, linha):
+        """Converte uma linha da tabela em (id, Pagamento)."""
+        return linha[0], Pagamento(self.cadastro.obter(linha[1]), *linha[2:])
+
+    def __len__(self):
+        return self._consultar("SELECT COUNT(*) FROM pagamentos")[0][0]
+
+    def __bool__(self):
+        return bool(self._consultar("SELECT 1 FROM pagamentos LIMIT 1"))
+
+    def __iter__(self):
+        for linha in self._consultar(f"SELECT {_COLUNAS} FROM pagamentos ORDER BY id"):
+            yield self._registro(linha)[1]
+
+    def __contains__(self, id_pag):
+        return bool(self._consultar("SELECT 1 FROM pagamentos WHERE id = ?", (id_pag,)))
+
+    def observar(self, funcao):
+        """Registra funcao(op, id_pag, pag) para ser chamada a cada alteração."""
+        self._observadores.append(funcao)
+
+    def _notificar(self, op, id_pag, pag):
+        self.versao += 1
+        for funcao in self._observadores:
+            funcao(op, id_pag, pag)
+
+    def lote(self):
+        """Retorna um Lote para preparar várias alterações e aplicá-las juntas."""
+        return Lote(self)
+
+    def crianca(self, nome, escola):
+        """Retorna a criança do cadastro, criando-a se for nova. Use ao montar um Pagamento."""
+        return self.cadastro.registrar(nome, escola)
+
+    def instantaneo(self):
+        """Retorna um repositório para leitura em outra thread, sobre uma conexão de leitura própria.
+
+        A conexão de leitura só enxerga o que foi confirmado no banco, então o
+        instantâneo leva versao_confirmada: alterações ainda não gravadas só
+        aparecem depois do próximo salvar. As crianças vêm do instantâneo do
+        cadastro. A conexão é uma só para todos os instantâneos, e todos a usam
+        sob a mesma trava. Sem arquivo (banco em memória), retorna o próprio
+        repositório.
+        """
+        if self._arquivo is None:
+            return self
+        if (self._instantaneo is None or self._instantaneo.versao != self.versao_confirmada
+                or self._instantaneo.cadastro.versao != self.cadastro.versao):
+            if self._leitura is None:
+                self._leitura = sqlite3.connect(self._arquivo, check_same_thread=False)
+            self._instantaneo = RepositorioSQLite(self._leitura, self.cadastro.instantaneo(), preparar_esquema=False,
+                                                 trava=self._trava_leitura)
+            self._instantaneo.versao = self._instantaneo.versao_confirmada = self.versao_confirmada
+            if hasattr(self, 'ano'):
+                self._instantaneo.ano = self.ano
+        return self._instantaneo
+
+    # --- Alterações ---
+
+    def adicionar(self, pag, id_pag=None):
+        """Adiciona um pagamento e retorna o id atribuído (ou o id_pag informado)."""
+        cursor = self._conexao.execute(_INSERIR, (id_pag,) + _parametros(pag))
+        id_pag = cursor.lastrowid
+        self._notificar('adicionar', id_pag, pag)
+        return id_pag
+
+    def atualizar(self, id_pag, pag):
+        """Substitui o pagamento id_pag pelo novo registro."""
+        self._conexao.execute(
+            "UPDATE pagamentos SET crianca = ?, mes = ?, data = ?, centavos = ? WHERE id = ?",
+            _parametros(pag) + (id_pag,))
+        self._notificar('atualizar', id_pag, pag)
+
+    def remover(self, id_pag):
+        """Remove o pagamento id_pag."""
+        pag = self.obter(id_pag)
+        self._conexao.execute("DELETE FROM pagamentos WHERE id = ?", (id_pag,))
+        self._notificar('remover', id_pag, pag)
+
+    def definir(self, id_pag, pag):
+        """Grava o pagamento com o id informado, adicionando ou substituindo."""
+        if id_pag in self:
+            self.atualizar(id_pag, pag)
+        else:
+            self.adicionar(pag, id_pag)
+
+    def renomear(self, nome, novo_nome):
+        """Troca o nome da criança no cadastro; os pagamentos não são regravados.
+
+        Se já existe uma criança com o novo nome na mesma escola, os pagamentos
+        são passados para ela (só os deste repositório: para todos os anos, use
+        ArmazenamentoAnual.renomear).
+        """
+        for crianca in self.cadastro.do_nome(nome):
+            destino = self.cadastro.buscar(novo_nome, crianca.escola)
+            if destino is None:
+                self.cadastro.renomear(crianca, novo_nome)
+                continue
+            for id_pag, pag in self._itens_onde("crianca = ?", (crianca.id,)):
+                self.atualizar(id_pag, pag.substituir(crianca=destino))
+            self.cadastro.desativar(crianca)
+        self.versao += 1
+
+    def remover_nome(self, nome):
+        """Remove todos os pagamentos da criança e a desativa no cadastro."""
+        for crianca in self.cadastro.do_nome(nome):
+            for id_pag, _ in self._itens_onde("crianca = ?", (crianca.id,)):
+                self.remover(id_pag)
+            self.cadastro.desativar(crianca)
+
+    # --- Consultas ---
+
+    def _itens_onde(self, condicao, parametros, limite=-1):
+        sql = f"SELECT {_COLUNAS} FROM pagamentos WHERE {condicao} ORDER BY id LIMIT {int(limite)}"
+        return [self._registro(linha) for linha in self._consultar(sql, parametros)]
+
+    def _ids_criancas(self, nome, escola=None):
+        """Ids das crianças com o nome (na escola, se informada)."""
+        if escola is not None:
+            crianca = self.cadastro.buscar(nome, escola)
+            return [crianca.id] if crianca is not None else []
+        return [crianca.id for crianca in self.cadastro.do_nome(nome)]
+
+    def _itens_das_criancas(self, ids, condicao="1", parametros=(), limite=-1):
+        if not ids:
+            return []
+        marcadores = ", ".join("?" * len(ids))
+        return self._itens_onde(f"crianca IN ({marcadores}) AND {condicao}", tuple(ids) + tuple(parametros), limite)
+
+    def obter(self, id_pag):
+        """Retorna o pagamento pelo id."""
+        itens = self._itens_onde("id = ?", (id_pag,))
+        if not itens:
+            raise KeyError(id_pag)
+        return itens[0][1]
+
+    def todos(self):
+        """Retorna a lista de pagamentos na ordem de inserção."""
+        return list(self)
+
+    def itens(self):
+        """Retorna a lista de (id, pagamento) na ordem de inserção."""
+        return self._itens_onde("1", ())
+
+    def buscar(self, nome, mes, escola=None):
+        """Retorna (id, pagamento) do primeiro pagamento da criança no mês (1-12), ou None."""
+        itens = self._itens_das_criancas(self._ids_criancas(nome, escola), "mes = ?", (mes,), limite=1)
+        return itens[0] if itens else None
+
+    def do_nome(self, nome):
+        """Retorna os pagamentos da criança."""
+        return [pag for _, pag in self._itens_das_criancas(self._ids_criancas(nome))]
+
+    def da_escola_mes(self, escola, mes):
+        """Retorna os pagamentos da escola no mês."""
+        itens = self._itens_onde("crianca IN (SELECT id FROM criancas WHERE escola = ?) AND mes = ?", (escola, mes))
+        return [pag for _, pag in itens]
+
+    def total_pago(self, mes=None, nome=None, escola=None):
+        """Retorna os centavos pagos no mês (None = todos); filtros None não restringem."""
+        condicoes, parametros = ["1"], []
+        if mes is not None:
+            condicoes.append("mes = ?")
+            parametros.append(mes)
+        if nome is not None:
+            ids = self._ids_criancas(nome, escola)
+            if not ids:
+                return 0
+            condicoes.append(f"crianca IN ({', '.join('?' * len(ids))})")
+            parametros.extend(ids)
+        elif escola is not None:
+            condicoes.append("crianca IN (SELECT id FROM criancas WHERE escola = ?)")
+            parametros.append(escola)
+        return self._consultar(f"SELECT COALESCE(SUM(centavos), 0) FROM pagamentos WHERE {' AND '.join(condicoes)}",
+                               parametros)[0][0]
+
+    def criancas_pagantes(self, mes, escola=None):
+        """Retorna quantas crianças (da escola, se informada) têm pagamento no mês."""
+        if escola is None:
+            return self._consultar("SELECT COUNT(DISTINCT crianca) FROM pagamentos WHERE mes = ?", (mes,))[0][0]
+        return self._consultar("SELECT COUNT(DISTINCT crianca) FROM pagamentos "
+                               "WHERE mes = ? AND crianca IN (SELECT id FROM criancas WHERE escola = ?)",
+                               (mes, escola))[0][0]
+
+    def meses_pagos(self):
+        """Retorna o conjunto de (id da criança, mês) com pagamento."""
+        return set(self._consultar("SELECT DISTINCT crianca, mes FROM pagamentos"))
+
+    def verificar_agregados(self, corrigir=True):
+        """As somas saem do banco a cada consulta; não há agregados guardados a conferir."""
+        return 0
+
+    def nomes(self):
+        """Retorna os nomes únicos não vazios, ordenados."""
+        linhas = self._consultar(f"SELECT DISTINCT c.nome FROM {_COM_CRIANCA} ORDER BY c.nome")
+        return [nome for (nome,) in linhas if nome.strip()]
+
+    def meses(self):
+        """Retorna os números dos meses com pagamentos."""
+        return {mes for (mes,) in self._consultar("SELECT DISTINCT mes FROM pagamentos") if mes}
+
+    def criancas(self, mes=None, nome=None, escola=None):
+        """Retorna o conjunto de (nome, escola) com pagamentos que atendem aos filtros."""
+        condicoes, parametros = [], []
+        for coluna, valor in (('p.mes', mes), ('c.nome', nome), ('c.escola', escola)):
+            if valor is not None:
+                condicoes.append(f"{coluna} = ?")
+                parametros.append(valor)
+        onde = " WHERE " + " AND ".join(condicoes) if condicoes else ""
+        return set(self._consultar(f"SELECT DISTINCT c.nome, c.escola FROM {_COM_CRIANCA}{onde}", parametros))
+
+    def ultimo_pagamento(self, nome, escola):
+        """Retorna a data (datetime) do pagamento mais recente da criança na escola, ou None."""
+        crianca = self.cadastro.buscar(nome, escola)
+        if crianca is None:
+            return None
+        linha = self._consultar("SELECT MAX(data) FROM pagamentos WHERE crianca = ? AND data > 0", (crianca.id,))
+        return datetime.fromordinal(linha[0][0]) if linha[0][0] else None
+
+    def ultimos_por_crianca(self):
+        """Retorna {id da criança: ordinal do pagamento mais recente (0 se nenhum datado)} de quem tem pagamentos."""
+        return dict(self._consultar("SELECT crianca, COALESCE(MAX(NULLIF(data, 0)), 0) FROM pagamentos GROUP BY crianca"))
+
+    def dia_usual(self, nome):
+        """Retorna o dia do mês em que a criança mais pagou, ou None se não há datas."""
+        ids = self._ids_criancas(nome)
+        if not ids:
+            return None
+        linha = self._consultar(
+            f"SELECT {_DIA_DO_MES} AS dia FROM pagamentos WHERE crianca IN ({', '.join('?' * len(ids))}) AND data > 0 "
+            "GROUP BY dia ORDER BY COUNT(*) DESC, MIN(id) LIMIT 1", ids)
+        return linha[0][0] if linha else None
+
+    def dias_usuais(self):
+        """Retorna {nome: dia usual} de todas as crianças com pagamentos datados."""
+        resultado = {}
+        contagens = {}
+        for nome, dia, quantidade in self._consultar(
+                f"SELECT c.nome, {_DIA_DO_MES} AS dia, COUNT(*) FROM {_COM_CRIANCA} WHERE data > 0 "
+                "GROUP BY c.nome, dia ORDER BY MIN(p.id)"):
+            if quantidade > contagens.get(nome, 0):
+                contagens[nome] = quantidade
+                resultado[nome] = dia
+        return resultado
+
+
+class ArmazenamentoSQLite:
+    """Mantém os pagamentos em um banco SQLite; salvar é apenas confirmar a transação."""
+
+    def __init__(self, arquivo, cadastro, arquivo_json=None):
+        self.arquivo = arquivo
+        self.cadastro = cadastro
+        self.arquivo_json = arquivo_json
+        self._conexao = None
+
+    def carregar(self):
+        """Abre o banco (migrando o JSON na primeira vez) e retorna o repositório."""
+        if not os.path.exists(self.arquivo) and self.arquivo_json and os.path.exists(self.arquivo_json):
+            total = migrar_json_para_sqlite(self.arquivo_json, self.arquivo, self.cadastro)
+            print(f"{total} pagamentos migrados de {self.arquivo_json} para {self.arquivo}.")
+        self._conexao = sqlite3.connect(self.arquivo)
+        return RepositorioSQLite(self._conexao, self.cadastro, self.arquivo)
+
+    def salvar(self, repositorio):
+        """Confirma as alterações pendentes; é o único lugar em que elas são confirmadas.
+
+        Se havia alguma, a versão do repositório muda: o que foi calculado sobre
+        instantâneos anteriores à confirmação não é reaproveitado. Os instantâneos
+        seguintes passam a ver essa versão.
+        """
+        if self._conexao.in_transaction:
+            self._conexao.commit()
+            repositorio.versao += 1
+        repositorio.versao_confirmada = repositorio.versao
+
+    def fechar(self, repositorio):
+        """Confirma as alterações e fecha o banco."""
+        repositorio.desligar()
+        self._conexao.commit()
+        self._conexao.close()
+
+
+def migrar_json_para_sqlite(arquivo_json, arquivo_db, cadastro):
+    """Copia os pagamentos de um arquivo JSON para um banco SQLite novo e retorna quantos foram migrados.
+
+    Aceita os esquemas 2 e 1; registros antigos, com nome e escola, cadastram as crianças em cadastro.
+    """
+    with open(arquivo_json, 'r', encoding='utf-8') as entrada:
+        dados = json.load(entrada)
+    itens = list(itens_de_dados(dados, cadastro, arquivo_json))
+    temporario = arquivo_db + '.tmp'
+    if os.path.exists(temporario):
+        os.remove(temporario)
+    conexao = sqlite3.connect(temporario)
+    try:
+        conexao.executescript(ESQUEMA)
+        conexao.executemany(_INSERIR, ((id_pag,) + _parametros(pag) for id_pag, pag in itens))
+        _gravar_criancas(conexao, cadastro)
+        conexao.commit()
+    finally:
+        conexao.close()
+    os.replace(temporario, arquivo_db)
+    return len(itens)
+
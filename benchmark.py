@@ -0,0 +1,220 @@
+"""Medição de desempenho dos caminhos mais usados, com dados sintéticos reproduzíveis.
+
+Uso:
+    python benchmark.py                          # 10 mil crianças, 2 anos, resultado em JSON na tela
+    python benchmark.py --criancas 2000 --saida atual.json
+    python benchmark.py --comparar anterior.json # mostra também a razão em relação a outra medição
+
+Roda sem interface gráfica: mede as mesmas funções do núcleo que o app usa
+(carregar_dados, salvar_dados, filtrar_e_listar, a busca de nomes,
+o dia usual de pagamento, o dashboard de atrasados e o relatório PDF) num
+diretório temporário. A carga é a do ano atual, como na abertura do app.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+import nucleo
+from busca import IndiceNomes
+from modelo import ESCOLAS, MESES_ORDENADOS
+
+NOMES = ["Ana", "Bruno", "Carla", "Davi", "Eduarda", "Felipe", "Gabriela", "Heitor", "Isabela", "João",
+         "Larissa", "Miguel", "Natália", "Otávio", "Pedro", "Rafaela", "Samuel", "Tatiane", "Vitor", "Yasmin"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa", "Ferreira", "Almeida", "Ribeiro"]
+
+
+def gerar_dados(criancas=10000, anos=2, semente=42, ano_final=None, falta=0.08, duplicado=0.01, sem_data=0.01):
+    """Gera registros no formato do pagamentos.json.
+
+    Cada criança tem uma escola e um dia usual de pagamento; em cada mês de
+    cada ano ela paga com probabilidade 1 - falta, perto do dia usual. Uma
+    fração dos pagamentos sai repetida (duplicado) e outra sem data (sem_data).
+    """
+    aleatorio = random.Random(semente)
+    ano_final = ano_final or date.today().year
+    registros = []
+    for i in range(criancas):
+        nome = f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {i:05d}"
+        escola = aleatorio.choice(ESCOLAS)
+        dia_usual = aleatorio.randint(1, 28)
+        valor = aleatorio.choice([80, 100, 120, 150, 180.5])
+        for ano in range(ano_final - anos + 1, ano_final + 1):
+            for mes_nome, mes in MESES_ORDENADOS.items():
+                if aleatorio.random() < falta:
+                    continue
+                dia = min(28, max(1, dia_usual + aleatorio.randint(-3, 6)))
+                registro = {'nome': nome, 'mes': mes_nome, 'escola': escola, 'valor': valor}
+                if aleatorio.random() < sem_data:
+                    registro['data'] = ''
+                else:
+                    data = date(ano, mes, dia)
+                    registro['data'] = data.isoformat()
+                    registro['data_exibicao'] = data.strftime('%d/%m/%Y')
+                registros.append(registro)
+                if aleatorio.random() < duplicado:
+                    registros.append(dict(registro))
+    return registros
+
+
+def medir(funcao, repeticoes=1):
+    """Executa funcao repeticoes vezes e retorna (tempos em segundos, último resultado)."""
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos, resultado
+
+
+def resumir(tempos):
+    """Estatísticas em milissegundos de uma lista de tempos."""
+    return {
+        'execucoes': len(tempos),
+        'total_ms': round(sum(tempos) * 1000, 3),
+        'min_ms': round(min(tempos) * 1000, 3),
+        'mediana_ms': round(statistics.median(tempos) * 1000, 3),
+        'max_ms': round(max(tempos) * 1000, 3),
+    }
+
+
+def executar(criancas=10000, anos=2, semente=42, modo=None, repeticoes=3, diretorio=None):
+    """Gera os dados, mede cada caminho e retorna o resultado como dicionário."""
+    modo = modo or nucleo.MODO_ARMAZENAMENTO
+    registros = gerar_dados(criancas, anos, semente)
+    diretorio_temporario = diretorio or tempfile.mkdtemp(prefix='benchmark_pagamentos_')
+    arquivo = os.path.join(diretorio_temporario, nucleo.ARQUIVO_DADOS)
+    resultados = {}
+    try:
+        with open(arquivo, 'w', encoding='utf-8') as f:
+            json.dump(registros, f, ensure_ascii=False)
+
+        # A primeira carga converte o arquivo (ids no journal, banco no sqlite); as seguintes são a carga normal
+        tempos, _ = medir(lambda: nucleo.abrir_armazenamento(modo, arquivo).carregar())
+        resultados['carregar_dados_primeira_vez'] = resumir(tempos)
+        armazenamentos = []
+
+        def carregar():
+            armazenamento = nucleo.abrir_armazenamento(modo, arquivo)
+            armazenamentos.append(armazenamento)
+            return armazenamento.carregar()
+        tempos, repositorio = medir(carregar, repeticoes)
+        resultados['carregar_dados'] = resumir(tempos)
+        armazenamento = armazenamentos[-1]
+
+        # salvar_dados depois de alterar um pagamento, como faz a tela a cada edição
+        ids = [id_pag for id_pag, _ in repositorio.itens()]
+        aleatorio = random.Random(semente)
+
+        def alterar_e_salvar():
+            id_pag = aleatorio.choice(ids)
+            pag = repositorio.obter(id_pag)
+            repositorio.atualizar(id_pag, pag.substituir(centavos=pag.centavos + 1))
+            armazenamento.salvar(repositorio)
+        tempos, _ = medir(alterar_e_salvar, repeticoes * 10)
+        resultados['salvar_dados'] = resumir(tempos)
+
+        tempos, _ = medir(lambda: armazenamento.fechar(repositorio))
+        resultados['salvar_dados_encerrando'] = resumir(tempos)
+        armazenamento = nucleo.abrir_armazenamento(modo, arquivo)
+        repositorio = armazenamento.carregar()
+
+        # Anos anteriores só são abertos quando pedidos (filtro de ano, dashboard)
+        tempos, anterior = medir(lambda: nucleo.repositorio_anterior(armazenamento, repositorio))
+        resultados['carregar_ano_anterior'] = resumir(tempos)
+
+        # filtrar_e_listar: todos os meses × todas as escolas, com todas as crianças e com uma criança
+        hoje = datetime.now()
+        nomes = repositorio.nomes()
+        exemplo = nomes[len(nomes) // 2] if nomes else 'Todas as Crianças'
+        tempos = []
+        for mes in ['Todos os Meses'] + list(MESES_ORDENADOS):
+            for escola in ['Todas as Escolas'] + ESCOLAS:
+                for nome in ('Todas as Crianças', exemplo):
+                    tempos += medir(lambda: nucleo.calcular_linhas(repositorio, mes, nome, escola, hoje, anterior))[0]
+        resultados['filtrar_e_listar'] = resumir(tempos)
+        tempos, _ = medir(lambda: nucleo.calcular_linhas(
+            repositorio, 'Todos os Meses', 'Todas as Crianças', 'Todas as Escolas', hoje, anterior), repeticoes)
+        resultados['filtrar_e_listar_sem_filtro'] = resumir(tempos)
+
+        # Busca de nomes: cada tecla digitada do nome de exemplo, como no combo de crianças
+        indice = IndiceNomes(armazenamento.cadastro)
+        tempos = []
+        for fim in range(1, len(exemplo) + 1):
+            tempos += medir(lambda: indice.buscar(exemplo[:fim]))[0]
+        resultados['busca_nomes_por_tecla'] = resumir(tempos)
+
+        tempos, _ = medir(lambda: [nucleo.dia_usual(repositorio, nome) for nome in nomes], repeticoes)
+        resultados['get_usual_payment_day_todas'] = resumir(tempos)
+
+        tempos, atrasados = medir(lambda: nucleo.obter_atrasados(repositorio, hoje, anterior), repeticoes)
+        resultados['dashboard_atrasados'] = resumir(tempos)
+
+        try:
+            tempos, _ = medir(lambda: nucleo.gerar_pdf_atrasados(
+                atrasados, hoje, os.path.join(diretorio_temporario, 'atrasados.pdf')))
+            resultados['gerar_relatorio_pdf'] = resumir(tempos)
+        except RuntimeError as e:
+            resultados['gerar_relatorio_pdf'] = {'ignorado': str(e)}
+    finally:
+        if diretorio is None:
+            shutil.rmtree(diretorio_temporario, ignore_errors=True)
+
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'parametros': {'criancas': criancas, 'anos': anos, 'semente': semente, 'modo': modo,
+                       'repeticoes': repeticoes, 'pagamentos': len(registros)},
+        'resultados': resultados,
+    }
+
+
+def comparar(atual, anterior):
+    """Retorna {caminho: mediana atual / mediana anterior} dos caminhos medidos nas duas execuções."""
+    razoes = {}
+    for nome, medida in atual['resultados'].items():
+        antes = anterior.get('resultados', {}).get(nome, {})
+        if 'mediana_ms' in medida and antes.get('mediana_ms'):
+            razoes[nome] = round(medida['mediana_ms'] / antes['mediana_ms'], 3)
+    return razoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede o desempenho com dados sintéticos")
+    parser.add_argument('--criancas', type=int, default=10000)
+    parser.add_argument('--anos', type=int, default=2)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--modo', choices=['journal', 'json', 'sqlite'])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--saida', help="grava o JSON no arquivo em vez da tela")
+    parser.add_argument('--comparar', help="JSON de uma medição anterior")
+    args = parser.parse_args(argv)
+
+    # Mensagens do armazenamento vão para stderr, deixando só o JSON na saída
+    with contextlib.redirect_stdout(sys.stderr):
+        resultado = executar(args.criancas, args.anos, args.semente, args.modo, args.repeticoes)
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            resultado['razao_mediana'] = comparar(resultado, json.load(f))
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    else:
+        print(texto)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Busca de nomes de crianças enquanto se digita, sem diferenciar acentos e maiúsculas.
+
+O índice guarda os nomes normalizados em ordem (para a busca por prefixo,
+com bisect) e um índice de trigramas (para a busca por trecho do nome). É
+atualizado a cada criança criada, renomeada ou desativada no cadastro, sem
+percorrer os pagamentos.
+"""
+import unicodedata
+from bisect import bisect_left, insort
+
+# Quantos nomes a busca retorna, no máximo
+LIMITE_RESULTADOS = 50
+
+# Tamanho dos trechos indexados; buscas mais curtas percorrem a lista de nomes
+TAMANHO_TRIGRAMA = 3
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e sem espaços nas pontas."""
+    return unicodedata.normalize('NFKD', texto.strip().lower()).encode('ascii', 'ignore').decode()
+
+
+def _trigramas(texto):
+    return {texto[i:i + TAMANHO_TRIGRAMA] for i in range(len(texto) - TAMANHO_TRIGRAMA + 1)}
+
+
+class IndiceNomes:
+    """Nomes das crianças ativas do cadastro, buscáveis por prefixo e por trecho."""
+
+    def __init__(self, cadastro=None):
+        self._por_crianca = {}      # id da criança -> nome indexado
+        self._criancas = {}         # nome -> quantidade de crianças com ele (uma por escola)
+        self._ordenados = []        # (normalizado, nome) em ordem
+        self._trigramas = {}        # trigrama -> {nome: None}
+        if cadastro is not None:
+            # Carga inicial: inclui tudo no fim da lista e ordena uma vez só
+            for crianca in cadastro:
+                self.atualizar(crianca, ordenar=False)
+            self._ordenados.sort()
+            cadastro.observar(self.atualizar)
+
+    def __len__(self):
+        return len(self._criancas)
+
+    def atualizar(self, crianca, ordenar=True):
+        """Reflete no índice a criança criada ou alterada (nome, ativo)."""
+        anterior = self._por_crianca.pop(crianca.id, None)
+        if anterior is not None:
+            self._retirar(anterior)
+        if crianca.ativo and crianca.nome.strip():
+            self._por_crianca[crianca.id] = crianca.nome
+            self._incluir(crianca.nome, ordenar)
+
+    def _incluir(self, nome, ordenar):
+        if nome in self._criancas:
+            self._criancas[nome] += 1
+            return
+        self._criancas[nome] = 1
+        normalizado = normalizar(nome)
+        if ordenar:
+            insort(self._ordenados, (normalizado, nome))
+        else:
+            self._ordenados.append((normalizado, nome))
+        for trigrama in _trigramas(normalizado):
+            self._trigramas.setdefault(trigrama, {})[nome] = None
+
+    def _retirar(self, nome):
+        self._criancas[nome] -= 1
+        if self._criancas[nome]:
+            return
+        del self._criancas[nome]
+        normalizado = normalizar(nome)
+        del self._ordenados[bisect_left(self._ordenados, (normalizado, nome))]
+        for trigrama in _trigramas(normalizado):
+            nomes = self._trigramas[trigrama]
+            del nomes[nome]
+            if not nomes:
+                del self._trigramas[trigrama]
+
+    def buscar(self, texto, limite=LIMITE_RESULTADOS):
+        """Retorna até limite nomes que contêm o texto: primeiro os que começam com ele, depois os demais, em ordem."""
+        termo = normalizar(texto)
+        if not termo:
+            return [nome for _, nome in self._ordenados[:limite]]
+        resultado = []
+        inicio = bisect_left(self._ordenados, (termo,))
+        for normalizado, nome in self._ordenados[inicio:inicio + limite]:
+            if not normalizado.startswith(termo):
+                break
+            resultado.append(nome)
+        if len(resultado) >= limite:
+            return resultado
+        ja_incluidos = set(resultado)
+        if len(termo) < TAMANHO_TRIGRAMA:
+            candidatos = (par for par in self._ordenados if termo in par[0])
+        else:
+            conjuntos = sorted((self._trigramas.get(trigrama, {}) for trigrama in _trigramas(termo)), key=len)
+            nomes = [nome for nome in conjuntos[0] if all(nome in outro for outro in conjuntos[1:])]
+            candidatos = sorted((normalizar(nome), nome) for nome in nomes)
+        for normalizado, nome in candidatos:
+            if nome not in ja_incluidos and termo in normalizado:
+                resultado.append(nome)
+                if len(resultado) >= limite:
+                    break
+        return resultado
+
+    def encontrar(self, texto):
+        """Retorna o nome igual ao texto (ignorando acentos e maiúsculas), ou None."""
+        termo = normalizar(texto)
+        posicao = bisect_left(self._ordenados, (termo,))
+        if posicao < len(self._ordenados) and self._ordenados[posicao][0] == termo:
+            return self._ordenados[posicao][1]
+        return None
@@ -0,0 +1,195 @@
+"""Cadastro das crianças: cada uma tem um id estável, referenciado pelos pagamentos.
+
+Renomear ou desativar uma criança muda só a linha dela aqui; os pagamentos
+continuam apontando para o mesmo id. O cadastro é um só para todos os anos.
+"""
+from modelo import ESCOLAS, VERSAO_ESQUEMA, Crianca, verificar_versao
+
+
+class CadastroCriancas:
+    """Crianças por id, com índices por (nome, escola) e por nome."""
+
+    def __init__(self, criancas=()):
+        self._por_id = {}
+        self._por_chave = {}    # (nome, escola) -> Crianca
+        self._por_nome = {}     # nome -> {id: Crianca}
+        self._proximo_id = 1
+        self._observadores = []
+        self.alterado = False   # há mudanças ainda não gravadas
+        self.versao = 0         # incrementada a cada criança criada ou alterada
+        self.origem = None      # num instantâneo, o cadastro de onde ele saiu
+        self._instantaneo = None
+        self._alteradas = set()  # ids das crianças criadas ou alteradas depois do último instantâneo
+        for crianca in criancas:
+            self._incluir(crianca)
+
+    def __len__(self):
+        return len(self._por_id)
+
+    def __iter__(self):
+        return iter(list(self._por_id.values()))
+
+    def __contains__(self, id_crianca):
+        return id_crianca in self._por_id
+
+    def observar(self, funcao):
+        """Registra funcao(crianca) para ser chamada a cada criança criada ou alterada."""
+        self._observadores.append(funcao)
+
+    def esquecer(self, funcao):
+        """Deixa de chamar funcao, registrada antes com observar()."""
+        self._observadores.remove(funcao)
+
+    def _notificar(self, crianca):
+        self.alterado = True
+        self.versao += 1
+        self._alteradas.add(crianca.id)
+        for funcao in self._observadores:
+            funcao(crianca)
+
+    def _incluir(self, crianca):
+        self._por_id[crianca.id] = crianca
+        self._por_chave[(crianca.nome, crianca.escola)] = crianca
+        self._por_nome.setdefault(crianca.nome, {})[crianca.id] = crianca
+        self._proximo_id = max(self._proximo_id, crianca.id + 1)
+
+    def instantaneo(self):
+        """Retorna uma cópia das crianças no estado atual, para leitura em outra thread.
+
+        As crianças são copiadas: renomear ou desativar depois não muda a cópia.
+        Ela é reaproveitada enquanto o cadastro não mudar e não deve ser alterada;
+        a seguinte reaproveita as cópias das crianças que não mudaram.
+        """
+        if self._instantaneo is None or self._instantaneo.versao != self.versao:
+            copias = self._instantaneo._por_id if self._instantaneo is not None else {}
+            alteradas = self._alteradas
+            copia = CadastroCriancas(
+                copias[id_crianca] if id_crianca in copias and id_crianca not in alteradas else
+                Crianca(crianca.id, crianca.nome, crianca.escola, crianca.dia_usual, crianca.ativo)
+                for id_crianca, crianca in self._por_id.items())
+            copia.versao = self.versao
+            copia.origem = self
+            self._instantaneo = copia
+            self._alteradas = set()
+        return self._instantaneo
+
+    def diferentes(self, outro):
+        """Ids das crianças que não são o mesmo objeto no outro cadastro (entre instantâneos: as que mudaram)."""
+        return [id_crianca for id_crianca, crianca in self._por_id.items() if outro._por_id.get(id_crianca) is not crianca]
+
+    # --- Consultas ---
+
+    def obter(self, id_crianca):
+        """Retorna a criança pelo id."""
+        return self._por_id[id_crianca]
+
+    def buscar(self, nome, escola):
+        """Retorna a criança com o nome na escola, ou None."""
+        return self._por_chave.get((nome, escola))
+
+    def do_nome(self, nome):
+        """Retorna as crianças com o nome (uma por escola)."""
+        return list(self._por_nome.get(nome, {}).values())
+
+    # --- Alterações ---
+
+    def registrar(self, nome, escola):
+        """Retorna a criança com o nome na escola, criando-a (ou reativando-a) se preciso."""
+        crianca = self._por_chave.get((nome, escola))
+        if crianca is None:
+            crianca = Crianca(self._proximo_id, nome, escola)
+            self._incluir(crianca)
+            self._notificar(crianca)
+        elif not crianca.ativo:
+            crianca.ativo = True
+            self._notificar(crianca)
+        return crianca
+
+    def nova(self, nome, escola):
+        """Retorna uma criança com id novo, ainda fora do cadastro: ela entra com restaurar().
+
+        Para um Lote, que só inclui as crianças dele ao aplicar.
+        """
+        crianca = Crianca(self._proximo_id, nome, escola)
+        self._proximo_id += 1
+        return crianca
+
+    def restaurar(self, crianca):
+        """Inclui a criança com o id que ela já tinha (recuperada de um journal ou banco)."""
+        self._incluir(crianca)
+        self._notificar(crianca)
+
+    def renomear(self, crianca, novo_nome):
+        """Troca o nome da criança. Levanta ValueError se já existe outra com esse nome na escola."""
+        if novo_nome == crianca.nome:
+            return
+        if (novo_nome, crianca.escola) in self._por_chave:
+            raise ValueError(f"Já existe {novo_nome} em {crianca.escola}.")
+        del self._por_chave[(crianca.nome, crianca.escola)]
+        mesmo_nome = self._por_nome[crianca.nome]
+        del mesmo_nome[crianca.id]
+        if not mesmo_nome:
+            del self._por_nome[crianca.nome]
+        crianca.nome = novo_nome
+        self._por_chave[(novo_nome, crianca.escola)] = crianca
+        self._por_nome.setdefault(novo_nome, {})[crianca.id] = crianca
+        self._notificar(crianca)
+
+    def remover(self, crianca):
+        """Tira do cadastro uma criança que nenhum pagamento referencia (ao desfazer um Lote).
+
+        Ela é avisada aos observadores já desativada e fora do cadastro.
+        """
+        del self._por_id[crianca.id]
+        del self._por_chave[(crianca.nome, crianca.escola)]
+        mesmo_nome = self._por_nome[crianca.nome]
+        del mesmo_nome[crianca.id]
+        if not mesmo_nome:
+            del self._por_nome[crianca.nome]
+        crianca.ativo = False
+        self._notificar(crianca)
+
+    def desativar(self, crianca):
+        """Marca a criança como inativa; ela sai do controle de atrasos."""
+        if crianca.ativo:
+            crianca.ativo = False
+            self._notificar(crianca)
+
+    def definir_dia_usual(self, crianca, dia):
+        if crianca.dia_usual != dia:
+            crianca.dia_usual = dia
+            self._notificar(crianca)
+
+    # --- Conversão ---
+
+    def para_dados(self):
+        """Retorna o cadastro no formato gravado no JSON (esquema 2).
+
+        Cada criança é [id, nome, código da escola, dia usual, ativo]; o código
+        é a posição na lista escolas gravada junto (ESCOLAS e as desconhecidas).
+        """
+        escolas = list(ESCOLAS)
+        codigos = {escola: codigo for codigo, escola in enumerate(escolas)}
+        linhas = []
+        for crianca in list(self._por_id.values()):
+            codigo = codigos.get(crianca.escola)
+            if codigo is None:
+                codigo = codigos[crianca.escola] = len(escolas)
+                escolas.append(crianca.escola)
+            linhas.append([crianca.id, crianca.nome, codigo, crianca.dia_usual, int(crianca.ativo)])
+        return {'versao': VERSAO_ESQUEMA, 'escolas': escolas, 'criancas': linhas}
+
+    @classmethod
+    def de_dados(cls, dados, arquivo=''):
+        """Cria o cadastro a partir do JSON lido, no esquema 2 ou 1 (lista de dicionários).
+
+        Um cadastro do esquema 1 fica marcado como alterado, para ser regravado.
+        """
+        if isinstance(dados, list):
+            cadastro = cls(Crianca.de_dict(registro) for registro in dados)
+            cadastro.alterado = bool(dados)
+            return cadastro
+        verificar_versao(dados, arquivo)
+        escolas = dados['escolas']
+        return cls(Crianca(id_crianca, nome, escolas[codigo], dia_usual, bool(ativo))
+                   for id_crianca, nome, codigo, dia_usual, ativo in dados['criancas'])
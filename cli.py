@@ -0,0 +1,216 @@
+"""Linha de comando: consultas e relatórios sem abrir a janela.
+
+Exemplos:
+    python cli.py atrasados
+    python cli.py totais --escola "Gepan"
+    python cli.py resumo
+    python cli.py situacao --mes Novembro
+    python cli.py listar --mes Janeiro --escola "CCA"
+    python cli.py relatorio atrasados.pdf
+    python cli.py relatorios relatorios/ --mes 11
+    python cli.py importar extrato.csv
+    python cli.py migrar-sqlite pagamentos.json pagamentos.db
+    python cli.py servir --porta 8765
+    python cli.py gui
+"""
+import argparse
+import sys
+import threading
+from datetime import datetime
+
+import nucleo
+from modelo import NOMES_MESES
+from servidor import PORTA_PADRAO, ServicoConsultas
+
+
+def _abrir(args):
+    armazenamento = nucleo.abrir_armazenamento(args.modo, args.arquivo)
+    return armazenamento, armazenamento.carregar(args.ano)
+
+
+def comando_atrasados(args):
+    """Lista as crianças atrasadas."""
+    armazenamento, repositorio = _abrir(args)
+    hoje = datetime.now()
+    anterior = nucleo.repositorio_anterior(armazenamento, repositorio)
+    for nome, escola, ultimo_pag in nucleo.obter_atrasados(repositorio, hoje, anterior):
+        if ultimo_pag:
+            print(f"{nome}\t{escola}\t{ultimo_pag.strftime('%d/%m/%Y')}\t{(hoje - ultimo_pag).days} dias")
+        else:
+            print(f"{nome}\t{escola}\tNunca pagou")
+
+
+def comando_totais(args):
+    """Mostra o total pago em cada mês."""
+    _, repositorio = _abrir(args)
+    totais = nucleo.totais_por_mes(repositorio, args.escola)
+    for mes in sorted(totais):
+        print(f"{NOMES_MESES[mes] or '(sem mês)'}\tR$ {totais[mes] / 100:.2f}")
+    print(f"Total\tR$ {sum(totais.values()) / 100:.2f}")
+
+
+def comando_resumo(args):
+    """Mostra o total de cada escola por mês, a taxa de pagamento, o prazo médio e os atrasados."""
+    import analise
+    armazenamento, repositorio = _abrir(args)
+    hoje = datetime.now()
+    atrasados_escola = nucleo.atrasados_por_escola(repositorio, hoje, nucleo.repositorio_anterior(armazenamento, repositorio))
+    meses = [mes[:3] for mes in NOMES_MESES[1:]]
+    print('\t'.join(["Escola"] + meses + ["Total", "Taxa", "Dias", "Atrasados"]))
+    for escola, por_mes, total, taxa, dias, atrasados in analise.colunas(repositorio).resumo_escolas(atrasados_escola):
+        valores = [escola] + [f"{centavos / 100:.2f}" for centavos in por_mes]
+        valores += [f"{total / 100:.2f}", f"{taxa:.0%}", f"{dias:.1f}" if dias is not None else "--", str(atrasados)]
+        print('\t'.join(valores))
+
+
+def comando_situacao(args):
+    """Mostra pagas, não pagas, atrasadas e o total de cada escola no mês."""
+    armazenamento, repositorio = _abrir(args)
+    anterior = nucleo.repositorio_anterior(armazenamento, repositorio)
+    print("Escola\tPagas\tNão pagas\tAtrasadas\tTotal")
+    for escola, pagas, nao_pagas, atrasadas, centavos in nucleo.situacao_por_escola(repositorio, args.mes,
+                                                                                   datetime.now(), anterior):
+        print(f"{escola}\t{pagas}\t{nao_pagas}\t{atrasadas}\t{centavos / 100:.2f}")
+
+
+def comando_listar(args):
+    """Mostra as linhas da tabela principal para os filtros informados."""
+    armazenamento, repositorio = _abrir(args)
+    anterior = nucleo.repositorio_anterior(armazenamento, repositorio)
+    linhas = nucleo.calcular_linhas(repositorio, args.mes, args.crianca, args.escola, datetime.now(), anterior)
+    for _, valores, _ in linhas:
+        print('\t'.join(str(valor) for valor in valores))
+
+
+def comando_relatorio(args):
+    """Gera o PDF das crianças atrasadas."""
+    armazenamento, repositorio = _abrir(args)
+    hoje = datetime.now()
+    atrasados = nucleo.obter_atrasados(repositorio, hoje, nucleo.repositorio_anterior(armazenamento, repositorio))
+    if not atrasados:
+        print("Todas as crianças estão em dia com os pagamentos.")
+        return
+    nucleo.gerar_pdf_atrasados(atrasados, hoje, args.saida)
+    print(f"Relatório salvo em {args.saida}")
+
+
+def comando_relatorios(args):
+    """Gera os PDFs do mês, um por escola e um consolidado, em paralelo."""
+    import relatorios
+    armazenamento, repositorio = _abrir(args)
+    hoje = datetime.now()
+
+    def progresso(concluidos, total, arquivo):
+        print(f"[{concluidos}/{total}] {arquivo}")
+    relatorios.gerar_relatorios(repositorio, hoje, args.diretorio, nucleo.repositorio_anterior(armazenamento, repositorio),
+                                args.mes, args.processos, progresso)
+
+
+def comando_importar(args):
+    """Importa pagamentos em lote de um CSV e grava uma vez no fim."""
+    from importacao import importar_csv
+    armazenamento, repositorio = _abrir(args)
+    resultado = importar_csv(repositorio, args.csv, args.rejeitados, repositorio_do_ano=armazenamento.carregar)
+    armazenamento.fechar(repositorio)
+    print(f"Importação concluída: {resultado}")
+    return 1 if resultado.rejeitados else 0
+
+
+def comando_migrar_sqlite(args):
+    """Copia os pagamentos de um JSON para um banco SQLite novo."""
+    from armazenamento import salvar_cadastro
+    from armazenamento_sqlite import migrar_json_para_sqlite
+    armazenamento = nucleo.abrir_armazenamento(args.modo, args.arquivo)
+    total = migrar_json_para_sqlite(args.json, args.banco, armazenamento.cadastro)
+    salvar_cadastro(armazenamento.cadastro, armazenamento.arquivo_cadastro)
+    print(f"{total} pagamentos migrados.")
+
+
+def comando_servir(args):
+    """Atende as consultas por HTTP em localhost até Ctrl+C, sem abrir a janela."""
+    armazenamento, repositorio = _abrir(args)
+    servico = ServicoConsultas(args.porta)
+    servico.publicar(repositorio, nucleo.repositorio_anterior(armazenamento, repositorio))
+    print(f"Serviço de consultas em {servico.endereco} (Ctrl+C encerra)")
+    servico.iniciar()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servico.encerrar()
+
+
+def comando_gui(args):
+    """Abre a janela do app."""
+    import app
+    app.main()
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Gestão de pagamentos mensais")
+    parser.add_argument('--arquivo', help=f"arquivo de dados (padrão: {nucleo.ARQUIVO_DADOS})")
+    parser.add_argument('--ano', type=int, help="ano letivo consultado (padrão: o atual)")
+    parser.add_argument('--modo', choices=['journal', 'json', 'sqlite'],
+                        help=f"forma de armazenamento (padrão: {nucleo.MODO_ARMAZENAMENTO})")
+    comandos = parser.add_subparsers(dest='comando')
+
+    comandos.add_parser('atrasados', help="lista as crianças atrasadas").set_defaults(funcao=comando_atrasados)
+
+    totais = comandos.add_parser('totais', help="total pago por mês")
+    totais.add_argument('--escola')
+    totais.set_defaults(funcao=comando_totais)
+
+    comandos.add_parser('resumo', help="escolas × meses, taxa de pagamento e atrasados").set_defaults(funcao=comando_resumo)
+
+    situacao = comandos.add_parser('situacao', help="pagas, não pagas e atrasadas por escola no mês")
+    situacao.add_argument('--mes', default='Todos os Meses')
+    situacao.set_defaults(funcao=comando_situacao)
+
+    listar = comandos.add_parser('listar', help="tabela principal com filtros")
+    listar.add_argument('--mes', default='Todos os Meses')
+    listar.add_argument('--crianca', default='Todas as Crianças')
+    listar.add_argument('--escola', default='Todas as Escolas')
+    listar.set_defaults(funcao=comando_listar)
+
+    relatorio = comandos.add_parser('relatorio', help="gera o PDF de atrasados")
+    relatorio.add_argument('saida')
+    relatorio.set_defaults(funcao=comando_relatorio)
+
+    lote = comandos.add_parser('relatorios', help="gera os PDFs do mês por escola e o consolidado")
+    lote.add_argument('diretorio')
+    lote.add_argument('--mes', type=int, choices=range(1, 13), metavar='1-12', help="mês (padrão: o atual)")
+    lote.add_argument('--processos', type=int, help="processos em paralelo (padrão: um por núcleo)")
+    lote.set_defaults(funcao=comando_relatorios)
+
+    importar = comandos.add_parser('importar', help="importa pagamentos de um CSV")
+    importar.add_argument('csv')
+    importar.add_argument('--rejeitados', help="CSV com as linhas recusadas (padrão: <csv>.rejeitados.csv)")
+    importar.set_defaults(funcao=comando_importar)
+
+    migrar = comandos.add_parser('migrar-sqlite', help="copia um JSON para um banco SQLite")
+    migrar.add_argument('json')
+    migrar.add_argument('banco')
+    migrar.set_defaults(funcao=comando_migrar_sqlite)
+
+    servir = comandos.add_parser('servir', help="atende as consultas por HTTP em localhost")
+    servir.add_argument('--porta', type=int, default=PORTA_PADRAO)
+    servir.set_defaults(funcao=comando_servir)
+
+    comandos.add_parser('gui', help="abre a janela").set_defaults(funcao=comando_gui)
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    if args.comando is None:
+        args.funcao = comando_gui
+    try:
+        return args.funcao(args) or 0
+    except (RuntimeError, OSError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
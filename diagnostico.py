@@ -0,0 +1,156 @@
+"""Medição das ações do app: tempo, chamadas e registros, com percentis e perfil opcional.
+
+Uso:
+    with medir('carregar') as medicao:
+        repositorio = armazenamento.carregar()
+        medicao.registros = len(repositorio)
+
+perfilar_proxima('filtrar') faz a próxima medição dessa ação rodar sob o
+cProfile; o relatório do perfil vai para o log junto com as medições
+exportadas por exportar().
+"""
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Quantas medições recentes de cada ação entram nos percentis
+JANELA_PERCENTIS = 200
+
+# Arquivo padrão do log de diagnóstico
+ARQUIVO_LOG = 'diagnostico.log'
+
+# Linhas do relatório do cProfile gravadas no log
+LINHAS_PERFIL = 30
+
+
+class Estatisticas:
+    """Medições de uma ação: totais desde o início e as JANELA_PERCENTIS mais recentes."""
+
+    def __init__(self, janela=JANELA_PERCENTIS):
+        self.chamadas = 0
+        self.interrompidas = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.ultimo = 0.0
+        self.registros = None
+        self.recentes = deque(maxlen=janela)
+
+    def registrar(self, segundos, registros=None, interrompida=False):
+        self.chamadas += 1
+        self.interrompidas += interrompida
+        self.total += segundos
+        self.maximo = max(self.maximo, segundos)
+        self.ultimo = segundos
+        if registros is not None:
+            self.registros = registros
+        self.recentes.append(segundos)
+
+    def percentil(self, fracao):
+        """Percentil (0-1) das medições recentes, pelo método do vizinho mais próximo."""
+        if not self.recentes:
+            return 0.0
+        ordenados = sorted(self.recentes)
+        return ordenados[min(len(ordenados) - 1, int(fracao * len(ordenados)))]
+
+    def para_dict(self):
+        """Resumo em milissegundos."""
+        return {
+            'chamadas': self.chamadas,
+            'interrompidas': self.interrompidas,
+            'ultimo_ms': round(self.ultimo * 1000, 3),
+            'media_ms': round(self.total / self.chamadas * 1000, 3) if self.chamadas else 0.0,
+            'p50_ms': round(self.percentil(0.5) * 1000, 3),
+            'p90_ms': round(self.percentil(0.9) * 1000, 3),
+            'p99_ms': round(self.percentil(0.99) * 1000, 3),
+            'max_ms': round(self.maximo * 1000, 3),
+            'registros': self.registros,
+        }
+
+
+class Medicao:
+    """Preenchida pelo código medido; registros é opcional."""
+
+    def __init__(self, nome, registros=None):
+        self.nome = nome
+        self.registros = registros
+
+
+class Diagnostico:
+    """Guarda as estatísticas por ação. Pode ser usado de várias threads."""
+
+    def __init__(self, arquivo_log=ARQUIVO_LOG):
+        self.arquivo_log = arquivo_log
+        self._estatisticas = {}
+        self._perfilar = set()
+        self._trava = threading.Lock()
+
+    def registrar(self, nome, segundos, registros=None, interrompida=False):
+        with self._trava:
+            estatisticas = self._estatisticas.get(nome)
+            if estatisticas is None:
+                estatisticas = self._estatisticas[nome] = Estatisticas()
+            estatisticas.registrar(segundos, registros, interrompida)
+
+    @contextmanager
+    def medir(self, nome, registros=None):
+        """Mede o bloco como uma chamada da ação nome."""
+        medicao = Medicao(nome, registros)
+        with self._trava:
+            perfil = cProfile.Profile() if nome in self._perfilar else None
+            self._perfilar.discard(nome)
+        interrompida = False
+        inicio = time.perf_counter()
+        if perfil is not None:
+            perfil.enable()
+        try:
+            yield medicao
+        except BaseException:
+            interrompida = True
+            raise
+        finally:
+            if perfil is not None:
+                perfil.disable()
+            self.registrar(nome, time.perf_counter() - inicio, medicao.registros, interrompida)
+            if perfil is not None:
+                self._gravar_perfil(nome, perfil)
+
+    def perfilar_proxima(self, nome):
+        """Roda a próxima medição da ação nome sob o cProfile."""
+        with self._trava:
+            self._perfilar.add(nome)
+
+    def resumo(self):
+        """Retorna {ação: resumo em ms}, em ordem de nome."""
+        with self._trava:
+            return {nome: self._estatisticas[nome].para_dict() for nome in sorted(self._estatisticas)}
+
+    def exportar(self, extras=None):
+        """Acrescenta ao log uma linha JSON com o resumo atual (e os extras informados)."""
+        registro = {'data': datetime.now().isoformat(timespec='seconds'), 'acoes': self.resumo()}
+        if extras:
+            registro.update(extras)
+        self._acrescentar_log(json.dumps(registro, ensure_ascii=False))
+        return self.arquivo_log
+
+    def _gravar_perfil(self, nome, perfil):
+        saida = io.StringIO()
+        pstats.Stats(perfil, stream=saida).sort_stats('cumulative').print_stats(LINHAS_PERFIL)
+        cabecalho = f"# Perfil de '{nome}' em {datetime.now().isoformat(timespec='seconds')}"
+        self._acrescentar_log(cabecalho + '\n' + saida.getvalue())
+
+    def _acrescentar_log(self, texto):
+        with self._trava:
+            with open(self.arquivo_log, 'a', encoding='utf-8') as log:
+                log.write(texto + '\n')
+
+
+# Instância usada pelo app
+diagnostico = Diagnostico()
+medir = diagnostico.medir
+perfilar_proxima = diagnostico.perfilar_proxima
@@ -0,0 +1,138 @@
+"""Importação em lote de pagamentos a partir de CSV (por exemplo, extrato do banco).
+
+O arquivo é lido linha a linha; cada linha é validada com as mesmas regras
+da tela (data DD/MM/AAAA, valor numérico, escola da lista ESCOLAS) e gravada
+por (nome, mês, escola): substitui o pagamento existente ou adiciona um novo.
+As linhas recusadas vão para um CSV à parte, com o motivo.
+"""
+import csv
+import os
+import unicodedata
+
+from modelo import ESCOLAS, Pagamento, ano_referencia, mes_numero, para_centavos
+from nucleo import validar_data
+
+# Colunas esperadas, na ordem usada quando o arquivo não tem cabeçalho
+COLUNAS = ('nome', 'mes', 'escola', 'data', 'valor')
+
+
+class ResultadoImportacao:
+    """Contagem do que foi feito na importação."""
+
+    def __init__(self):
+        self.inseridos = 0
+        self.atualizados = 0
+        self.rejeitados = 0
+        self.arquivo_rejeitados = None
+
+    @property
+    def importados(self):
+        return self.inseridos + self.atualizados
+
+    def __str__(self):
+        texto = f"{self.inseridos} adicionados, {self.atualizados} atualizados, {self.rejeitados} recusados"
+        if self.arquivo_rejeitados:
+            texto += f" (ver {self.arquivo_rejeitados})"
+        return texto
+
+
+def _normalizar(texto):
+    return unicodedata.normalize('NFKD', texto.strip().lower()).encode('ascii', 'ignore').decode()
+
+
+def _detectar_delimitador(primeira_linha):
+    """Extratos de banco costumam usar ';'; na dúvida, vírgula."""
+    return max(';,\t', key=primeira_linha.count) if primeira_linha.strip() else ','
+
+
+def _posicoes(cabecalho):
+    """Retorna a posição de cada coluna pelo cabeçalho, ou None se a linha não for um cabeçalho."""
+    normalizado = [_normalizar(coluna) for coluna in cabecalho]
+    if not set(COLUNAS) <= set(normalizado):
+        return None
+    return [normalizado.index(coluna) for coluna in COLUNAS]
+
+
+def _validar(campos, datas):
+    """Retorna ((nome, mês, escola, data, centavos), None) ou (None, motivo). datas guarda as datas já validadas."""
+    nome, mes, escola, data_str, valor_str = (campo.strip() for campo in campos)
+    if not nome:
+        return None, "Nome vazio"
+    numero_mes = mes_numero(mes)
+    if not numero_mes:
+        return None, f"Mês inválido: {mes}"
+    if escola not in ESCOLAS:
+        return None, f"Escola desconhecida: {escola}"
+    if data_str not in datas:
+        datas[data_str] = validar_data(data_str)
+    data_validada = datas[data_str]
+    if not data_validada:
+        return None, f"Data inválida: {data_str}"
+    try:
+        centavos = para_centavos(valor_str)
+    except (ValueError, OverflowError):     # 'inf' passa pelo float() mas não vira inteiro
+        return None, f"Valor inválido: {valor_str}"
+    return (nome, numero_mes, escola, data_validada['ordinal'], centavos), None
+
+
+def importar_csv(repositorio, arquivo, arquivo_rejeitados=None, repositorio_do_ano=None):
+    """Importa os pagamentos do CSV para o repositório e retorna um ResultadoImportacao.
+
+    Com repositorio_do_ano(ano), cada pagamento vai para o repositório do ano
+    a que se refere (pela data), em vez de todos irem para repositorio.
+    Não grava o armazenamento: quem chama salva uma vez no fim. As linhas
+    recusadas vão para arquivo_rejeitados (padrão: <arquivo>.rejeitados.csv),
+    criado só se houver alguma.
+    """
+    if arquivo_rejeitados is None:
+        arquivo_rejeitados = os.path.splitext(arquivo)[0] + '.rejeitados.csv'
+    resultado = ResultadoImportacao()
+    datas = {}
+    saida = None
+    escritor = None
+    try:
+        with open(arquivo, 'r', encoding='utf-8-sig', newline='') as entrada:
+            delimitador = _detectar_delimitador(entrada.readline())
+            entrada.seek(0)
+            leitor = csv.reader(entrada, delimiter=delimitador)
+            posicoes = list(range(len(COLUNAS)))
+            for numero_linha, linha in enumerate(leitor, 1):
+                if not any(campo.strip() for campo in linha):
+                    continue
+                if numero_linha == 1:
+                    cabecalho = _posicoes(linha)
+                    if cabecalho is not None:
+                        posicoes = cabecalho
+                        continue
+                if len(linha) <= max(posicoes):
+                    campos, motivo = None, f"Esperadas {len(COLUNAS)} colunas, encontradas {len(linha)}"
+                else:
+                    campos, motivo = _validar([linha[posicao] for posicao in posicoes], datas)
+
+                if campos is None:
+                    if escritor is None:
+                        saida = open(arquivo_rejeitados, 'w', encoding='utf-8', newline='')
+                        escritor = csv.writer(saida, delimiter=delimitador)
+                        escritor.writerow(('linha', 'motivo') + COLUNAS)
+                    escritor.writerow([numero_linha, motivo] + linha)
+                    resultado.rejeitados += 1
+                    continue
+
+                nome, mes, escola, data, centavos = campos
+                destino = repositorio
+                if repositorio_do_ano is not None:
+                    destino = repositorio_do_ano(ano_referencia(data, mes))
+                pagamento = Pagamento(destino.crianca(nome, escola), mes, data, centavos)
+                existente = destino.buscar(nome, mes, escola)
+                if existente:
+                    if existente[1] != pagamento:
+                        destino.atualizar(existente[0], pagamento)
+                    resultado.atualizados += 1
+                else:
+                    destino.adicionar(pagamento)
+                    resultado.inseridos += 1
+    finally:
+        if saida is not None:
+            saida.close()
+            resultado.arquivo_rejeitados = arquivo_rejeitados
+    return resultado
@@ -0,0 +1,201 @@
+"""Tipos de dados dos pagamentos e tabelas fixas (meses e escolas)."""
+import unicodedata
+from datetime import date
+
+# Dicionário para ordem dos meses (para ordenação)
+MESES_ORDENADOS = {
+    'Janeiro': 1, 'Fevereiro': 2, 'Marco': 3, 'Abril': 4, 'Maio': 5, 'Junho': 6,
+    'Julho': 7, 'Agosto': 8, 'Setembro': 9, 'Outubro': 10, 'Novembro': 11, 'Dezembro': 12
+}
+
+# Nome do mês pelo número (índice 0 = mês desconhecido)
+NOMES_MESES = [''] + list(MESES_ORDENADOS)
+
+ESCOLAS = [
+    "Altenfelder - Manhã", "Altenfelder - Tarde",
+    "Josué de Castro - Manhã", "Josué de Castro - Tarde",
+    "Paulo Nogueira - Manhã", "Paulo Nogueira - Tarde",
+    "Antonio Candido - Manhã", "Antonio Candido - Tarde",
+    "Gepan", "Creche VP", "Creche dos Anjos", "Creche EC", "Parquinho", "CCA"
+]
+
+
+# Versão do formato dos arquivos. A 2 grava listas de números sem nomes de campo:
+# pagamentos como [id, criança, mês 1-12, data ordinal (0 = sem data), centavos]
+# e escolas como códigos; a 1 gravava dicionários com mês por extenso, data ISO e valor float.
+VERSAO_ESQUEMA = 2
+
+
+def verificar_versao(dados, arquivo):
+    """Levanta ValueError se os dados lidos de arquivo são de uma versão de esquema que este código não conhece."""
+    if dados.get('versao') != VERSAO_ESQUEMA:
+        raise ValueError(f"{arquivo}: versão de esquema {dados.get('versao')!r} desconhecida.")
+
+
+def mes_numero(nome_mes):
+    """Retorna o número (1-12) do mês pelo nome, aceitando acentos e maiúsculas; 0 se desconhecido."""
+    numero = MESES_ORDENADOS.get(nome_mes)
+    if numero is not None:
+        return numero
+    sem_acento = unicodedata.normalize('NFKD', nome_mes.strip()).encode('ascii', 'ignore').decode()
+    return MESES_ORDENADOS.get(sem_acento.capitalize(), 0)
+
+
+def data_ordinal(data_iso):
+    """Converte AAAA-MM-DD no ordinal do dia; 0 se vazia ou inválida."""
+    if not data_iso:
+        return 0
+    try:
+        return date.fromisoformat(data_iso).toordinal()
+    except ValueError:
+        return 0
+
+
+def ano_referencia(data, mes, ano_padrao=None):
+    """Ano do mês pago: o da data, corrigido quando o pagamento foi adiantado ou atrasado em mais de meio ano.
+
+    Sem data, retorna ano_padrao (ou o ano atual).
+    """
+    if not data:
+        return ano_padrao or date.today().year
+    dia = date.fromordinal(data)
+    if mes and dia.month - mes > 6:     # dezembro pagando janeiro do ano seguinte
+        return dia.year + 1
+    if mes and mes - dia.month > 6:     # janeiro pagando dezembro do ano anterior
+        return dia.year - 1
+    return dia.year
+
+
+def para_centavos(valor):
+    """Converte um valor em reais (float ou texto) em centavos inteiros."""
+    return round(float(valor) * 100)
+
+
+class Crianca:
+    """Criança do cadastro: id estável, nome, escola, dia usual de pagamento e se está ativa.
+
+    Os pagamentos apontam para a criança; trocar o nome aqui vale para todos eles.
+    """
+
+    __slots__ = ('id', 'nome', 'escola', 'dia_usual', 'ativo')
+
+    def __init__(self, id, nome, escola, dia_usual=None, ativo=True):
+        self.id = id
+        self.nome = nome
+        self.escola = escola
+        self.dia_usual = dia_usual
+        self.ativo = ativo
+
+    def __repr__(self):
+        return f"Crianca({self.id}, {self.nome!r}, {self.escola!r})"
+
+    @classmethod
+    def de_dict(cls, registro):
+        return cls(registro['id'], registro['nome'], registro.get('escola', ''),
+                   registro.get('dia_usual'), registro.get('ativo', True))
+
+    def para_dict(self):
+        registro = {'id': self.id, 'nome': self.nome, 'escola': self.escola}
+        if self.dia_usual is not None:
+            registro['dia_usual'] = self.dia_usual
+        if not self.ativo:
+            registro['ativo'] = False
+        return registro
+
+
+class Pagamento:
+    """Pagamento compacto: criança (do cadastro), mês como número, data como ordinal (0 = sem data) e valor em centavos.
+
+    Tratado como imutável; use substituir() para obter uma cópia alterada.
+    """
+
+    __slots__ = ('crianca', 'mes', 'data', 'centavos')
+
+    def __init__(self, crianca, mes, data, centavos):
+        self.crianca = crianca
+        self.mes = mes
+        self.data = data
+        self.centavos = centavos
+
+    def __repr__(self):
+        return f"Pagamento({self.nome!r}, {self.mes_nome!r}, {self.escola!r}, {self.data_iso!r}, {self.valor:.2f})"
+
+    def __eq__(self, outro):
+        if not isinstance(outro, Pagamento):
+            return NotImplemented
+        return (self.crianca.id, self.mes, self.data, self.centavos) == \
+            (outro.crianca.id, outro.mes, outro.data, outro.centavos)
+
+    __hash__ = None
+
+    @property
+    def nome(self):
+        return self.crianca.nome
+
+    @property
+    def escola(self):
+        return self.crianca.escola
+
+    @property
+    def mes_nome(self):
+        return NOMES_MESES[self.mes]
+
+    @property
+    def valor(self):
+        return self.centavos / 100
+
+    @property
+    def data_iso(self):
+        return date.fromordinal(self.data).isoformat() if self.data else ''
+
+    @property
+    def data_exibicao(self):
+        return date.fromordinal(self.data).strftime('%d/%m/%Y') if self.data else ''
+
+    def substituir(self, **campos):
+        """Retorna uma cópia com os campos informados alterados."""
+        novo = Pagamento(self.crianca, self.mes, self.data, self.centavos)
+        for campo, valor in campos.items():
+            setattr(novo, campo, valor)
+        return novo
+
+    @classmethod
+    def de_dict(cls, registro, cadastro):
+        """Cria o pagamento a partir do formato gravado no JSON.
+
+        Registros antigos, com nome e escola em vez do id da criança, cadastram a criança.
+        """
+        if 'crianca' in registro:
+            crianca = cadastro.obter(registro['crianca'])
+        else:
+            crianca = cadastro.registrar(registro['nome'], registro.get('escola', ''))
+        return cls(crianca, mes_numero(registro['mes']), data_ordinal(registro.get('data', '')),
+                   para_centavos(registro['valor']))
+
+    def para_lista(self):
+        """Retorna [criança, mês, data, centavos], como gravado no esquema 2."""
+        return [self.crianca.id, self.mes, self.data, self.centavos]
+
+    @classmethod
+    def de_lista(cls, campos, cadastro):
+        crianca, mes, data, centavos = campos
+        return cls(cadastro.obter(crianca), mes, data, centavos)
+
+
+def itens_de_dados(dados, cadastro, arquivo=''):
+    """Gera os (id, Pagamento) de um snapshot lido do JSON, no esquema 2 ou 1.
+
+    No esquema 1 (lista de dicionários) o id pode faltar e vem como None.
+    """
+    if isinstance(dados, list):
+        return ((registro.get('id'), Pagamento.de_dict(registro, cadastro)) for registro in dados)
+    verificar_versao(dados, arquivo)
+    obter = cadastro.obter
+    return ((id_pag, Pagamento(obter(crianca), mes, data, centavos))
+            for id_pag, crianca, mes, data, centavos in dados['pagamentos'])
+
+
+def dados_de_itens(itens):
+    """Retorna o snapshot no esquema 2 a partir dos (id, Pagamento)."""
+    return {'versao': VERSAO_ESQUEMA,
+            'pagamentos': [[id_pag, pag.crianca.id, pag.mes, pag.data, pag.centavos] for id_pag, pag in itens]}
@@ -0,0 +1,325 @@
+"""Núcleo sem interface gráfica: regras de pagamento, consultas e relatórios.
+
+Usado pelo app Tk (app.py) e pela linha de comando (cli.py). Não importa
+tkinter; o fpdf só é importado ao gerar um PDF.
+"""
+from datetime import datetime
+
+from armazenamento import ArmazenamentoAnual
+from modelo import ESCOLAS, MESES_ORDENADOS, NOMES_MESES
+from regras import ATRASADO, POR_MES, POR_ULTIMO_PAGAMENTO, AvaliacaoAtrasos, Regra, Regras
+from tarefas import ConsultaCancelada
+
+# Arquivo para salvar os dados
+ARQUIVO_DADOS = 'pagamentos.json'
+
+# Forma de gravação: 'journal' (acrescenta só as alterações), 'json' (reescreve o arquivo)
+# ou 'sqlite' (banco pagamentos.db com consultas indexadas, migrado do JSON na primeira vez)
+MODO_ARMAZENAMENTO = 'journal'
+
+# Porta do serviço HTTP local de consultas (servidor.py), aberto junto com o app; None não abre
+PORTA_SERVICO = None
+
+# Dia atual para verificação de atraso (ajustável)
+CURRENT_DAY = 15
+
+# Dia usual de pagamento de quem ainda não tem histórico
+DIA_USUAL_PADRAO = 13
+
+# Dias de folga após o dia usual antes de considerar o pagamento atrasado
+DIAS_CARENCIA = 5
+
+# Dias desde o último pagamento a partir dos quais a criança está atrasada
+DIAS_TOLERANCIA = 25
+
+# Regras de atraso de quem não pagou no mês (regras.py). Até setembro, pelo dia
+# usual + carência comparado a CURRENT_DAY; de outubro em diante e em 'Todos os
+# Meses', pelos dias desde o último pagamento. Exceções por escola entram em por_escola,
+# por exemplo {'Gepan': {'dias_tolerancia': 35}}.
+REGRAS_ATRASO = Regras(
+    Regra(POR_ULTIMO_PAGAMENTO, dias_carencia=DIAS_CARENCIA, dias_tolerancia=DIAS_TOLERANCIA),
+    por_mes={mes: {'base': POR_MES, 'dia_referencia': CURRENT_DAY} for mes in range(1, 10)},
+    por_escola={},
+)
+
+
+def abrir_armazenamento(modo=None, arquivo=None):
+    """Retorna o armazenamento por ano no modo configurado (ou no modo/arquivo informados)."""
+    return ArmazenamentoAnual(modo or MODO_ARMAZENAMENTO, arquivo or ARQUIVO_DADOS)
+
+
+def repositorio_anterior(armazenamento, repositorio):
+    """Repositório do ano anterior ao do repositório, ou None se esse ano não tem dados ou não é preciso.
+
+    A avaliação de atrasos só usa o ano anterior para as crianças sem pagamento
+    datado no ano (em janeiro, quase todas): enquanto todas as ativas têm um, o
+    arquivo dele não é aberto.
+    """
+    ano = repositorio.ano - 1
+    if ano not in armazenamento.anos():
+        return None
+    if not armazenamento.carregado(ano) and not _precisa_do_anterior(repositorio):
+        return None
+    return armazenamento.carregar(ano)
+
+
+_anterior_necessario = None
+
+
+def _precisa_do_anterior(repositorio):
+    """Indica se alguma criança ativa não tem pagamento datado no ano; refeito só quando os dados mudam."""
+    global _anterior_necessario
+    versao = versao_dados(repositorio)
+    if _anterior_necessario is None or _anterior_necessario[0] != versao:
+        ultimos = repositorio.ultimos_por_crianca()
+        _anterior_necessario = (versao, any(crianca.ativo and not ultimos.get(crianca.id)
+                                            for crianca in repositorio.cadastro))
+    return _anterior_necessario[1]
+
+
+def validar_data(data_str):
+    """Valida e converte data de DD/MM/AAAA para YYYY-MM-DD. Retorna None se inválida."""
+    try:
+        dt = datetime.strptime(data_str, '%d/%m/%Y')
+        data_formatada = dt.strftime('%Y-%m-%d')
+        data_exibicao = dt.strftime('%d/%m/%Y')
+
+        return {'interna': data_formatada, 'exibicao': data_exibicao, 'ordinal': dt.toordinal()}
+    except ValueError:
+        return None
+
+
+_avaliacao = None
+
+
+def avaliar_atrasos(repositorio, hoje, anterior=None):
+    """Situação de todas as crianças (regras.AvaliacaoAtrasos), reaproveitada enquanto os dados e o dia não mudarem.
+
+    A tabela, o dashboard, o relatório e o resumo por escola usam o mesmo resultado.
+    """
+    global _avaliacao
+    chave = versao_dados(repositorio, anterior) + (hoje.toordinal(), REGRAS_ATRASO)
+    if _avaliacao is None or _avaliacao[0] != chave:
+        avaliacao = AvaliacaoAtrasos(repositorio, hoje, REGRAS_ATRASO, _dia_usual_por_crianca(repositorio), anterior)
+        _avaliacao = (chave, avaliacao)
+    return _avaliacao[1]
+
+
+def versao_dados(repositorio, anterior=None):
+    """Identifica o estado dos dados: muda a cada alteração nos pagamentos (do ano ou do anterior) ou no cadastro.
+
+    Um instantâneo tem a mesma versão do repositório de onde saiu.
+    """
+    cadastro = repositorio.cadastro.origem or repositorio.cadastro
+    return (_identidade(repositorio), repositorio.versao, cadastro, repositorio.cadastro.versao,
+            _identidade(anterior), anterior.versao if anterior is not None else None)
+
+
+def _identidade(repositorio):
+    """O ano do repositório (o instantâneo tem o mesmo do original), ou o próprio repositório se não tiver."""
+    return getattr(repositorio, 'ano', repositorio)
+
+
+def obter_atrasados(repositorio, hoje, anterior=None):
+    """Retorna [(nome, escola, último pagamento)] das crianças atrasadas, em ordem de nome.
+
+    anterior é o repositório do ano anterior: quem pagou até dezembro e ainda
+    não pagou no ano também entra, com o último pagamento daquele ano.
+    Crianças desativadas no cadastro não entram.
+    """
+    avaliacao = avaliar_atrasos(repositorio, hoje, anterior)
+    obter = repositorio.cadastro.obter
+    atrasados = []
+    for crianca in map(obter, avaliacao.atrasadas()):
+        if crianca.ativo and crianca.nome.strip():
+            atrasados.append((crianca.nome, crianca.escola, avaliacao.ultimo(crianca)))
+    atrasados.sort(key=lambda atrasado: (atrasado[0], atrasado[1]))
+    return atrasados
+
+
+def atrasados_por_escola(repositorio, hoje, anterior=None):
+    """Retorna {escola: quantidade de crianças atrasadas}, contadas como em obter_atrasados."""
+    contagem = {}
+    for _, escola, _ in obter_atrasados(repositorio, hoje, anterior):
+        contagem[escola] = contagem.get(escola, 0) + 1
+    return contagem
+
+
+def _dia_cadastrado(repositorio, nome):
+    """Dia usual guardado no cadastro (de anos anteriores), ou o padrão."""
+    for crianca in repositorio.cadastro.do_nome(nome):
+        if crianca.dia_usual is not None:
+            return crianca.dia_usual
+    return DIA_USUAL_PADRAO
+
+
+def dia_usual(repositorio, nome):
+    """Retorna o dia usual de pagamento da criança baseado no histórico.
+
+    Sem pagamentos datados no ano, usa o dia guardado no cadastro; padrão 13 se nenhum.
+    """
+    dia = repositorio.dia_usual(nome)
+    return _dia_cadastrado(repositorio, nome) if dia is None else dia
+
+
+def _dia_usual_por_crianca(repositorio):
+    """Retorna dia(crianca) com o dia usual dela; os dias de todas são calculados na primeira chamada."""
+    dias_usuais = None
+
+    def dia(crianca):
+        nonlocal dias_usuais
+        if dias_usuais is None:
+            dias_usuais = repositorio.dias_usuais()
+        if crianca.nome in dias_usuais:
+            return dias_usuais[crianca.nome]
+        return _dia_cadastrado(repositorio, crianca.nome)
+    return dia
+
+
+def totais_por_mes(repositorio, escola=None):
+    """Retorna {número do mês: centavos pagos}, opcionalmente só de uma escola."""
+    totais = {mes: repositorio.total_pago(mes, escola=escola) for mes in range(13)}
+    return {mes: centavos for mes, centavos in totais.items() if centavos}
+
+
+def resumo_filtro(repositorio, mes_selecionado, nome_selecionado, escola_selecionada, hoje, anterior=None):
+    """Retorna (pagas, não pagas, atrasadas, centavos) das linhas que calcular_linhas mostraria para os filtros.
+
+    Sem filtro de criança, vem dos agregados do repositório e das contagens da
+    avaliação de atrasos, sem percorrer as crianças.
+    """
+    if not repositorio:
+        return 0, 0, 0, 0
+    filtro_nome = None if nome_selecionado == 'Todas as Crianças' else nome_selecionado
+    filtro_escola = None if escola_selecionada == 'Todas as Escolas' else escola_selecionada
+    numero_mes = MESES_ORDENADOS.get(mes_selecionado)  # None para 'Todos os Meses'
+    centavos = repositorio.total_pago(numero_mes, filtro_nome, filtro_escola)
+    # Até setembro a tabela só mostra quem pagou no mês
+    com_nao_pagas = (numero_mes or 13) >= 10
+    if filtro_nome is None:
+        pagas = repositorio.criancas_pagantes(numero_mes, filtro_escola) if numero_mes else 0
+        if not com_nao_pagas:
+            return pagas, 0, 0, centavos
+        nao_pagas, atrasadas = avaliar_atrasos(repositorio, hoje, anterior).contagens(numero_mes, filtro_escola)
+        return pagas, nao_pagas, atrasadas, centavos
+    # Com uma criança escolhida são poucas linhas: cada uma é consultada como na tabela
+    pagas = nao_pagas = atrasadas = 0
+    avaliacao = avaliar_atrasos(repositorio, hoje, anterior)
+    criancas = repositorio.criancas(mes=None if com_nao_pagas else numero_mes, nome=filtro_nome, escola=filtro_escola)
+    for nome, escola in criancas:
+        if repositorio.buscar(nome, numero_mes, escola):
+            pagas += 1
+        elif avaliacao.situacao(repositorio.cadastro.buscar(nome, escola), numero_mes) == ATRASADO:
+            atrasadas += 1
+        else:
+            nao_pagas += 1
+    return pagas, nao_pagas, atrasadas, centavos
+
+
+def situacao_por_escola(repositorio, mes_selecionado, hoje, anterior=None):
+    """Retorna [(escola, pagas, não pagas, atrasadas, centavos)] do mês, uma linha por escola com crianças."""
+    escolas = list(ESCOLAS)
+    escolas += sorted({crianca.escola for crianca in repositorio.cadastro} - set(escolas))
+    linhas = []
+    for escola in escolas:
+        resumo = resumo_filtro(repositorio, mes_selecionado, 'Todas as Crianças', escola, hoje, anterior)
+        if any(resumo):
+            linhas.append((escola,) + resumo)
+    return linhas
+
+
+def obter_data_exibicao(pag):
+    """Retorna data de exibição ou '--' se vazia."""
+    return pag.data_exibicao or '--'
+
+
+def meses_vizinhos(mes_selecionado):
+    """Nomes dos meses antes e depois do selecionado (nenhum para 'Todos os Meses')."""
+    numero_mes = MESES_ORDENADOS.get(mes_selecionado)
+    if numero_mes is None:
+        return []
+    return [NOMES_MESES[vizinho] for vizinho in (numero_mes + 1, numero_mes - 1) if 1 <= vizinho <= 12]
+
+
+def calcular_linhas(repositorio, mes_selecionado, nome_selecionado, escola_selecionada, hoje, anterior=None,
+                    cancelado=None):
+    """Retorna as linhas (iid, values, tags) da tabela principal para os filtros informados.
+
+    anterior é o repositório do ano anterior, como em obter_atrasados.
+    Pode rodar fora da thread do Tk; cancelado() é consultado periodicamente
+    para abandonar uma consulta superada.
+    """
+    if not repositorio:
+        return [('mensagem', ("Nenhum pagamento cadastrado.", "", "", "", "", ""), ())]
+
+    # Obter crianças únicas que atendem aos filtros
+    filtro_nome = None if nome_selecionado == 'Todas as Crianças' else nome_selecionado
+    filtro_escola = None if escola_selecionada == 'Todas as Escolas' else escola_selecionada
+    numero_mes = MESES_ORDENADOS.get(mes_selecionado)  # None para 'Todos os Meses'
+    mes_order = numero_mes or 13
+    if mes_order >= 10:  # Outubro ou posterior
+        # Incluir todas as crianças únicas do dataset, filtradas por nome e escola se selecionados
+        criancas_filtradas = repositorio.criancas(nome=filtro_nome, escola=filtro_escola)
+    else:
+        # Lógica original para meses anteriores
+        criancas_filtradas = repositorio.criancas(mes=numero_mes, nome=filtro_nome, escola=filtro_escola)
+
+    if not criancas_filtradas:
+        filtro_msg = f"Nenhum pagamento para {mes_selecionado} - {nome_selecionado} - {escola_selecionada}."
+        return [('mensagem', (filtro_msg, "", "", "", "", ""), ())]
+
+    # Situação de quem não pagou no mês, avaliada de uma vez para todas as crianças
+    avaliacao = avaliar_atrasos(repositorio, hoje, anterior)
+    buscar_crianca = repositorio.cadastro.buscar
+
+    # Para cada criança, verificar status
+    linhas = []
+    for posicao, (nome, escola) in enumerate(sorted(criancas_filtradas, key=lambda x: (x[1], x[0]))):  # Ordenar por escola, depois por nome
+        if cancelado is not None and posicao % 256 == 0 and cancelado():
+            raise ConsultaCancelada()
+        chave = f"{escola}\t{nome}"  # Identifica a linha entre atualizações da tabela
+        # Verificar se há pagamento no mês selecionado
+        encontrado = repositorio.buscar(nome, numero_mes, escola)
+        pag_mes = encontrado[1] if encontrado else None
+
+        if pag_mes:
+            # Pago
+            data_exib = obter_data_exibicao(pag_mes)
+            linhas.append((chave, (nome, data_exib, mes_selecionado, escola, "Pago", f"R$ {pag_mes.valor:.2f}"), ('pago',)))
+        elif avaliacao.situacao(buscar_crianca(nome, escola), numero_mes) == ATRASADO:
+            linhas.append((chave, (nome, "--", mes_selecionado, escola, "Pagamento Atrasado", "--"), ('atrasado',)))
+        else:
+            linhas.append((chave, (nome, "--", mes_selecionado, escola, "não pago", "--"), ('nao_pago',)))
+
+    # Adiciona linha de total (apenas dos pagos), lida dos agregados do repositório
+    total_centavos = repositorio.total_pago(numero_mes, filtro_nome, filtro_escola)
+    total_label = f"Total para {mes_selecionado} - {nome_selecionado} - {escola_selecionada}:"
+    linhas.append(('total', ("", "", "", "", total_label, f"R$ {total_centavos / 100:.2f}"), ()))
+    return linhas
+
+
+def gerar_pdf_atrasados(atrasados, hoje, arquivo):
+    """Grava em arquivo o PDF com as crianças atrasadas ([(nome, escola, último pagamento)]).
+
+    Lança RuntimeError se a biblioteca fpdf não estiver instalada.
+    """
+    try:
+        from fpdf import FPDF
+    except ImportError:
+        raise RuntimeError("Biblioteca fpdf não encontrada. Instale com: pip install fpdf")
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+
+    pdf.cell(200, 10, txt=f"Relatório de Pagamentos Atrasados - {hoje.strftime('%d/%m/%Y')}", ln=True, align='C')
+    pdf.ln(10)
+
+    pdf.cell(100, 10, txt="Nome da Criança", border=1)
+    pdf.cell(100, 10, txt="Último Pagamento", border=1, ln=True)
+
+    for nome, _, ultimo_pag in atrasados:
+        pdf.cell(100, 10, txt=nome, border=1)
+        pdf.cell(100, 10, txt=ultimo_pag.strftime('%d/%m/%Y') if ultimo_pag else 'Nunca pagou', border=1, ln=True)
+
+    pdf.output(arquivo)
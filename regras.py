@@ -0,0 +1,169 @@
+"""Regras de atraso: declaradas uma vez, compiladas por mês e escola e avaliadas de uma vez para todas as crianças.
+
+Uma Regra diz como decidir se a criança sem pagamento no mês está atrasada:
+pelo dia do mês (dia de referência depois do dia usual + carência) ou pelos
+dias desde o último pagamento. Regras reúne a regra padrão e as exceções por
+mês e por escola; AvaliacaoAtrasos classifica todas as crianças numa
+passada, e as telas (tabela, dashboard, relatório, resumo) leem o mesmo
+resultado.
+"""
+from datetime import datetime
+
+# Situações de uma criança num mês
+PAGO = 'pago'
+NAO_PAGO = 'nao_pago'
+ATRASADO = 'atrasado'
+
+# Bases de uma regra
+POR_MES = 'mes'                             # atrasado se o dia de referência passou do dia usual + carência
+POR_ULTIMO_PAGAMENTO = 'ultimo_pagamento'   # atrasado se o último pagamento tem mais de dias_tolerancia dias
+
+# Meses avaliados: 0 é 'Todos os Meses', 1 a 12 são os meses
+MESES_AVALIADOS = range(13)
+
+
+class Regra:
+    """Como classificar quem não pagou no mês.
+
+    dia_referencia None usa o dia de hoje; dias_carencia vale para a base
+    POR_MES e dias_tolerancia para POR_ULTIMO_PAGAMENTO.
+    """
+    __slots__ = ('base', 'dias_carencia', 'dias_tolerancia', 'dia_referencia')
+
+    def __init__(self, base=POR_ULTIMO_PAGAMENTO, dias_carencia=5, dias_tolerancia=25, dia_referencia=None):
+        if base not in (POR_MES, POR_ULTIMO_PAGAMENTO):
+            raise ValueError(f"Base de regra desconhecida: {base!r}")
+        self.base = base
+        self.dias_carencia = dias_carencia
+        self.dias_tolerancia = dias_tolerancia
+        self.dia_referencia = dia_referencia
+
+    def __repr__(self):
+        campos = ', '.join(f"{campo}={getattr(self, campo)!r}" for campo in self.__slots__)
+        return f"Regra({campos})"
+
+    def com(self, alteracoes):
+        """Retorna uma cópia com os campos de alteracoes ({campo: valor}) trocados."""
+        campos = {campo: getattr(self, campo) for campo in self.__slots__}
+        desconhecidos = set(alteracoes) - set(campos)
+        if desconhecidos:
+            raise ValueError(f"Campos de regra desconhecidos: {', '.join(sorted(desconhecidos))}")
+        campos.update(alteracoes)
+        return Regra(**campos)
+
+    def situacao(self, ultimo, dia_usual, hoje):
+        """ATRASADO ou NAO_PAGO para quem não pagou no mês.
+
+        ultimo é o ordinal do último pagamento (0 se nunca pagou); dia_usual só
+        é consultado (chamado) na base POR_MES.
+        """
+        if self.base == POR_ULTIMO_PAGAMENTO:
+            return ATRASADO if not ultimo or hoje.toordinal() - ultimo > self.dias_tolerancia else NAO_PAGO
+        dia = self.dia_referencia if self.dia_referencia is not None else hoje.day
+        return ATRASADO if dia > dia_usual() + self.dias_carencia else NAO_PAGO
+
+
+class Regras:
+    """Regra padrão com exceções por mês (1-12, 0 = todos os meses) e por escola.
+
+    As exceções são dicionários {campo: valor}; as da escola são aplicadas
+    depois das do mês. A regra de cada (mês, escola) é montada uma vez só.
+    """
+
+    def __init__(self, padrao, por_mes=None, por_escola=None):
+        self.padrao = padrao
+        self.por_mes = dict(por_mes or {})
+        self.por_escola = dict(por_escola or {})
+        self._compiladas = {}
+
+    def regra(self, mes, escola):
+        """Regra que vale para o mês (0 ou None = todos) na escola."""
+        chave = (mes or 0, escola)
+        regra = self._compiladas.get(chave)
+        if regra is None:
+            regra = self.padrao.com({**self.por_mes.get(mes or 0, {}), **self.por_escola.get(escola, {})})
+            # Regras iguais viram o mesmo objeto, para cada criança avaliar cada uma só uma vez
+            for outra in self._compiladas.values():
+                if all(getattr(outra, campo) == getattr(regra, campo) for campo in Regra.__slots__):
+                    regra = outra
+                    break
+            self._compiladas[chave] = regra
+        return regra
+
+    def da_escola(self, escola):
+        """Tupla com a regra de cada mês avaliado (0 a 12) na escola."""
+        return tuple(self.regra(mes, escola) for mes in MESES_AVALIADOS)
+
+
+class AvaliacaoAtrasos:
+    """Situação de todas as crianças do ano numa data, calculada de uma vez.
+
+    Entram as crianças com pagamentos no ano e, se informado, as do ano
+    anterior (para quem ainda não pagou no ano, vale o último pagamento de
+    lá). dia_usual(crianca) dá o dia usual da criança, consultado só pelas
+    regras POR_MES. Na mesma passada são contadas, por escola e mês, as
+    crianças do ano sem pagamento no mês (contagens).
+    """
+
+    def __init__(self, repositorio, hoje, regras, dia_usual, anterior=None):
+        self.hoje = hoje
+        self._ultimos = repositorio.ultimos_por_crianca()
+        do_ano = set(self._ultimos)
+        meses_pagos = repositorio.meses_pagos()
+        self._contagens = {}    # (escola, mês avaliado) -> [não pagas, atrasadas], das crianças do ano
+        if anterior is not None:
+            for crianca, ultimo in anterior.ultimos_por_crianca().items():
+                if not self._ultimos.get(crianca):
+                    self._ultimos[crianca] = ultimo
+        self._situacoes = {}    # id da criança -> situação em cada mês avaliado, para quem não pagou nele
+        regras_escola = {}
+        obter = repositorio.cadastro.obter
+        for id_crianca, ultimo in self._ultimos.items():
+            crianca = obter(id_crianca)
+            por_mes = regras_escola.get(crianca.escola)
+            if por_mes is None:
+                por_mes = regras_escola[crianca.escola] = regras.da_escola(crianca.escola)
+            avaliadas = {}
+            for regra in por_mes:
+                if regra not in avaliadas:
+                    avaliadas[regra] = regra.situacao(ultimo, lambda: dia_usual(crianca), hoje)
+            situacoes = self._situacoes[id_crianca] = tuple(avaliadas[regra] for regra in por_mes)
+            if id_crianca in do_ano:
+                for mes, situacao in enumerate(situacoes):
+                    if not mes or (id_crianca, mes) not in meses_pagos:    # em 'Todos os Meses' ninguém conta como pago
+                        contagem = self._contagens.get((crianca.escola, mes))
+                        if contagem is None:
+                            contagem = self._contagens[(crianca.escola, mes)] = [0, 0]
+                        contagem[situacao == ATRASADO] += 1
+
+    def __len__(self):
+        return len(self._situacoes)
+
+    def situacao(self, crianca, mes=None):
+        """ATRASADO ou NAO_PAGO da criança sem pagamento no mês (None = todos os meses)."""
+        return self._situacoes[crianca.id][mes or 0]
+
+    def ultimo(self, crianca):
+        """Data (datetime) do último pagamento da criança, ou None se nunca pagou."""
+        ultimo = self._ultimos.get(crianca.id)
+        return datetime.fromordinal(ultimo) if ultimo else None
+
+    def contagens(self, mes=None, escola=None):
+        """Retorna (não pagas, atrasadas) entre as crianças do ano sem pagamento no mês (None = todos os meses).
+
+        Sem escola, soma todas as escolas.
+        """
+        indice = mes or 0
+        if escola is not None:
+            return tuple(self._contagens.get((escola, indice), (0, 0)))
+        nao_pagas = atrasadas = 0
+        for (_, mes_contagem), (nao_pagas_escola, atrasadas_escola) in self._contagens.items():
+            if mes_contagem == indice:
+                nao_pagas += nao_pagas_escola
+                atrasadas += atrasadas_escola
+        return nao_pagas, atrasadas
+
+    def atrasadas(self, mes=None):
+        """Ids das crianças atrasadas no mês (None = todos os meses)."""
+        indice = mes or 0
+        return [crianca for crianca, situacoes in self._situacoes.items() if situacoes[indice] == ATRASADO]
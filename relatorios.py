@@ -0,0 +1,161 @@
+"""Relatórios mensais em lote: um PDF por escola e um consolidado, gerados em paralelo.
+
+preparar_relatorios monta, no processo principal, um instantâneo só com
+tuplas e textos (atrasados pela avaliação de regras.py, pagamentos do mês e
+totais), e GeracaoRelatorios escreve cada PDF num processo separado
+(ProcessPoolExecutor). O consolidado, o maior, é enviado primeiro, para o
+lote levar mais ou menos o tempo do relatório mais demorado.
+"""
+import importlib.util
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import nucleo
+from busca import normalizar
+from modelo import ESCOLAS, NOMES_MESES
+
+# Nome do arquivo de cada relatório: relatorio-2026-11-altenfelder-manha.pdf, relatorio-2026-11-consolidado.pdf
+PADRAO_ARQUIVO = 'relatorio-{ano}-{mes:02d}-{nome}.pdf'
+
+
+def _nome_arquivo(ano, mes, nome):
+    return PADRAO_ARQUIVO.format(ano=ano, mes=mes, nome=re.sub(r'[^a-z0-9]+', '-', normalizar(nome)).strip('-'))
+
+
+def preparar_relatorios(repositorio, hoje, anterior=None, mes=None):
+    """Retorna [(nome do arquivo, relatório)] das escolas e do consolidado, para o mês (padrão: o de hoje).
+
+    Cada relatório é um dicionário só com textos, números e tuplas, para ser
+    enviado a outro processo.
+    """
+    mes = mes or hoje.month
+    ano = getattr(repositorio, 'ano', hoje.year)
+    escolas = list(ESCOLAS)
+    escolas += sorted({crianca.escola for crianca in repositorio.cadastro} - set(escolas))
+    atrasados = {}
+    for nome, escola, ultimo_pag in nucleo.obter_atrasados(repositorio, hoje, anterior):
+        ultimo = ultimo_pag.strftime('%d/%m/%Y') if ultimo_pag else 'Nunca pagou'
+        dias = str((hoje - ultimo_pag).days) if ultimo_pag else '--'
+        atrasados.setdefault(escola, []).append((nome, escola, ultimo, dias))
+    # Pelos índices de escola × mês, sem percorrer todos os pagamentos
+    pagos = {escola: [(pag.nome, escola, nucleo.obter_data_exibicao(pag), pag.centavos)
+                      for pag in repositorio.da_escola_mes(escola, mes)]
+             for escola in escolas}
+    totais_ano = {escola: repositorio.total_pago(escola=escola) for escola in escolas}
+
+    def relatorio(titulo, de_escolas):
+        return {
+            'titulo': titulo,
+            'periodo': f"{NOMES_MESES[mes]}/{ano}",
+            'emissao': hoje.strftime('%d/%m/%Y'),
+            'consolidado': len(de_escolas) > 1,
+            'atrasados': sorted(linha for escola in de_escolas for linha in atrasados.get(escola, ())),
+            'pagos': sorted(linha for escola in de_escolas for linha in pagos.get(escola, ())),
+            'total_ano': sum(totais_ano.get(escola, 0) for escola in de_escolas),
+        }
+    relatorios = [(_nome_arquivo(ano, mes, 'consolidado'), relatorio("Todas as Escolas", escolas))]
+    relatorios += [(_nome_arquivo(ano, mes, escola), relatorio(escola, [escola])) for escola in escolas]
+    return relatorios
+
+
+def _exigir_fpdf():
+    if importlib.util.find_spec('fpdf') is None:
+        raise RuntimeError("Biblioteca fpdf não encontrada. Instale com: pip install fpdf")
+
+
+def escrever_pdf(relatorio, arquivo):
+    """Grava o PDF de um relatório de preparar_relatorios. Roda nos processos do lote."""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(190, 10, txt=f"Pagamentos - {relatorio['titulo']} - {relatorio['periodo']}", ln=True, align='C')
+    pdf.set_font("Arial", size=10)
+    pdf.cell(190, 6, txt=f"Emitido em {relatorio['emissao']}", ln=True, align='C')
+    pdf.ln(4)
+
+    total_mes = sum(centavos for *_, centavos in relatorio['pagos'])
+    pdf.cell(190, 6, txt=f"Pagamentos no mês: {len(relatorio['pagos'])} - R$ {total_mes / 100:.2f}", ln=True)
+    pdf.cell(190, 6, txt=f"Total no ano: R$ {relatorio['total_ano'] / 100:.2f}", ln=True)
+    pdf.cell(190, 6, txt=f"Crianças atrasadas: {len(relatorio['atrasados'])}", ln=True)
+
+    # Com todas as escolas, cada linha mostra também a escola
+    largura_nome = 80 if relatorio['consolidado'] else 120
+    pdf.ln(4)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(190, 8, txt="Atrasados", ln=True)
+    pdf.set_font("Arial", size=10)
+    for nome, escola, ultimo, dias in relatorio['atrasados']:
+        pdf.cell(largura_nome, 7, txt=nome, border=1)
+        if relatorio['consolidado']:
+            pdf.cell(40, 7, txt=escola, border=1)
+        pdf.cell(40, 7, txt=ultimo, border=1)
+        pdf.cell(30, 7, txt=dias, border=1, ln=True)
+
+    pdf.ln(4)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(190, 8, txt="Pagamentos do mês", ln=True)
+    pdf.set_font("Arial", size=10)
+    for nome, escola, data, centavos in relatorio['pagos']:
+        pdf.cell(largura_nome, 7, txt=nome, border=1)
+        if relatorio['consolidado']:
+            pdf.cell(40, 7, txt=escola, border=1)
+        pdf.cell(40, 7, txt=data, border=1)
+        pdf.cell(30, 7, txt=f"R$ {centavos / 100:.2f}", border=1, ln=True, align='R')
+
+    pdf.output(arquivo)
+    return arquivo
+
+
+class GeracaoRelatorios:
+    """Escreve os relatórios em diretorio, um processo por relatório (até processos ao mesmo tempo).
+
+    concluidos() e pronto servem para acompanhar sem bloquear (pela interface);
+    aguardar() bloqueia até o fim. Lança RuntimeError se o fpdf não estiver instalado.
+    """
+
+    def __init__(self, relatorios, diretorio, processos=None):
+        _exigir_fpdf()
+        os.makedirs(diretorio, exist_ok=True)
+        self.total = len(relatorios)
+        # Os maiores primeiro: o lote termina junto com o mais demorado
+        em_ordem = sorted(relatorios, key=lambda item: len(item[1]['atrasados']) + len(item[1]['pagos']), reverse=True)
+        # spawn: o app tem threads (consultas, gravação), e fork com threads pode travar o processo filho
+        executor = ProcessPoolExecutor(max_workers=processos or min(self.total, os.cpu_count() or 1) or 1,
+                                       mp_context=multiprocessing.get_context('spawn'))
+        self._futuros = [executor.submit(escrever_pdf, relatorio, os.path.join(diretorio, nome))
+                         for nome, relatorio in em_ordem]
+        executor.shutdown(wait=False)
+
+    def concluidos(self):
+        """Quantos relatórios já terminaram (com ou sem erro)."""
+        return sum(futuro.done() for futuro in self._futuros)
+
+    @property
+    def pronto(self):
+        return all(futuro.done() for futuro in self._futuros)
+
+    def aguardar(self, progresso=None):
+        """Espera todos e retorna os arquivos gravados; progresso(concluídos, total, arquivo) a cada um.
+
+        Relança o primeiro erro de um relatório.
+        """
+        for concluidos, futuro in enumerate(as_completed(self._futuros), 1):
+            arquivo = futuro.result()
+            if progresso is not None:
+                progresso(concluidos, self.total, arquivo)
+        return [futuro.result() for futuro in self._futuros]
+
+    def cancelar(self):
+        """Desiste dos relatórios que ainda não começaram."""
+        for futuro in self._futuros:
+            futuro.cancel()
+
+
+def gerar_relatorios(repositorio, hoje, diretorio, anterior=None, mes=None, processos=None, progresso=None):
+    """Prepara e grava todos os relatórios do mês em diretorio, esperando o fim. Retorna os arquivos."""
+    relatorios = preparar_relatorios(repositorio, hoje, anterior, mes)
+    return GeracaoRelatorios(relatorios, diretorio, processos).aguardar(progresso)
@@ -0,0 +1,576 @@
+"""Repositório em memória dos pagamentos, com índices atualizados a cada alteração."""
+import gc
+from collections import Counter
+from datetime import date, datetime
+
+from cadastro import CadastroCriancas
+from modelo import Pagamento
+
+
+def _indexar(indice, chave, id_pag):
+    """Acrescenta id_pag ao conjunto ordenado da chave no índice."""
+    indice.setdefault(chave, {})[id_pag] = None
+
+
+def _desindexar(indice, chave, id_pag):
+    """Retira id_pag do conjunto da chave, apagando a chave se ficar vazia."""
+    ids = indice.get(chave)
+    if ids is None:
+        return
+    ids.pop(id_pag, None)
+    if not ids:
+        del indice[chave]
+
+
+class Agregados:
+    """Somas dos pagamentos por (escola, mês), (criança, mês) e mês, mantidas a cada alteração.
+
+    Cada chave guarda [centavos, quantidade]: em (criança, mês) a quantidade é
+    de pagamentos; em (escola, mês) e mês, de crianças com algum pagamento.
+    """
+
+    def __init__(self):
+        self.por_escola_mes = {}
+        self.por_crianca_mes = {}
+        self.por_mes = {}
+
+    def __eq__(self, outro):
+        return (self.por_escola_mes, self.por_crianca_mes, self.por_mes) == \
+            (outro.por_escola_mes, outro.por_crianca_mes, outro.por_mes)
+
+    @classmethod
+    def de_pagamentos(cls, pagamentos):
+        """Monta os agregados do zero a partir dos pagamentos."""
+        agregados = cls()
+        for pag in pagamentos:
+            agregados.incluir(pag.crianca.id, pag.crianca.escola, pag.mes, pag.centavos)
+        return agregados
+
+    def copiar(self):
+        copia = Agregados()
+        copia.por_escola_mes = {chave: list(soma) for chave, soma in self.por_escola_mes.items()}
+        copia.por_crianca_mes = {chave: list(soma) for chave, soma in self.por_crianca_mes.items()}
+        copia.por_mes = {chave: list(soma) for chave, soma in self.por_mes.items()}
+        return copia
+
+    def incluir(self, crianca, escola, mes, centavos):
+        soma = self.por_crianca_mes.get((crianca, mes))
+        nova = soma is None     # primeiro pagamento da criança no mês
+        if nova:
+            soma = self.por_crianca_mes[(crianca, mes)] = [0, 0]
+        soma[0] += centavos
+        soma[1] += 1
+        for indice, chave in ((self.por_escola_mes, (escola, mes)), (self.por_mes, mes)):
+            soma = indice.get(chave)
+            if soma is None:
+                soma = indice[chave] = [0, 0]
+            soma[0] += centavos
+            soma[1] += nova
+
+    def retirar(self, crianca, escola, mes, centavos):
+        soma = self.por_crianca_mes[(crianca, mes)]
+        soma[0] -= centavos
+        soma[1] -= 1
+        ultima = not soma[1]    # a criança não tem mais pagamentos no mês
+        if ultima:
+            del self.por_crianca_mes[(crianca, mes)]
+        for indice, chave in ((self.por_escola_mes, (escola, mes)), (self.por_mes, mes)):
+            soma = indice[chave]
+            soma[0] -= centavos
+            soma[1] -= ultima
+            if not soma[1]:
+                del indice[chave]
+
+    def diferencas(self, outro):
+        """Quantas chaves têm valores diferentes entre os dois agregados."""
+        total = 0
+        for meu, dele in ((self.por_escola_mes, outro.por_escola_mes), (self.por_crianca_mes, outro.por_crianca_mes),
+                          (self.por_mes, outro.por_mes)):
+            total += sum(1 for chave in meu.keys() | dele.keys() if meu.get(chave) != dele.get(chave))
+        return total
+
+
+class Lote:
+    """Alterações preparadas para aplicar de uma vez: ou todas entram, ou nenhuma.
+
+    adicionar/atualizar/remover/gravar só registram a operação; o repositório
+    muda em aplicar(), que confere todas antes e desfaz as já feitas se alguma
+    falhar. As crianças dos pagamentos do lote vêm de crianca(): as novas (ou
+    inativas) só entram no cadastro em aplicar(), e saem de novo se ele falhar.
+    Serve para qualquer repositório com a interface de RepositorioPagamentos.
+    """
+
+    def __init__(self, repositorio):
+        self.repositorio = repositorio
+        self._operacoes = []    # (op, id_pag, pag)
+        self._ids = set()       # ids já alterados no lote
+        self._criancas = {}     # (nome, escola) -> criança a incluir ou reativar em aplicar()
+
+    def __len__(self):
+        return len(self._operacoes)
+
+    def _reservar(self, id_pag):
+        if id_pag in self._ids:
+            raise ValueError(f"Pagamento {id_pag} alterado duas vezes no mesmo lote.")
+        self._ids.add(id_pag)
+
+    def crianca(self, nome, escola):
+        """Retorna a criança para montar um Pagamento do lote, sem mexer no cadastro antes de aplicar()."""
+        crianca = self.repositorio.cadastro.buscar(nome, escola)
+        if crianca is not None and crianca.ativo:
+            return crianca
+        if (nome, escola) not in self._criancas:
+            self._criancas[(nome, escola)] = crianca or self.repositorio.cadastro.nova(nome, escola)
+        return self._criancas[(nome, escola)]
+
+    def adicionar(self, pag):
+        self._operacoes.append(('adicionar', None, pag))
+
+    def atualizar(self, id_pag, pag):
+        self._reservar(id_pag)
+        self._operacoes.append(('atualizar', id_pag, pag))
+
+    def remover(self, id_pag):
+        self._reservar(id_pag)
+        self._operacoes.append(('remover', id_pag, None))
+
+    def gravar(self, nome, mes, pag, escola=None):
+        """Prepara o pagamento da criança no mês: substitui o existente, adiciona, ou remove se pag é None."""
+        existente = self.repositorio.buscar(nome, mes, escola)
+        if pag is None:
+            if existente:
+                self.remover(existente[0])
+        elif existente is None:
+            self.adicionar(pag)
+        elif existente[1] != pag:
+            self.atualizar(existente[0], pag)
+
+    def aplicar(self):
+        """Aplica as operações e retorna quantas foram feitas; se uma falhar, desfaz as anteriores e relança o erro."""
+        repositorio = self.repositorio
+        cadastro = repositorio.cadastro
+        for op, id_pag, _ in self._operacoes:
+            if op != 'adicionar' and id_pag not in repositorio:
+                raise KeyError(f"Pagamento {id_pag} não existe mais.")
+        for (nome, escola), crianca in self._criancas.items():
+            if cadastro.buscar(nome, escola) not in (None, crianca):
+                raise ValueError(f"{nome} ({escola}) foi cadastrada enquanto o lote era preparado.")
+        usadas = {pag.crianca.id for _, _, pag in self._operacoes if pag is not None}
+        incluidas = []          # (como desfazer, criança) das crianças incluídas ou reativadas
+        desfazer = []
+        try:
+            for crianca in self._criancas.values():
+                if crianca.id not in usadas:
+                    continue
+                if crianca.id in cadastro:
+                    cadastro.registrar(crianca.nome, crianca.escola)
+                    incluidas.append((cadastro.desativar, crianca))
+                else:
+                    cadastro.restaurar(crianca)
+                    incluidas.append((cadastro.remover, crianca))
+            for op, id_pag, pag in self._operacoes:
+                if op == 'adicionar':
+                    desfazer.append(('remover', repositorio.adicionar(pag), None))
+                elif op == 'atualizar':
+                    desfazer.append(('atualizar', id_pag, repositorio.obter(id_pag)))
+                    repositorio.atualizar(id_pag, pag)
+                else:
+                    desfazer.append(('definir', id_pag, repositorio.obter(id_pag)))
+                    repositorio.remover(id_pag)
+        except Exception:
+            for op, id_pag, pag in reversed(desfazer):
+                if op == 'remover':
+                    repositorio.remover(id_pag)
+                else:
+                    repositorio.definir(id_pag, pag)
+            for desfazer_crianca, crianca in reversed(incluidas):
+                desfazer_crianca(crianca)
+            raise
+        self._operacoes = []
+        self._ids = set()
+        self._criancas = {}
+        return len(desfazer)
+
+
+def _copiar_pagamento(pag, obter):
+    """O pagamento apontando para a criança do instantâneo do cadastro (obter é o dele)."""
+    return Pagamento(obter(pag.crianca.id), pag.mes, pag.data, pag.centavos)
+
+
+class RepositorioPagamentos:
+    """Guarda os pagamentos por id e mantém índices pelo id da criança, (criança, mês) e (escola, mês).
+
+    Nomes e escolas ficam no cadastro de crianças; as consultas por nome passam
+    por ele e os índices usam só o id da criança.
+    """
+
+    def __init__(self, registros=None, cadastro=None):
+        self.cadastro = cadastro if cadastro is not None else CadastroCriancas()
+        self._registros = {}
+        self._proximo_id = 0
+        self._por_chave = {}        # (id da criança, mes) -> ids
+        self._por_crianca = {}      # id da criança -> ids
+        self._por_escola_mes = {}   # (escola, mes) -> ids
+        self._ultimo_pagamento = {}  # id da criança -> ordinal da data do pagamento mais recente
+        self._dias_pagamento = {}   # id da criança -> Counter(dia do mês -> quantidade de pagamentos)
+        self._agregados = Agregados()
+        self._observadores = []
+        self.versao = 0             # incrementada a cada alteração
+        self._instantaneo = None
+        self._alterados = set()     # ids dos pagamentos alterados depois do último instantâneo
+        for pag in registros or []:
+            self.adicionar(pag)
+
+    def __len__(self):
+        return len(self._registros)
+
+    def __bool__(self):
+        return bool(self._registros)
+
+    def __iter__(self):
+        return iter(self._registros.values())
+
+    def __contains__(self, id_pag):
+        return id_pag in self._registros
+
+    def observar(self, funcao):
+        """Registra funcao(op, id_pag, pag) para ser chamada a cada alteração."""
+        self._observadores.append(funcao)
+
+    def _notificar(self, op, id_pag, pag):
+        self.versao += 1
+        self._alterados.add(id_pag)
+        for funcao in self._observadores:
+            funcao(op, id_pag, pag)
+
+    def lote(self):
+        """Retorna um Lote para preparar várias alterações e aplicá-las juntas."""
+        return Lote(self)
+
+    def crianca(self, nome, escola):
+        """Retorna a criança do cadastro, criando-a se for nova. Use ao montar um Pagamento."""
+        return self.cadastro.registrar(nome, escola)
+
+    def instantaneo(self):
+        """Retorna uma cópia do estado atual para leitura em outra thread.
+
+        A cópia leva o instantâneo do cadastro, e os pagamentos dela apontam para
+        as crianças dele. É reaproveitada enquanto nem o repositório nem o
+        cadastro mudarem e não deve ser alterada.
+        """
+        if (self._instantaneo is None or self._instantaneo.versao != self.versao
+                or self._instantaneo.cadastro.versao != self.cadastro.versao):
+            cadastro = self.cadastro.instantaneo()
+            obter = cadastro.obter
+            anterior = self._instantaneo
+            copia = RepositorioPagamentos(cadastro=cadastro)
+            if anterior is None:
+                copia._registros = {id_pag: _copiar_pagamento(pag, obter) for id_pag, pag in self._registros.items()}
+            else:
+                # Só os pagamentos alterados e os das crianças que mudaram ganham cópia nova
+                copia._registros = dict(anterior._registros)
+                alterados = self._alterados
+                if cadastro is not anterior.cadastro:
+                    for id_crianca in cadastro.diferentes(anterior.cadastro):
+                        alterados.update(self._por_crianca.get(id_crianca, ()))
+                for id_pag in alterados:
+                    pag = self._registros.get(id_pag)
+                    if pag is None:
+                        copia._registros.pop(id_pag, None)
+                    else:
+                        copia._registros[id_pag] = _copiar_pagamento(pag, obter)
+            self._alterados = set()
+            copia._proximo_id = self._proximo_id
+            copia._por_chave = {chave: dict(ids) for chave, ids in self._por_chave.items()}
+            copia._por_crianca = {chave: dict(ids) for chave, ids in self._por_crianca.items()}
+            copia._por_escola_mes = {chave: dict(ids) for chave, ids in self._por_escola_mes.items()}
+            copia._ultimo_pagamento = dict(self._ultimo_pagamento)
+            copia._dias_pagamento = {chave: Counter(dias) for chave, dias in self._dias_pagamento.items()}
+            copia._agregados = self._agregados.copiar()
+            copia.versao = self.versao
+            if hasattr(self, 'ano'):
+                copia.ano = self.ano
+            self._instantaneo = copia
+        return self._instantaneo
+
+    # --- Manutenção dos índices ---
+
+    def _indexar_registro(self, id_pag, pag):
+        crianca = pag.crianca.id
+        _indexar(self._por_chave, (crianca, pag.mes), id_pag)
+        _indexar(self._por_crianca, crianca, id_pag)
+        _indexar(self._por_escola_mes, (pag.escola, pag.mes), id_pag)
+        self._agregados.incluir(crianca, pag.escola, pag.mes, pag.centavos)
+        if pag.data:
+            if pag.data > self._ultimo_pagamento.get(crianca, 0):
+                self._ultimo_pagamento[crianca] = pag.data
+            dias = self._dias_pagamento.get(crianca)
+            if dias is None:
+                dias = self._dias_pagamento[crianca] = Counter()
+            dias[date.fromordinal(pag.data).day] += 1
+
+    def _desindexar_registro(self, id_pag, pag):
+        crianca = pag.crianca.id
+        _desindexar(self._por_chave, (crianca, pag.mes), id_pag)
+        _desindexar(self._por_crianca, crianca, id_pag)
+        _desindexar(self._por_escola_mes, (pag.escola, pag.mes), id_pag)
+        self._agregados.retirar(crianca, pag.escola, pag.mes, pag.centavos)
+        if pag.data:
+            if pag.data == self._ultimo_pagamento.get(crianca):
+                self._recalcular_ultimo(crianca)
+            dias = self._dias_pagamento[crianca]
+            dia = date.fromordinal(pag.data).day
+            dias[dia] -= 1
+            if not dias[dia]:
+                del dias[dia]
+                if not dias:
+                    del self._dias_pagamento[crianca]
+
+    def _recalcular_ultimo(self, crianca):
+        """Recalcula o pagamento mais recente da criança após uma remoção."""
+        ultimo = max((self._registros[i].data for i in self._por_crianca.get(crianca, ())), default=0)
+        if ultimo:
+            self._ultimo_pagamento[crianca] = ultimo
+        else:
+            self._ultimo_pagamento.pop(crianca, None)
+
+    def _ids_criancas(self, nome, escola=None):
+        """Ids das crianças com o nome (na escola, se informada)."""
+        if escola is not None:
+            crianca = self.cadastro.buscar(nome, escola)
+            return [crianca.id] if crianca is not None else []
+        return [crianca.id for crianca in self.cadastro.do_nome(nome)]
+
+    # --- Alterações ---
+
+    def adicionar(self, pag, id_pag=None):
+        """Adiciona um pagamento e retorna o id atribuído (ou o id_pag informado)."""
+        if id_pag is None:
+            id_pag = self._proximo_id
+        self._proximo_id = max(self._proximo_id, id_pag + 1)
+        self._registros[id_pag] = pag
+        self._indexar_registro(id_pag, pag)
+        self._notificar('adicionar', id_pag, pag)
+        return id_pag
+
+    def atualizar(self, id_pag, pag):
+        """Substitui o pagamento id_pag pelo novo registro."""
+        self._desindexar_registro(id_pag, self._registros[id_pag])
+        self._registros[id_pag] = pag
+        self._indexar_registro(id_pag, pag)
+        self._notificar('atualizar', id_pag, pag)
+
+    def remover(self, id_pag):
+        """Remove o pagamento id_pag."""
+        pag = self._registros.pop(id_pag)
+        self._desindexar_registro(id_pag, pag)
+        self._notificar('remover', id_pag, pag)
+
+    def definir(self, id_pag, pag):
+        """Grava o pagamento com o id informado, adicionando ou substituindo."""
+        if id_pag in self._registros:
+            self.atualizar(id_pag, pag)
+        else:
+            self.adicionar(pag, id_pag)
+
+    def incluir_itens(self, itens):
+        """Inclui de uma vez os (id, pagamento) lidos do disco num repositório recém-criado.
+
+        Dá o mesmo resultado que adicionar() um a um (id None recebe o próximo
+        livre), mas monta os índices num laço só e não notifica os observadores.
+        """
+        registros = self._registros
+        ultimo_pagamento, dias_pagamento = self._ultimo_pagamento, self._dias_pagamento
+        agregar = self._agregados.incluir
+        dias_do_mes = {}
+        # Sem a pausa, a coleta de lixo percorreria várias vezes os milhares de objetos recém-criados
+        coleta_ativa = gc.isenabled()
+        gc.disable()
+        try:
+            for id_pag, pag in itens:
+                if id_pag is None:
+                    id_pag = self._proximo_id
+                if id_pag >= self._proximo_id:
+                    self._proximo_id = id_pag + 1
+                registros[id_pag] = pag
+                crianca, mes, data = pag.crianca.id, pag.mes, pag.data
+                escola = pag.crianca.escola
+                for indice, chave in ((self._por_chave, (crianca, mes)), (self._por_crianca, crianca),
+                                      (self._por_escola_mes, (escola, mes))):
+                    ids = indice.get(chave)
+                    if ids is None:
+                        indice[chave] = {id_pag: None}
+                    else:
+                        ids[id_pag] = None
+                agregar(crianca, escola, mes, pag.centavos)
+                if data:
+                    if data > ultimo_pagamento.get(crianca, 0):
+                        ultimo_pagamento[crianca] = data
+                    dia = dias_do_mes.get(data)
+                    if dia is None:
+                        dia = dias_do_mes[data] = date.fromordinal(data).day
+                    dias = dias_pagamento.get(crianca)
+                    if dias is None:
+                        dias = dias_pagamento[crianca] = Counter()
+                    dias[dia] += 1
+        finally:
+            if coleta_ativa:
+                gc.enable()
+        self.versao += 1
+
+    def renomear(self, nome, novo_nome):
+        """Troca o nome da criança no cadastro; os pagamentos não são regravados.
+
+        Se já existe uma criança com o novo nome na mesma escola, os pagamentos
+        são passados para ela (só os deste repositório: para todos os anos, use
+        ArmazenamentoAnual.renomear).
+        """
+        for crianca in self.cadastro.do_nome(nome):
+            destino = self.cadastro.buscar(novo_nome, crianca.escola)
+            if destino is None:
+                self.cadastro.renomear(crianca, novo_nome)
+                continue
+            for id_pag in list(self._por_crianca.get(crianca.id, ())):
+                self.atualizar(id_pag, self._registros[id_pag].substituir(crianca=destino))
+            self.cadastro.desativar(crianca)
+        self.versao += 1
+
+    def remover_nome(self, nome):
+        """Remove todos os pagamentos da criança e a desativa no cadastro."""
+        for crianca in self.cadastro.do_nome(nome):
+            for id_pag in list(self._por_crianca.get(crianca.id, ())):
+                self.remover(id_pag)
+            self.cadastro.desativar(crianca)
+
+    # --- Consultas ---
+
+    def obter(self, id_pag):
+        """Retorna o pagamento pelo id."""
+        return self._registros[id_pag]
+
+    def todos(self):
+        """Retorna a lista de pagamentos na ordem de inserção."""
+        return list(self._registros.values())
+
+    def itens(self):
+        """Retorna a lista de (id, pagamento) na ordem de inserção."""
+        return list(self._registros.items())
+
+    def buscar(self, nome, mes, escola=None):
+        """Retorna (id, pagamento) do primeiro pagamento da criança no mês (1-12), ou None.
+
+        Sem escola, considera qualquer escola.
+        """
+        for crianca in self._ids_criancas(nome, escola):
+            for id_pag in self._por_chave.get((crianca, mes), ()):
+                return id_pag, self._registros[id_pag]
+        return None
+
+    def do_nome(self, nome):
+        """Retorna os pagamentos da criança."""
+        return [self._registros[i] for crianca in self._ids_criancas(nome) for i in self._por_crianca.get(crianca, ())]
+
+    def da_escola_mes(self, escola, mes):
+        """Retorna os pagamentos da escola no mês."""
+        return [self._registros[i] for i in self._por_escola_mes.get((escola, mes), ())]
+
+    def total_pago(self, mes=None, nome=None, escola=None):
+        """Retorna os centavos pagos no mês (None = todos), pelos agregados; filtros None não restringem."""
+        meses = range(13) if mes is None else (mes,)    # 0 guarda os pagamentos sem mês
+        agregados = self._agregados
+        if nome is not None:
+            somas = (agregados.por_crianca_mes.get((crianca, numero))
+                     for crianca in self._ids_criancas(nome, escola) for numero in meses)
+        elif escola is not None:
+            somas = (agregados.por_escola_mes.get((escola, numero)) for numero in meses)
+        else:
+            somas = (agregados.por_mes.get(numero) for numero in meses)
+        return sum(soma[0] for soma in somas if soma is not None)
+
+    def criancas_pagantes(self, mes, escola=None):
+        """Retorna quantas crianças (da escola, se informada) têm pagamento no mês."""
+        if escola is not None:
+            soma = self._agregados.por_escola_mes.get((escola, mes))
+        else:
+            soma = self._agregados.por_mes.get(mes)
+        return soma[1] if soma is not None else 0
+
+    def meses_pagos(self):
+        """Retorna os (id da criança, mês) com pagamento, para consultas com 'in'. Não deve ser alterado."""
+        return self._agregados.por_crianca_mes.keys()
+
+    def verificar_agregados(self, corrigir=True):
+        """Confere os agregados com os montados do zero pelos pagamentos e retorna quantas chaves divergiam.
+
+        Com corrigir, passa a usar os montados do zero quando há divergência.
+        """
+        refeitos = Agregados.de_pagamentos(self._registros.values())
+        diferencas = self._agregados.diferencas(refeitos)
+        if diferencas and corrigir:
+            self._agregados = refeitos
+            self.versao += 1
+        return diferencas
+
+    def nomes(self):
+        """Retorna os nomes únicos não vazios, ordenados."""
+        obter = self.cadastro.obter
+        return sorted({nome for nome in (obter(crianca).nome for crianca in self._por_crianca) if nome.strip()})
+
+    def meses(self):
+        """Retorna os números dos meses com pagamentos."""
+        return {mes for _, mes in self._por_escola_mes if mes}
+
+    def criancas(self, mes=None, nome=None, escola=None):
+        """Retorna o conjunto de (nome, escola) com pagamentos que atendem aos filtros.
+
+        Filtros None não restringem.
+        """
+        if nome is not None:
+            ids = [crianca for crianca in self._ids_criancas(nome, escola)
+                   if (crianca, mes) in self._por_chave or (mes is None and crianca in self._por_crianca)]
+        elif mes is None:
+            ids = self._por_crianca
+        else:
+            ids = [crianca for crianca in self._por_crianca if (crianca, mes) in self._por_chave]
+        obter = self.cadastro.obter
+        resultado = set()
+        for crianca in ids:
+            crianca = obter(crianca)
+            if escola is None or crianca.escola == escola:
+                resultado.add((crianca.nome, crianca.escola))
+        return resultado
+
+    def ultimo_pagamento(self, nome, escola):
+        """Retorna a data (datetime) do pagamento mais recente da criança na escola, ou None."""
+        crianca = self.cadastro.buscar(nome, escola)
+        ultimo = self._ultimo_pagamento.get(crianca.id) if crianca is not None else None
+        return datetime.fromordinal(ultimo) if ultimo else None
+
+    def ultimos_por_crianca(self):
+        """Retorna {id da criança: ordinal do pagamento mais recente (0 se nenhum datado)} de quem tem pagamentos."""
+        ultimos = self._ultimo_pagamento
+        return {crianca: ultimos.get(crianca, 0) for crianca in self._por_crianca}
+
+    def _dias_do_nome(self):
+        """Retorna {nome: Counter de dias}, somando as crianças de mesmo nome em escolas diferentes."""
+        por_nome = {}
+        obter = self.cadastro.obter
+        for crianca, dias in self._dias_pagamento.items():
+            nome = obter(crianca).nome
+            if nome in por_nome:
+                por_nome[nome] = por_nome[nome] + dias
+            else:
+                por_nome[nome] = dias
+        return por_nome
+
+    def dia_usual(self, nome):
+        """Retorna o dia do mês em que a criança mais pagou, ou None se não há datas."""
+        contagens = [self._dias_pagamento[crianca] for crianca in self._ids_criancas(nome)
+                     if crianca in self._dias_pagamento]
+        if not contagens:
+            return None
+        return sum(contagens[1:], contagens[0]).most_common(1)[0][0]
+
+    def dias_usuais(self):
+        """Retorna {nome: dia usual} de todas as crianças com pagamentos datados."""
+        return {nome: dias.most_common(1)[0][0] for nome, dias in self._dias_do_nome().items()}
@@ -0,0 +1,228 @@
+"""Serviço HTTP local, só de leitura, com as consultas do app em JSON.
+
+Endpoints (GET):
+    /                      ano e versão dos dados
+    /criancas              cadastro (?escola=, ?ativas=1)
+    /pagamentos            linhas da tabela principal (?mes=Janeiro ou 1, ?escola=, ?crianca=)
+    /atrasados             crianças atrasadas, como no dashboard
+    /totais                total pago por mês (?escola=)
+
+Roda em threads próprias (ThreadingHTTPServer) e só escuta em 127.0.0.1.
+As consultas usam o instantâneo publicado pelo app (publicar), nunca o
+repositório que o Tk está alterando, e não releem o arquivo. Cada resposta
+leva um ETag com a versão dos dados e o dia; ela é calculada uma vez por
+versão e reaproveitada, e If-None-Match com o mesmo ETag recebe 304.
+"""
+import json
+import threading
+import time
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import nucleo
+from modelo import MESES_ORDENADOS, NOMES_MESES
+
+# Porta padrão do serviço
+PORTA_PADRAO = 8765
+
+# Respostas guardadas por versão dos dados; acima disso o cache é esvaziado
+LIMITE_CACHE = 256
+
+
+class ErroConsulta(Exception):
+    """Parâmetro inválido na consulta; vira uma resposta 400."""
+
+
+def _parametro(parametros, nome, padrao=None):
+    valores = parametros.get(nome)
+    return valores[-1] if valores else padrao
+
+
+def _mes(parametros):
+    """Nome do mês como no combo (ou 'Todos os Meses'), a partir de ?mes=Janeiro ou ?mes=1."""
+    mes = _parametro(parametros, 'mes')
+    if mes is None:
+        return 'Todos os Meses'
+    if mes.isdigit() and 1 <= int(mes) <= 12:
+        return NOMES_MESES[int(mes)]
+    for nome in MESES_ORDENADOS:
+        if nome.lower() == mes.lower():
+            return nome
+    raise ErroConsulta(f"Mês inválido: {mes}")
+
+
+def consultar_criancas(estado, parametros):
+    escola = _parametro(parametros, 'escola')
+    so_ativas = _parametro(parametros, 'ativas') == '1'
+    criancas = [crianca for crianca in estado.repositorio.cadastro
+                if (escola is None or crianca.escola == escola) and (crianca.ativo or not so_ativas)]
+    criancas.sort(key=lambda crianca: (crianca.nome, crianca.escola))
+    return [{'id': crianca.id, 'nome': crianca.nome, 'escola': crianca.escola,
+             'dia_usual': crianca.dia_usual, 'ativo': crianca.ativo} for crianca in criancas]
+
+
+def consultar_pagamentos(estado, parametros):
+    mes = _mes(parametros)
+    linhas = nucleo.calcular_linhas(estado.repositorio, mes, _parametro(parametros, 'crianca', 'Todas as Crianças'),
+                                    _parametro(parametros, 'escola', 'Todas as Escolas'), estado.hoje, estado.anterior)
+    resultado = {'mes': mes, 'linhas': [], 'total': None}
+    for chave, valores, tags in linhas:
+        if chave == 'total':
+            resultado['total'] = valores[-1]
+        elif chave != 'mensagem':
+            nome, data, _, escola, status, valor = valores
+            resultado['linhas'].append({'nome': nome, 'escola': escola, 'data': None if data == '--' else data,
+                                        'situacao': tags[0] if tags else None, 'status': status,
+                                        'valor': None if valor == '--' else valor})
+    return resultado
+
+
+def consultar_atrasados(estado, parametros):
+    return [{'nome': nome, 'escola': escola,
+             'ultimo_pagamento': ultimo_pag.date().isoformat() if ultimo_pag else None,
+             'dias': (estado.hoje - ultimo_pag).days if ultimo_pag else None}
+            for nome, escola, ultimo_pag in nucleo.obter_atrasados(estado.repositorio, estado.hoje, estado.anterior)]
+
+
+def consultar_totais(estado, parametros):
+    totais = nucleo.totais_por_mes(estado.repositorio, _parametro(parametros, 'escola'))
+    return {'por_mes': {str(mes): centavos for mes, centavos in sorted(totais.items())},
+            'total': sum(totais.values())}
+
+
+def consultar_versao(estado, parametros):
+    return {'ano': estado.ano, 'versao': estado.versao, 'data': estado.hoje.date().isoformat()}
+
+
+CONSULTAS = {
+    '/': consultar_versao,
+    '/criancas': consultar_criancas,
+    '/pagamentos': consultar_pagamentos,
+    '/atrasados': consultar_atrasados,
+    '/totais': consultar_totais,
+}
+
+
+def _versao_publicada(repositorio, anterior, ano):
+    """Versão dos dados entregues em publicar: o ano e as versões dos pagamentos e do cadastro."""
+    versao = f"{ano}-{repositorio.versao}-{repositorio.cadastro.versao}"
+    if anterior is not None:
+        versao += f"-{anterior.versao}"
+    return versao
+
+
+class EstadoPublicado:
+    """Instantâneo dos dados visto pelo serviço: repositório, ano anterior e a data da consulta.
+
+    O ETag junta o início do serviço (as versões recomeçam do zero a cada
+    execução), a versão dos dados no momento em que foram publicados e o dia.
+    """
+
+    def __init__(self, repositorio, anterior, ano, versao, hoje, inicio):
+        self.repositorio = repositorio
+        self.anterior = anterior
+        self.ano = ano
+        self.hoje = hoje
+        self.versao = versao
+        self.etag = f'"{inicio:x}-{versao}-{hoje.date().isoformat()}"'
+
+
+class ServicoConsultas:
+    """Servidor HTTP local sobre os dados publicados.
+
+    publicar(repositorio, anterior) troca o instantâneo servido; deve ser
+    chamado pela thread dona do repositório (o Tk, no app) com cópias que
+    ela não vá mais alterar, como as de instantaneo(), que levam também uma
+    cópia do cadastro de crianças. A versão do ETag é lida ali, uma vez por
+    publicação.
+    """
+
+    def __init__(self, porta=PORTA_PADRAO, host='127.0.0.1'):
+        self._estado = None
+        self._respostas = {}    # caminho com a consulta -> (etag, corpo)
+        self._trava = threading.Lock()
+        self._inicio = time.time_ns()
+        self._servidor = ThreadingHTTPServer((host, porta), type('Manipulador', (_Manipulador,), {'servico': self}))
+        self._servidor.daemon_threads = True
+        self._thread = None
+
+    @property
+    def endereco(self):
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def publicar(self, repositorio, anterior=None, ano=None):
+        """Passa a servir o repositório do ano (e o do ano anterior, para os atrasados)."""
+        ano = ano if ano is not None else getattr(repositorio, 'ano', None)
+        self._estado = (repositorio, anterior, ano, _versao_publicada(repositorio, anterior, ano))
+
+    def iniciar(self):
+        """Começa a atender numa thread própria."""
+        self._thread = threading.Thread(target=self._servidor.serve_forever, name='servico-consultas', daemon=True)
+        self._thread.start()
+
+    def encerrar(self):
+        """Para de atender e libera a porta."""
+        if self._thread is not None:
+            self._servidor.shutdown()
+            self._thread = None
+        self._servidor.server_close()
+
+    def responder(self, caminho):
+        """Retorna (status, etag, corpo JSON em bytes) da consulta; reaproveita a resposta da mesma versão."""
+        if self._estado is None:
+            return HTTPStatus.SERVICE_UNAVAILABLE, None, _json({'erro': "Dados ainda não carregados."})
+        partes = urlsplit(caminho)
+        consulta = CONSULTAS.get(partes.path.rstrip('/') or '/')
+        if consulta is None:
+            return HTTPStatus.NOT_FOUND, None, _json({'erro': f"Consulta desconhecida: {partes.path}"})
+        estado = EstadoPublicado(*self._estado, datetime.now(), self._inicio)
+        guardada = self._respostas.get(caminho)
+        if guardada is not None and guardada[0] == estado.etag:
+            return HTTPStatus.OK, guardada[0], guardada[1]
+        # Uma consulta por vez: pedidos iguais ao mesmo tempo esperam e reaproveitam a primeira resposta
+        with self._trava:
+            guardada = self._respostas.get(caminho)
+            if guardada is not None and guardada[0] == estado.etag:
+                return HTTPStatus.OK, guardada[0], guardada[1]
+            try:
+                corpo = _json(consulta(estado, parse_qs(partes.query)))
+            except ErroConsulta as e:
+                return HTTPStatus.BAD_REQUEST, None, _json({'erro': str(e)})
+            if len(self._respostas) >= LIMITE_CACHE:
+                self._respostas.clear()
+            self._respostas[caminho] = (estado.etag, corpo)
+        return HTTPStatus.OK, estado.etag, corpo
+
+
+def _json(dados):
+    return json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    servico = None
+    server_version = 'Pagamentos'
+
+    def do_GET(self):
+        try:
+            status, etag, corpo = self.servico.responder(self.path)
+        except Exception as e:
+            status, etag, corpo = HTTPStatus.INTERNAL_SERVER_ERROR, None, _json({'erro': str(e)})
+        if etag is not None and etag in self.headers.get('If-None-Match', ''):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        if etag is not None:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        """Sem uma linha no terminal por requisição."""
@@ -0,0 +1,123 @@
+"""Preenchimento incremental (e virtual, para listas grandes) de um ttk.Treeview."""
+
+# Acima desta quantidade de linhas só a parte visível (mais a margem) fica no Treeview
+LIMITE_VIRTUAL = 1000
+
+# Linhas mantidas antes e depois da parte visível no modo virtual
+MARGEM_VIRTUAL = 100
+
+
+class TabelaIncremental:
+    """Atualiza o Treeview comparando as novas linhas com as exibidas.
+
+    Cada linha é (iid, values, tags); o iid identifica a linha entre uma
+    atualização e outra, de modo que só o que mudou é inserido, alterado,
+    movido ou apagado. Com mais de LIMITE_VIRTUAL linhas a tabela passa ao
+    modo virtual: apenas uma janela em volta da parte visível existe no
+    Treeview e a barra de rolagem representa a lista inteira.
+    """
+
+    def __init__(self, tree, barra, limite_virtual=LIMITE_VIRTUAL, margem=MARGEM_VIRTUAL):
+        self.tree = tree
+        self.barra = barra
+        self.limite_virtual = limite_virtual
+        self.margem = margem
+        self._linhas = []
+        self._exibidas = {}     # iid -> (values, tags) presentes no Treeview
+        self._ordem = []        # iids na ordem em que aparecem no Treeview
+        self._virtual = False
+        self._inicio = 0        # primeira linha visível (índice em _linhas)
+        self._janela = (0, 0)   # faixa de _linhas materializada no Treeview
+        self._rolagem_pendente = False
+        barra.configure(command=self._ao_mover_barra)
+        tree.configure(yscrollcommand=self._ao_rolar_interno)
+
+    @property
+    def altura(self):
+        return int(self.tree.cget('height'))
+
+    def exibir(self, linhas):
+        """Mostra a lista de linhas, aplicando só as diferenças."""
+        self._linhas = linhas
+        virtual = len(linhas) > self.limite_virtual
+        if virtual:
+            if not self._virtual:
+                self._inicio = 0
+            self._virtual = True
+            self._rolar_para(self._inicio, forcar=True)
+        else:
+            self._virtual = False
+            self._janela = (0, len(linhas))
+            self._aplicar(linhas)
+
+    def _aplicar(self, linhas):
+        """Leva o Treeview ao conteúdo de linhas com o mínimo de operações."""
+        novas = {iid: (values, tags) for iid, values, tags in linhas}
+        removidas = [iid for iid in self._ordem if iid not in novas]
+        if removidas:
+            self.tree.delete(*removidas)
+            for iid in removidas:
+                del self._exibidas[iid]
+
+        # Reordena as linhas que permanecem, se a ordem relativa mudou
+        permanecem = [iid for iid, _, _ in linhas if iid in self._exibidas]
+        if permanecem != [iid for iid in self._ordem if iid in novas]:
+            for posicao, iid in enumerate(permanecem):
+                self.tree.move(iid, '', posicao)
+
+        for posicao, (iid, values, tags) in enumerate(linhas):
+            atual = self._exibidas.get(iid)
+            if atual is None:
+                self.tree.insert('', posicao, iid=iid, values=values, tags=tags)
+            elif atual != (values, tags):
+                self.tree.item(iid, values=values, tags=tags)
+            self._exibidas[iid] = (values, tags)
+        self._ordem = [iid for iid, _, _ in linhas]
+
+    # --- Modo virtual ---
+
+    def _rolar_para(self, inicio, forcar=False):
+        """Posiciona a primeira linha visível, trocando a janela materializada se preciso."""
+        self._rolagem_pendente = False
+        total = len(self._linhas)
+        altura = self.altura
+        inicio = max(0, min(inicio, total - altura))
+        self._inicio = inicio
+        janela_inicio, janela_fim = self._janela
+        if forcar or inicio < janela_inicio or inicio + altura > janela_fim:
+            janela_inicio = max(0, inicio - self.margem)
+            janela_fim = min(total, inicio + altura + self.margem)
+            self._janela = (janela_inicio, janela_fim)
+            self._aplicar(self._linhas[janela_inicio:janela_fim])
+        self.tree.yview_moveto((inicio - janela_inicio) / max(1, janela_fim - janela_inicio))
+        self._atualizar_barra()
+
+    def _atualizar_barra(self):
+        total = max(1, len(self._linhas))
+        self.barra.set(self._inicio / total, min(1.0, (self._inicio + self.altura) / total))
+
+    def _ao_mover_barra(self, *args):
+        """Comando da barra de rolagem: no modo virtual, converte a posição para a lista inteira."""
+        if not self._virtual:
+            self.tree.yview(*args)
+            return
+        if args[0] == 'moveto':
+            self._rolar_para(int(float(args[1]) * len(self._linhas)))
+        elif args[0] == 'scroll':
+            passo = self.altura if args[2] == 'pages' else 1
+            self._rolar_para(self._inicio + int(args[1]) * passo)
+
+    def _ao_rolar_interno(self, primeiro, ultimo):
+        """Chamado pelo Treeview ao rolar (roda do mouse, teclado, seleção)."""
+        if not self._virtual:
+            self.barra.set(primeiro, ultimo)
+            return
+        janela_inicio, janela_fim = self._janela
+        self._inicio = janela_inicio + round(float(primeiro) * (janela_fim - janela_inicio))
+        self._atualizar_barra()
+        perto_do_inicio = janela_inicio > 0 and self._inicio - janela_inicio < self.margem // 2
+        perto_do_fim = janela_fim < len(self._linhas) and janela_fim - (self._inicio + self.altura) < self.margem // 2
+        if (perto_do_inicio or perto_do_fim) and not self._rolagem_pendente:
+            # Troca a janela fora do callback de rolagem do Tk
+            self._rolagem_pendente = True
+            self.tree.after_idle(lambda: self._rolar_para(self._inicio, forcar=True))
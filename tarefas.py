@@ -0,0 +1,264 @@
+"""Execução de consultas e gravações fora do mainloop do Tk, com resultado entregue via after()."""
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Espera após a última mudança de filtro antes de consultar (ms)
+ATRASO_PADRAO_MS = 150
+
+# Intervalo para verificar se há resultados prontos (ms)
+INTERVALO_VERIFICACAO_MS = 20
+
+# Espera entre uma alteração e a gravação automática; alterações nesse intervalo são gravadas juntas (ms)
+INTERVALO_GRAVACAO_MS = 2000
+
+# Resultados de consultas guardados; acima disso sai o usado há mais tempo
+LIMITE_CACHE_CONSULTAS = 16
+
+
+class ConsultaCancelada(Exception):
+    """Lançada pela consulta quando ela foi substituída por uma mais nova."""
+
+
+class CacheConsultas:
+    """Resultados de consultas por chave, cada um marcado com a versão dos dados em que foi calculado.
+
+    obter() só devolve o resultado guardado com a mesma versão; um de versão
+    anterior é descartado. Guarda até limite resultados, saindo o usado há
+    mais tempo. Pode ser usado pelo Tk e pela thread de consultas ao mesmo tempo.
+    """
+
+    def __init__(self, limite=LIMITE_CACHE_CONSULTAS):
+        self.limite = limite
+        self._resultados = OrderedDict()    # chave -> (versão, resultado), do usado há mais tempo ao mais recente
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def __len__(self):
+        return len(self._resultados)
+
+    def obter(self, chave, versao):
+        """Retorna o resultado da chave calculado na versão, ou None."""
+        with self._trava:
+            guardado = self._resultados.get(chave)
+            if guardado is not None and guardado[0] == versao:
+                self._resultados.move_to_end(chave)
+                self.acertos += 1
+                return guardado[1]
+            if guardado is not None:
+                del self._resultados[chave]
+            self.faltas += 1
+            return None
+
+    def contem(self, chave, versao):
+        """Indica se há resultado da chave na versão, sem contar como uso."""
+        with self._trava:
+            guardado = self._resultados.get(chave)
+        return guardado is not None and guardado[0] == versao
+
+    def guardar(self, chave, versao, resultado):
+        with self._trava:
+            self._resultados[chave] = (versao, resultado)
+            self._resultados.move_to_end(chave)
+            while len(self._resultados) > self.limite:
+                self._resultados.popitem(last=False)
+
+    def limpar(self):
+        """Descarta todos os resultados, para quando os dados passam a ser outros (a troca de ano)."""
+        with self._trava:
+            self._resultados.clear()
+
+
+class ExecutorConsultas:
+    """Roda uma consulta por vez numa thread, descartando resultados de consultas superadas.
+
+    agendar(preparar, calcular, entregar, antecipar=None):
+      - preparar() roda no Tk quando o atraso termina e retorna os argumentos
+        (por exemplo os filtros e um instantâneo dos dados);
+      - calcular(*args, cancelado=...) roda na thread e pode chamar cancelado()
+        para desistir cedo lançando ConsultaCancelada;
+      - entregar(resultado) roda no Tk, só para a consulta mais recente;
+      - antecipar(args, cancelado) roda na thread depois da entrega, para
+        adiantar consultas prováveis; é abandonada quando outra começa.
+    """
+
+    def __init__(self, widget, atraso_ms=ATRASO_PADRAO_MS, intervalo_ms=INTERVALO_VERIFICACAO_MS):
+        self.widget = widget
+        self.atraso_ms = atraso_ms
+        self.intervalo_ms = intervalo_ms
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='consulta')
+        self._resultados = queue.Queue()
+        self._agendamento = None
+        self._geracao = 0
+        self._cancelar = None
+        self._pendentes = 0
+
+    def agendar(self, preparar, calcular, entregar, atraso_ms=None, antecipar=None):
+        """Agenda a consulta, substituindo a que ainda estiver esperando o atraso."""
+        if self._agendamento is not None:
+            self.widget.after_cancel(self._agendamento)
+        atraso = self.atraso_ms if atraso_ms is None else atraso_ms
+        self._agendamento = self.widget.after(atraso, self._iniciar, preparar, calcular, entregar, antecipar)
+
+    def descartar(self):
+        """Desiste da consulta agendada e da que estiver rodando; nenhum resultado delas é entregue."""
+        if self._agendamento is not None:
+            self.widget.after_cancel(self._agendamento)
+            self._agendamento = None
+        if self._cancelar is not None:
+            self._cancelar.set()
+        self._geracao += 1
+
+    def _iniciar(self, preparar, calcular, entregar, antecipar):
+        self._agendamento = None
+        if self._cancelar is not None:
+            self._cancelar.set()
+        self._geracao += 1
+        self._cancelar = threading.Event()
+        args = preparar()
+        self._pendentes += 1
+        self._executor.submit(self._executar, self._geracao, self._cancelar, calcular, args, entregar, antecipar)
+        if self._pendentes == 1:
+            self.widget.after(self.intervalo_ms, self._verificar)
+
+    def _executar(self, geracao, cancelar, calcular, args, entregar, antecipar):
+        """Roda na thread de consultas."""
+        try:
+            if cancelar.is_set():
+                raise ConsultaCancelada()
+            resultado = calcular(*args, cancelado=cancelar.is_set)
+            self._resultados.put((geracao, entregar, resultado, None))
+        except ConsultaCancelada:
+            self._resultados.put((geracao, None, None, None))
+            return
+        except Exception as e:
+            self._resultados.put((geracao, entregar, None, e))
+            return
+        if antecipar is None:
+            return
+        try:
+            antecipar(args, cancelar.is_set)
+        except Exception:
+            # ConsultaCancelada ou erro: a consulta pedida já foi entregue, a antecipação é só um adiantamento
+            pass
+
+    def _verificar(self):
+        """Entrega no Tk os resultados prontos; continua verificando enquanto houver consultas."""
+        erro_consulta = None
+        while True:
+            try:
+                geracao, entregar, resultado, erro = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            self._pendentes -= 1
+            if geracao != self._geracao or entregar is None:
+                continue
+            if erro is not None:
+                erro_consulta = erro
+                continue
+            entregar(resultado)
+        if self._pendentes:
+            self.widget.after(self.intervalo_ms, self._verificar)
+        if erro_consulta is not None:
+            raise erro_consulta
+
+    def encerrar(self):
+        """Cancela o que estiver pendente e libera a thread."""
+        self.descartar()
+        self._executor.shutdown(wait=False)
+
+
+class GravacaoAdiada:
+    """Grava as alterações em segundo plano, juntando as que chegam em sequência.
+
+    marcar() avisa que há alterações; gravar() roda numa thread própria no
+    máximo uma vez a cada intervalo_ms, e nunca duas ao mesmo tempo.
+    ao_terminar(erro) roda no Tk depois de cada gravação (erro None se deu
+    certo); se falhar, a gravação é tentada de novo no próximo intervalo.
+    Com em_segundo_plano=False, gravar() roda no próprio Tk, só agrupada.
+    gravar_agora() antecipa a gravação pendente;
+    descarregar() espera a gravação em andamento, para o encerramento.
+    """
+
+    def __init__(self, widget, gravar, ao_terminar, intervalo_ms=INTERVALO_GRAVACAO_MS, em_segundo_plano=True):
+        self.widget = widget
+        self.gravar = gravar
+        self.ao_terminar = ao_terminar
+        self.intervalo_ms = intervalo_ms
+        self.em_segundo_plano = em_segundo_plano
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gravacao')
+        self._pendente = False      # há alterações ainda não entregues a gravar()
+        self._agendamento = None
+        self._andamento = None      # Future da gravação em curso
+
+    @property
+    def pendente(self):
+        """Indica se há alterações não gravadas (ou sendo gravadas)."""
+        return self._pendente or self._andamento is not None
+
+    def marcar(self):
+        """Registra que há alterações; a gravação acontece no próximo intervalo."""
+        self._pendente = True
+        self._agendar()
+
+    def _agendar(self):
+        if self._agendamento is None and self._andamento is None:
+            self._agendamento = self.widget.after(self.intervalo_ms, self._iniciar)
+
+    def _iniciar(self):
+        self._agendamento = None
+        if not self._pendente:
+            return
+        self._pendente = False
+        if not self.em_segundo_plano:
+            try:
+                self.gravar()
+            except Exception as e:
+                self._terminar(e)
+            else:
+                self._terminar(None)
+            return
+        self._andamento = self._executor.submit(self.gravar)
+        self.widget.after(INTERVALO_VERIFICACAO_MS, self._verificar)
+
+    def _verificar(self):
+        if self._andamento is None:
+            return
+        if not self._andamento.done():
+            self.widget.after(INTERVALO_VERIFICACAO_MS, self._verificar)
+            return
+        erro = self._andamento.exception()
+        self._andamento = None
+        self._terminar(erro)
+
+    def _terminar(self, erro):
+        if erro is not None:
+            self._pendente = True
+        if self._pendente:
+            self._agendar()
+        self.ao_terminar(erro)
+
+    def gravar_agora(self):
+        """Grava já o que estiver pendente, sem esperar o intervalo."""
+        if self._agendamento is not None:
+            self.widget.after_cancel(self._agendamento)
+            self._agendamento = None
+        if self._andamento is None:
+            self._iniciar()
+
+    def descarregar(self):
+        """Cancela o agendamento e espera a gravação em andamento; retorna o erro dela, se houve.
+
+        Quem chama grava em seguida o que ainda estiver pendente.
+        """
+        if self._agendamento is not None:
+            self.widget.after_cancel(self._agendamento)
+            self._agendamento = None
+        erro = None
+        if self._andamento is not None:
+            erro = self._andamento.exception()
+            self._andamento = None
+        self._executor.shutdown(wait=True)
+        return erro